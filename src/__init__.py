@@ -1 +1,3 @@
 # EAC3 Converter package
+
+__version__ = "2.3.0"
@@ -3,10 +3,12 @@ import logging
 import os
 import subprocess
 import time
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 
+from . import bandwidth, marker, pagecache, segments
 from .config import config
 from .exceptions import ConversionError, ConversionTimeoutError, DiskSpaceError
+from .processes import run_probe, run_tracked
 
 logger = logging.getLogger("eac3_converter")
 
@@ -25,6 +27,56 @@ AUDIO_PROFILES = {
 }
 
 
+# TARGET_CODEC setting -> (codec of the output stream, ffmpeg encoder).
+TARGET_ENCODERS = {
+    "eac3": ("eac3", "eac3"),
+    "ac3": ("ac3", "ac3"),
+    "ac3_fixed": ("ac3", "ac3_fixed"),
+}
+
+
+# Output codec -> lossy codecs the clients of such a library can play; a
+# lossless track with one of these alongside it (same language, enough
+# channels) is redundant. AC3 libraries exist for clients without EAC3.
+COMPATIBLE_CODECS = {
+    "eac3": ("ac3", "eac3"),
+    "ac3": ("ac3",),
+}
+
+
+def _language(stream: Dict[str, Any]) -> str:
+    return ((stream.get("tags") or {}).get("language") or "und").lower()
+
+
+def find_redundant_tracks(streams: List[Dict[str, Any]], target: str = "eac3") -> Dict[int, int]:
+    """Map lossless audio indexes to a compatible track that makes them redundant.
+
+    A DTS/TrueHD track is redundant when a track in a codec compatible
+    with the target (AC3/EAC3 for EAC3, only AC3 for AC3) has the same
+    language and at least as many channels as the profile it would be
+    encoded to (TrueHD 7.1 next to AC3 5.1 qualifies: 7.1 is encoded to 5.1).
+    """
+    target_codec = TARGET_ENCODERS[target][0]
+    compatible = COMPATIBLE_CODECS[target_codec]
+    redundant: Dict[int, int] = {}
+    for i, stream in enumerate(streams):
+        if (stream.get("codec_name") or "").lower() not in ("dts", "truehd"):
+            continue
+        needed = resolve_audio_profile(target_codec, stream.get("channels"))["channels"]
+        for j, other in enumerate(streams):
+            if (other.get("codec_name") or "").lower() in compatible \
+                    and _language(other) == _language(stream) \
+                    and int(other.get("channels") or 0) >= needed:
+                redundant[i] = j
+                break
+    return redundant
+
+
+def resolve_target(file_path: str) -> Tuple[str, str]:
+    """(output codec, ffmpeg encoder) configured for the library holding ``file_path``."""
+    return TARGET_ENCODERS[config.target.codec_for(file_path)]
+
+
 def resolve_audio_profile(target_codec: str, source_channels: int) -> Dict[str, Any]:
     """Resolve a fixed Plex-safe audio output profile.
 
@@ -51,6 +103,28 @@ def resolve_audio_profile(target_codec: str, source_channels: int) -> Dict[str,
     return dict(profile)
 
 
+def stream_duration_seconds(stream: Dict[str, Any]) -> float:
+    """Duration of a probed stream in seconds, or 0.0 if unknown.
+
+    Matroska streams usually carry it only as a ``DURATION`` tag
+    (``HH:MM:SS.nnnnnnnnn``) rather than in the ``duration`` field.
+    """
+    try:
+        if stream.get("duration"):
+            return float(stream["duration"])
+    except (TypeError, ValueError):
+        pass
+    tags = stream.get("tags") or {}
+    for key, value in tags.items():
+        if key == "DURATION" or key.startswith("DURATION-"):
+            try:
+                hours, minutes, seconds = value.split(":")
+                return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+            except ValueError:
+                return 0.0
+    return 0.0
+
+
 class AudioProcessor:
     """Handles audio stream detection and conversion."""
 
@@ -66,7 +140,7 @@ class AudioProcessor:
 
         logger.debug(f"Running ffprobe command: {' '.join(command)}")
 
-        result = subprocess.run(command, capture_output=True, text=True)
+        result = run_probe(command)
         if result.returncode != 0:
             logger.warning(f"Failed to analyze audio tracks for {file_path}")
             return False
@@ -112,139 +186,366 @@ class AudioProcessor:
             logger.error(f"Error checking disk space for {file_path}: {e}")
             return False
 
-    def convert_audio_tracks(self, input_file: str, temp_file: str) -> Dict[str, Any]:
-        """Re-encode DTS/TrueHD audio streams to EAC3; copy other streams as-is.
+    @staticmethod
+    def build_audio_plan(
+        streams: List[Dict[str, Any]],
+        target: str = "eac3",
+        redundant_tracks: str = "encode",
+    ) -> List[Dict[str, Any]]:
+        """Decide, per audio stream, what convert_audio_tracks will do with it.
+
+        Each entry carries the stream's audio index, source codec/channels and
+        either ``action="encode"`` with the resolved output profile for the
+        ``target`` setting (see TARGET_ENCODERS) or ``action="copy"``.
+
+        Lossless tracks made redundant by a compatible track (see
+        find_redundant_tracks) are still encoded with ``redundant_tracks=
+        "encode"``, copied untouched with ``"skip"`` and removed with
+        ``"drop"`` (``action="drop"``); such entries record the compatible
+        track's index in ``redundant_with``. ``out_index`` is the stream's
+        audio index in the output.
+        """
+        target_codec, encoder = TARGET_ENCODERS[target]
+        redundant = find_redundant_tracks(streams, target) if redundant_tracks != "encode" else {}
+        plan: List[Dict[str, Any]] = []
+        for i, stream in enumerate(streams):
+            codec = (stream.get("codec_name") or "").lower()
+            channels = int(stream.get("channels", 2) or 2)
+            entry: Dict[str, Any] = {
+                "index": i,
+                "codec": codec,
+                "channels": channels,
+                "source_title": (stream.get("tags") or {}).get("title", ""),
+                "action": "copy",
+            }
+            if i in redundant:
+                entry["redundant_with"] = redundant[i]
+                if redundant_tracks == "drop":
+                    entry["action"] = "drop"
+            elif codec in ("dts", "truehd"):
+                profile = resolve_audio_profile(target_codec, channels)
+                entry.update({
+                    "action": "encode",
+                    "target_codec": target_codec,
+                    "encoder": encoder,
+                    "bitrate": profile["bitrate"],
+                    "out_channels": profile["channels"],
+                    "title": profile["title"],
+                })
+            plan.append(entry)
+
+        out_index = 0
+        for entry in plan:
+            if entry["action"] != "drop":
+                entry["out_index"] = out_index
+                out_index += 1
+        return plan
+
+    @staticmethod
+    def codec_args_for_plan(audio_plan: List[Dict[str, Any]]) -> List[str]:
+        """Per-stream ffmpeg codec arguments for a plan from build_audio_plan.
+
+        Dropped streams are unmapped, so they must follow ``-map 0``.
+        """
+        args: List[str] = []
+        for entry in audio_plan:
+            if entry["action"] == "drop":
+                args.extend(["-map", f"-0:a:{entry['index']}"])
+                continue
+            i = entry["out_index"]
+            if entry["action"] == "encode":
+                args.extend([
+                    f"-c:a:{i}", entry["encoder"],
+                    f"-b:a:{i}", entry["bitrate"],
+                    f"-ac:a:{i}", str(entry["out_channels"]),
+                    f"-metadata:s:a:{i}", f"title={entry['title']}",
+                ])
+            else:
+                args.extend([f"-c:a:{i}", "copy"])
+        return args
+
+    @staticmethod
+    def _timeout(degraded: bool) -> float:
+        """ffmpeg timeout; retries of a transient failure get RETRY_TIMEOUT_MULTIPLIER more."""
+        return config.ffmpeg.timeout_seconds * (config.retry.timeout_multiplier if degraded else 1)
+
+    def convert_audio_tracks(self, input_file: str, temp_file: str, degraded: bool = False) -> Dict[str, Any]:
+        """Re-encode DTS/TrueHD audio streams to EAC3 (or the library's
+        TARGET_CODEC); copy other streams as-is.
 
         Output bitrate, channels and title are chosen from fixed profiles.
         Streams that are neither DTS nor TrueHD are passed through with
-        -c:a:N copy.
+        -c:a:N copy. The output carries the converter marker tag (see
+        marker.py) so it is recognised later without the cache.
+
+        ``degraded`` (a retry) gets a longer timeout and encodes in one
+        pass, unless the failed attempt left segment checkpoints to resume.
         """
         start_time = time.time()
 
         streams = self.get_audio_streams_info(input_file)
-        per_stream_codec_args: List[str] = []
-        encoded_count = 0
-        copied_count = 0
-        for i, stream in enumerate(streams):
-            codec = (stream.get("codec_name") or "").lower()
-            channels = int(stream.get("channels", 2) or 2)
-            if codec in ("dts", "truehd"):
-                profile = resolve_audio_profile("eac3", channels)
-                existing_title = (stream.get("tags") or {}).get("title", "")
-                per_stream_codec_args.extend([
-                    f"-c:a:{i}", "eac3",
-                    f"-b:a:{i}", profile["bitrate"],
-                    f"-ac:a:{i}", str(profile["channels"]),
-                    f"-metadata:s:a:{i}", f"title={profile['title']}",
-                ])
+        target = config.target.codec_for(input_file)
+        audio_plan = self.build_audio_plan(streams, target, config.target.redundant_tracks)
+        per_stream_codec_args = self.codec_args_for_plan(audio_plan)
+        for entry in audio_plan:
+            i = entry["index"]
+            if entry["action"] == "encode":
                 logger.info(
-                    f"Stream {i}: {codec} {channels}ch -> eac3 "
-                    f"{profile['channels']}ch @ {profile['bitrate']} "
-                    f"(title: '{existing_title}' -> '{profile['title']}')"
+                    f"Stream {i}: {entry['codec']} {entry['channels']}ch -> {entry['target_codec']} "
+                    f"{entry['out_channels']}ch @ {entry['bitrate']} "
+                    f"(title: '{entry['source_title']}' -> '{entry['title']}')"
                 )
-                encoded_count += 1
             else:
-                per_stream_codec_args.extend([f"-c:a:{i}", "copy"])
+                redundant = (
+                    f" (stream {entry['redundant_with']} is compatible)" if "redundant_with" in entry else ""
+                )
                 logger.info(
-                    f"Stream {i}: {codec or 'unknown'} {channels}ch -> copy"
+                    f"Stream {i}: {entry['codec'] or 'unknown'} {entry['channels']}ch -> {entry['action']}{redundant}"
                 )
-                copied_count += 1
+        encoded_count = sum(1 for entry in audio_plan if entry["action"] == "encode")
+        dropped_count = sum(1 for entry in audio_plan if entry["action"] == "drop")
+        copied_count = len(audio_plan) - encoded_count - dropped_count
 
         logger.info(
-            f"Audio plan: {encoded_count} stream(s) to EAC3, "
+            f"Audio plan: {encoded_count} stream(s) to {TARGET_ENCODERS[target][1].upper()}, "
             f"{copied_count} stream(s) copied"
+            + (f", {dropped_count} redundant stream(s) dropped" if dropped_count else "")
         )
 
-        command = [
-            "ffmpeg", "-i", input_file, "-hide_banner",
-            "-loglevel", "error" if not self.debug_mode else "info",
-            "-threads", str(config.ffmpeg.threads),
-            "-fflags", config.ffmpeg.performance_flags,
-            "-avoid_negative_ts", config.ffmpeg.avoid_negative_ts,
-            "-max_muxing_queue_size", str(config.ffmpeg.max_muxing_queue_size),
-            "-bufsize", config.ffmpeg.bufsize,
-            "-strict", config.ffmpeg.strict_mode,
-            "-map", "0", "-c:v", "copy", "-c:s", "copy",
-            *per_stream_codec_args,
-            "-dialnorm", str(config.ffmpeg.dialnorm),
-            "-mixing_level", str(config.ffmpeg.mixing_level),
-            temp_file, "-y"
-        ]
-
-        logger.debug(f"Running optimized ffmpeg command: {' '.join(command)}")
-        logger.info("Starting ffmpeg conversion...")
-
-        try:
-            result = subprocess.run(command, check=True, timeout=config.ffmpeg.timeout_seconds,
-                                  capture_output=True, text=True)
-        except subprocess.TimeoutExpired:
-            logger.error(f"Conversion timeout for {input_file} after {config.ffmpeg.timeout_seconds}s")
-            raise ConversionTimeoutError(f"Timeout after {config.ffmpeg.timeout_seconds}s for {input_file}")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"ffmpeg failed with return code {e.returncode}: {e.stderr}")
-            raise ConversionError(f"ffmpeg error (code {e.returncode}): {e.stderr.strip()}")
-        except Exception as e:
-            logger.error(f"Unexpected error during conversion: {e}")
-            raise ConversionError(f"Unexpected conversion error: {e}")
+        duration_seconds = max((stream_duration_seconds(s) for s in streams), default=0.0)
+        loglevel = "error" if not self.debug_mode else "info"
+        segmented = segments.segmented_encode(
+            input_file, streams, audio_plan, duration_seconds, loglevel,
+            degraded=degraded, timeout=self._timeout(degraded),
+        )
+        encoded_tracks = segmented.run() if segmented is not None else {}
 
+        with bandwidth.limiter.session(input_file, duration_seconds) as input_args, \
+                pagecache.janitor.limit(input_file, temp_file):
+            if encoded_tracks:
+                command = self._remux_command(input_file, temp_file, audio_plan, encoded_tracks, loglevel)
+            else:
+                command = [
+                    "ffmpeg", *input_args, "-i", input_file, "-hide_banner",
+                    "-loglevel", loglevel,
+                    "-threads", str(config.ffmpeg.threads),
+                    "-fflags", config.ffmpeg.performance_flags,
+                    "-avoid_negative_ts", config.ffmpeg.avoid_negative_ts,
+                    "-max_muxing_queue_size", str(config.ffmpeg.max_muxing_queue_size),
+                    "-bufsize", config.ffmpeg.bufsize,
+                    "-strict", config.ffmpeg.strict_mode,
+                    "-map", "0", "-c:v", "copy", "-c:s", "copy",
+                    *per_stream_codec_args,
+                    "-metadata", f"{marker.MARKER_TAG}={marker.marker_value()}",
+                    "-dialnorm", str(config.ffmpeg.dialnorm),
+                    "-mixing_level", str(config.ffmpeg.mixing_level),
+                    temp_file, "-y"
+                ]
+
+            logger.debug(f"Running optimized ffmpeg command: {' '.join(command)}")
+            logger.info("Starting ffmpeg conversion...")
+
+            try:
+                run_tracked(command, timeout=self._timeout(degraded))
+            except subprocess.TimeoutExpired:
+                logger.error(f"Conversion timeout for {input_file} after {self._timeout(degraded):g}s")
+                raise ConversionTimeoutError(f"Timeout after {self._timeout(degraded):g}s for {input_file}")
+            except subprocess.CalledProcessError as e:
+                logger.error(f"ffmpeg failed with return code {e.returncode}: {e.stderr}")
+                raise ConversionError(f"ffmpeg error (code {e.returncode}): {e.stderr.strip()}", e.returncode, e.stderr)
+            except Exception as e:
+                logger.error(f"Unexpected error during conversion: {e}")
+                raise ConversionError(f"Unexpected conversion error: {e}")
+
+        # Also when this attempt didn't use them: a one-pass retry must not
+        # leave a failed attempt's segments behind.
+        segments.remove_checkpoints(input_file)
         conversion_time = time.time() - start_time
         logger.info(f"Conversion completed in {conversion_time:.2f}s")
 
+        encoded = [entry for entry in audio_plan if entry["action"] == "encode"]
         return {
             "conversion_time": conversion_time,
-            "command": " ".join(command)
+            "command": " ".join(command),
+            "codec": TARGET_ENCODERS[target][0],
+            "audio_plan": audio_plan,
+            "streams_encoded": len(encoded),
+            "channels_encoded": sum(entry["out_channels"] for entry in encoded),
+            "duration_seconds": duration_seconds,
         }
 
-    def convert_standalone_audio(self, input_file: str, output_file: str) -> Dict[str, Any]:
-        """Convert a standalone audio file (e.g. .dts) to a standalone EAC3 file."""
+    def _remux_command(
+        self,
+        input_file: str,
+        temp_file: str,
+        audio_plan: List[Dict[str, Any]],
+        encoded_tracks: Dict[int, str],
+        loglevel: str,
+    ) -> List[str]:
+        """ffmpeg command copying ``input_file`` with pre-encoded audio tracks swapped in.
+
+        ``encoded_tracks`` maps audio indexes to raw AC3/EAC3 files (see
+        segments.py). Streams keep their order; the replacements take the
+        source track's tags, disposition and start time, with the new title.
+        """
+        inputs: List[str] = []
+        maps: List[str] = []
+        stream_args: List[str] = []
+        audio_index = 0
+        for n, stream in enumerate(self.probe_file(input_file)["streams"]):
+            if stream.get("codec_type") != "audio":
+                maps.extend(["-map", f"0:{n}"])
+                continue
+            entry = audio_plan[audio_index]
+            audio_index += 1
+            if entry["action"] == "drop":
+                continue
+            if entry["index"] not in encoded_tracks:
+                maps.extend(["-map", f"0:{n}"])
+                continue
+            start = float(stream.get("start_time") or 0.0)
+            if start:
+                inputs.extend(["-itsoffset", f"{start:.6f}"])
+            inputs.extend(["-f", entry["target_codec"], "-i", encoded_tracks[entry["index"]]])
+            maps.extend(["-map", f"{inputs.count('-i')}:a:0"])
+            out = entry["out_index"]
+            disposition = "+".join(k for k, v in sorted((stream.get("disposition") or {}).items()) if v) or "0"
+            stream_args.extend([
+                f"-map_metadata:s:a:{out}", f"0:s:a:{entry['index']}",
+                f"-metadata:s:a:{out}", f"title={entry['title']}",
+                f"-disposition:a:{out}", disposition,
+            ])
+        return [
+            "ffmpeg", "-i", input_file, *inputs, "-hide_banner",
+            "-loglevel", loglevel,
+            "-threads", str(config.ffmpeg.threads),
+            "-fflags", config.ffmpeg.performance_flags,
+            "-avoid_negative_ts", config.ffmpeg.avoid_negative_ts,
+            "-max_muxing_queue_size", str(config.ffmpeg.max_muxing_queue_size),
+            *maps, "-c", "copy", *stream_args,
+            "-metadata", f"{marker.MARKER_TAG}={marker.marker_value()}",
+            temp_file, "-y"
+        ]
+
+    def convert_standalone_audio(self, input_file: str, output_file: str, degraded: bool = False) -> Dict[str, Any]:
+        """Convert a standalone audio file (e.g. .dts) to a standalone EAC3 (or AC3) file.
+
+        ``degraded`` (a retry) gets a longer timeout.
+        """
         start_time = time.time()
 
         streams = self.get_audio_streams_info(input_file)
         channels = int(streams[0].get("channels", 2) or 2) if streams else 2
-        profile = resolve_audio_profile("eac3", channels)
+        codec, encoder = resolve_target(input_file)
+        profile = resolve_audio_profile(codec, channels)
         logger.debug(
-            f"Standalone audio: channels={channels} -> eac3 "
+            f"Standalone audio: channels={channels} -> {encoder} "
             f"{profile['channels']}ch @ {profile['bitrate']}"
         )
 
-        command = [
-            "ffmpeg", "-i", input_file, "-hide_banner",
-            "-loglevel", "error" if not self.debug_mode else "info",
-            "-threads", str(config.ffmpeg.threads),
-            "-strict", config.ffmpeg.strict_mode,
-            "-vn", "-map", "0:a", "-c:a", "eac3",
-            "-b:a", profile["bitrate"],
-            "-ac:a", str(profile["channels"]),
-            "-dialnorm", str(config.ffmpeg.dialnorm),
-            "-mixing_level", str(config.ffmpeg.mixing_level),
-            "-f", "eac3",
-            output_file, "-y"
-        ]
-
-        logger.debug(f"Running standalone ffmpeg command: {' '.join(command)}")
-        logger.info("Starting standalone audio conversion...")
-
-        try:
-            subprocess.run(command, check=True, timeout=config.ffmpeg.timeout_seconds,
-                           capture_output=True, text=True)
-        except subprocess.TimeoutExpired:
-            logger.error(f"Standalone conversion timeout for {input_file} after {config.ffmpeg.timeout_seconds}s")
-            raise ConversionTimeoutError(f"Timeout after {config.ffmpeg.timeout_seconds}s for {input_file}")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"ffmpeg failed with return code {e.returncode}: {e.stderr}")
-            raise ConversionError(f"ffmpeg error (code {e.returncode}): {e.stderr.strip()}")
-        except Exception as e:
-            logger.error(f"Unexpected error during standalone conversion: {e}")
-            raise ConversionError(f"Unexpected conversion error: {e}")
+        duration_seconds = stream_duration_seconds(streams[0]) if streams else 0.0
+        with bandwidth.limiter.session(input_file, duration_seconds) as input_args, \
+                pagecache.janitor.limit(input_file, output_file):
+            command = [
+                "ffmpeg", *input_args, "-i", input_file, "-hide_banner",
+                "-loglevel", "error" if not self.debug_mode else "info",
+                "-threads", str(config.ffmpeg.threads),
+                "-strict", config.ffmpeg.strict_mode,
+                "-vn", "-map", "0:a", "-c:a", encoder,
+                "-b:a", profile["bitrate"],
+                "-ac:a", str(profile["channels"]),
+                "-dialnorm", str(config.ffmpeg.dialnorm),
+                "-mixing_level", str(config.ffmpeg.mixing_level),
+                "-f", codec,
+                output_file, "-y"
+            ]
+
+            logger.debug(f"Running standalone ffmpeg command: {' '.join(command)}")
+            logger.info("Starting standalone audio conversion...")
+
+            try:
+                run_tracked(command, timeout=self._timeout(degraded))
+            except subprocess.TimeoutExpired:
+                logger.error(f"Standalone conversion timeout for {input_file} after {self._timeout(degraded):g}s")
+                raise ConversionTimeoutError(f"Timeout after {self._timeout(degraded):g}s for {input_file}")
+            except subprocess.CalledProcessError as e:
+                logger.error(f"ffmpeg failed with return code {e.returncode}: {e.stderr}")
+                raise ConversionError(f"ffmpeg error (code {e.returncode}): {e.stderr.strip()}", e.returncode, e.stderr)
+            except Exception as e:
+                logger.error(f"Unexpected error during standalone conversion: {e}")
+                raise ConversionError(f"Unexpected conversion error: {e}")
 
         conversion_time = time.time() - start_time
         logger.info(f"Standalone conversion completed in {conversion_time:.2f}s")
 
         return {
             "conversion_time": conversion_time,
-            "command": " ".join(command)
+            "command": " ".join(command),
+            "codec": codec,
+            "streams_encoded": 1,
+            "channels_encoded": profile["channels"],
+            "duration_seconds": duration_seconds,
         }
 
+    def probe_file(self, file_path: str) -> Dict[str, Any]:
+        """Probe every stream plus the container format in one ffprobe call.
+
+        Returns ``{"streams": [...], "format": {...}}``; both are empty when
+        the probe fails.
+        """
+        command = [
+            "ffprobe", "-i", file_path, "-show_streams", "-show_format",
+            "-loglevel", "error", "-print_format", "json"
+        ]
+
+        result = run_probe(command)
+        if result.returncode != 0:
+            logger.warning(f"Failed to probe {file_path}")
+            return {"streams": [], "format": {}}
+
+        try:
+            data = json.loads(result.stdout)
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse probe output for {file_path}")
+            return {"streams": [], "format": {}}
+        return {"streams": data.get("streams", []), "format": data.get("format", {})}
+
+    def probe_frames(self, file_path: str, audio_index: int, read_intervals: str) -> List[Dict[str, Any]]:
+        """Decode only the frames selected by ``read_intervals`` from one audio stream.
+
+        ``read_intervals`` uses ffprobe syntax (e.g. ``0%+#5,600%+#5``), so
+        ffprobe seeks and reads a few packets per interval instead of the
+        whole file.
+        """
+        command = [
+            "ffprobe", "-loglevel", "error",
+            "-select_streams", f"a:{audio_index}",
+            "-read_intervals", read_intervals,
+            "-show_entries", "frame=pts_time,channels,nb_samples",
+            "-print_format", "json", file_path
+        ]
+
+        result = run_probe(command)
+        if result.returncode != 0:
+            logger.warning(f"Failed to decode sample frames from {file_path}: {result.stderr.strip()}")
+            return []
+
+        try:
+            return json.loads(result.stdout).get("frames", [])
+        except json.JSONDecodeError:
+            logger.error(f"Failed to parse sample frames for {file_path}")
+            return []
+
+    def lossless_tracks_redundant(self, file_path: str) -> bool:
+        """True if every DTS/TrueHD track of ``file_path`` has a compatible twin."""
+        streams = self.get_audio_streams_info(file_path)
+        lossless = [
+            i for i, stream in enumerate(streams)
+            if (stream.get("codec_name") or "").lower() in ("dts", "truehd")
+        ]
+        redundant = find_redundant_tracks(streams, config.target.codec_for(file_path))
+        return bool(lossless) and all(i in redundant for i in lossless)
+
     def get_audio_streams_info(self, file_path: str) -> List[Dict[str, Any]]:
         """Get detailed information about audio streams."""
         command = [
@@ -252,7 +553,7 @@ class AudioProcessor:
             "-loglevel", "error", "-print_format", "json"
         ]
 
-        result = subprocess.run(command, capture_output=True, text=True)
+        result = run_probe(command)
         if result.returncode != 0:
             logger.warning(f"Failed to get audio streams info for {file_path}")
             return []
@@ -0,0 +1,116 @@
+import logging
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional
+
+from .config import BandwidthConfig, config, in_time_window, parse_time_window
+
+logger = logging.getLogger("eac3_converter")
+
+MB = 1_000_000
+
+# A remux writes roughly as many bytes as it reads, so a cap on the link is
+# split evenly between the two directions.
+IO_DIRECTIONS = 2
+
+
+class BandwidthLimiter:
+    """Turns MB/s caps into an ffmpeg ``-readrate`` for each conversion.
+
+    ``-readrate`` throttles input to a multiple of the file's native bitrate,
+    so a cap is converted using the file's size and duration. ffmpeg can't
+    change the rate mid-run, so every job gets a fixed share sized for the
+    most jobs that can ever run at once (``slots``, per device for mount
+    caps): however many run, their total stays under the cap. A job that may
+    still be running when BANDWIDTH_DAY_WINDOW opens gets the daytime cap.
+    """
+
+    def __init__(
+        self,
+        cfg: BandwidthConfig,
+        clock: Callable[[], datetime] = datetime.now,
+        slots: Callable[[], int] = lambda: config.concurrency.peak_jobs(),
+        device_slots: Callable[[], int] = lambda: config.concurrency.per_device_jobs,
+    ):
+        self.cfg = cfg
+        self.clock = clock
+        self.slots = slots
+        self.device_slots = device_slots
+        self.day_window = parse_time_window(cfg.day_window)
+
+    @property
+    def enabled(self) -> bool:
+        return self.cfg.limit_mbps > 0 or self.cfg.day_limit_mbps > 0 or bool(self.cfg.mount_limits)
+
+    def global_cap_mbps(self, seconds: float = 0.0) -> float:
+        """Tightest global cap in force at some point of the next ``seconds`` (0 = none)."""
+        if self.cfg.day_limit_mbps <= 0:
+            return self.cfg.limit_mbps
+        now = self.clock()
+        start = now.hour * 60 + now.minute
+        minutes = range(start, start + min(int(seconds // 60) + 1, 24 * 60))
+        caps = []
+        if any(in_time_window(self.day_window, minute % (24 * 60)) for minute in minutes):
+            caps.append(self.cfg.day_limit_mbps)
+        if self.cfg.limit_mbps > 0 and \
+                not all(in_time_window(self.day_window, minute % (24 * 60)) for minute in minutes):
+            caps.append(self.cfg.limit_mbps)
+        return min(caps) if caps else 0.0
+
+    def mount_for(self, path: str) -> Optional[str]:
+        """Longest configured mount prefix containing ``path``."""
+        path = os.path.abspath(path)
+        best = None
+        for mount, _ in self.cfg.mount_limits:
+            if (path == mount or path.startswith(mount.rstrip("/") + "/")) and \
+                    (best is None or len(mount) > len(best)):
+                best = mount
+        return best
+
+    def share_bytes_per_second(self, mount: Optional[str], seconds: float = 0.0) -> Optional[float]:
+        """Read rate of one job running for ``seconds``; None if uncapped."""
+        slots = max(1, self.slots())
+        shares = []
+        cap = self.global_cap_mbps(seconds)
+        if cap > 0:
+            shares.append(cap * MB / slots)
+        if mount is not None:
+            mount_cap = dict(self.cfg.mount_limits)[mount]
+            if mount_cap > 0:
+                device_slots = self.device_slots()
+                shares.append(mount_cap * MB / (min(device_slots, slots) if device_slots > 0 else slots))
+        return min(shares) / IO_DIRECTIONS if shares else None
+
+    @contextmanager
+    def session(self, path: str, duration_seconds: float) -> Iterator[List[str]]:
+        """Yield the ffmpeg input options for a conversion of ``path``."""
+        if not self.enabled:
+            yield []
+            return
+
+        try:
+            input_bytes = os.path.getsize(path)
+        except OSError:
+            input_bytes = 0
+        mount = self.mount_for(path)
+        share = self.share_bytes_per_second(mount)
+        # The job can't outlive its timeout; at the capped rate it usually ends sooner.
+        runtime = config.ffmpeg.timeout_seconds
+        if share is not None and input_bytes > 0:
+            runtime = min(runtime, input_bytes / share)
+        share = self.share_bytes_per_second(mount, runtime)
+        if share is None or input_bytes <= 0 or duration_seconds <= 0:
+            if share is not None:
+                logger.debug(f"Bandwidth cap not applied to {path}: unknown duration")
+            yield []
+            return
+        readrate = share / (input_bytes / duration_seconds)
+        logger.info(
+            f"Bandwidth cap: reading {os.path.basename(path)} at {share / MB:.1f} MB/s "
+            f"(-readrate {readrate:.2f})"
+        )
+        yield ["-readrate", f"{readrate:.3f}"]
+
+
+limiter = BandwidthLimiter(config.bandwidth)
@@ -1,8 +1,16 @@
 import json
 import logging
+import os
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional
+
+from .config import INPUT_DIR
 
 logger = logging.getLogger("eac3_converter")
 
@@ -18,27 +26,352 @@ CREATE TABLE IF NOT EXISTS processed_files (
     metadata_json TEXT
 );
 CREATE INDEX IF NOT EXISTS idx_path ON processed_files(path);
+
+CREATE TABLE IF NOT EXISTS conversion_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file_key TEXT NOT NULL,
+    path TEXT NOT NULL,
+    timestamp TEXT,
+    kind TEXT,
+    codec TEXT,
+    input_bytes INTEGER,
+    output_bytes INTEGER,
+    duration_seconds REAL,
+    streams_encoded INTEGER,
+    channels_encoded INTEGER,
+    encode_speed REAL,
+    probe_seconds REAL,
+    encode_seconds REAL,
+    verify_seconds REAL,
+    replace_seconds REAL,
+    wall_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON conversion_history(timestamp);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    command TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    wall_seconds REAL,
+    files_scanned INTEGER,
+    cache_hits INTEGER,
+    probes INTEGER,
+    conversions INTEGER,
+    failures INTEGER,
+    skipped INTEGER,
+    bytes_before INTEGER,
+    bytes_after INTEGER,
+    encode_seconds REAL,
+    peak_concurrency INTEGER
+);
 """
 
+HISTORY_COLUMNS = (
+    "file_key", "path", "timestamp", "kind", "codec",
+    "input_bytes", "output_bytes", "duration_seconds",
+    "streams_encoded", "channels_encoded", "encode_speed",
+    "probe_seconds", "encode_seconds", "verify_seconds", "replace_seconds", "wall_seconds",
+)
+
+RUN_COLUMNS = (
+    "command", "started_at", "finished_at", "wall_seconds",
+    "files_scanned", "cache_hits", "probes", "conversions", "failures", "skipped",
+    "bytes_before", "bytes_after", "encode_seconds", "peak_concurrency",
+)
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+
+# Max number of queued writes committed in a single transaction.
+WRITE_BATCH_SIZE = 256
+
+# A batch whose transaction can't start or commit (e.g. the DB is held by a
+# concurrent ``cache import`` past the busy timeout) is retried this many
+# times, waiting WRITE_RETRY_SECONDS, then twice as long, and so on.
+WRITE_ATTEMPTS = 5
+WRITE_RETRY_SECONDS = 0.5
+
+# Rows deleted per transaction during maintenance, so the writer never holds
+# the write lock for long.
+PRUNE_BATCH_SIZE = 500
+
+_STOP = object()
+
+
+def make_file_key(path: str, size: int, mtime: float) -> str:
+    """Cache key of a file: ``<path>_<size>_<mtime>``."""
+    return f"{path}_{size}_{mtime}"
+
 
 class CacheManager:
-    """SQLite-backed cache of processed files."""
+    """SQLite-backed cache of processed files.
+
+    Safe to share between worker threads. Reads go through one connection per
+    thread; writes are queued and applied by a single background writer
+    thread, so callers never wait on SQLite write locks. Entries that are
+    still queued are visible to ``is_processed`` immediately.
+    """
 
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(str(self.db_path), isolation_level=None)
-        self.conn.execute("PRAGMA journal_mode=WAL;")
-        self.conn.execute("PRAGMA synchronous=NORMAL;")
-        self.conn.executescript(SCHEMA)
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._local = threading.local()
+        self._readers: list[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._closed = False
+
+        self._writer_conn = self._connect()
+        self._enable_incremental_vacuum(self._writer_conn)
+        self._writer_conn.execute("PRAGMA journal_mode=WAL;")
+        self._writer_conn.executescript(SCHEMA)
+        self._add_missing_columns(self._writer_conn, "conversion_history", HISTORY_COLUMNS)
+        self._add_missing_columns(self._writer_conn, "runs", RUN_COLUMNS)
+
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="cache-writer", daemon=True
+        )
+        self._writer.start()
         logger.info(f"Cache DB opened at {self.db_path} ({self.get_cache_size()} entries)")
 
-    def is_processed(self, file_key: str) -> bool:
+    @staticmethod
+    def _enable_incremental_vacuum(conn: sqlite3.Connection) -> None:
+        """Switch the DB to incremental auto-vacuum.
+
+        A fresh DB just needs the pragma. DBs created before it was enabled
+        are converted once with a full VACUUM, which is only possible outside
+        WAL mode and before any other connection is opened.
+        """
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return
+        has_tables = conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        if has_tables:
+            logger.info("Converting cache DB to incremental auto-vacuum (one-off full VACUUM)")
+            conn.execute("PRAGMA journal_mode=DELETE;").fetchall()
+            conn.execute("VACUUM")
+
+    @staticmethod
+    def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: tuple) -> None:
+        """Bring a table created by an older version up to date.
+
+        New columns are always nullable, so ADD COLUMN without a type is enough.
+        """
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for column in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.db_path), isolation_level=None, check_same_thread=False
+        )
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)};")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        return conn
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Read connection owned by the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def release_connection(self) -> None:
+        """Close the calling thread's read connection, if it has one.
+
+        Call it before a short-lived thread (e.g. one conversion job) exits;
+        otherwise its connection and file descriptors stay open until close().
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._readers_lock:
+            # close() may already have closed it.
+            if conn in self._readers:
+                self._readers.remove(conn)
+                conn.close()
+
+    # --- writer thread ----------------------------------------------------
+
+    def _writer_loop(self) -> None:
+        conn = self._writer_conn
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while item is not _STOP and len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+
+            ops = [op for op in batch if op is not _STOP]
+            group: list = []
+            for op in ops:
+                fn, future, transactional, on_done, label = op
+                if transactional:
+                    group.append((fn, future, on_done, label))
+                    continue
+                if group:
+                    self._apply_batch(conn, group)
+                    group = []
+                self._apply_single(conn, fn, future)
+            if group:
+                self._apply_batch(conn, group)
+            for _ in batch:
+                self._queue.task_done()
+            if len(ops) != len(batch):
+                return
+
+    @staticmethod
+    def _apply_single(conn: sqlite3.Connection, fn: Callable, future: Optional[Future]) -> None:
+        """Run an op outside any transaction (VACUUM, checkpoints)."""
+        try:
+            result = fn(conn)
+        except Exception as e:
+            logger.error(f"Cache maintenance statement failed: {e}")
+            if future is not None:
+                future.set_exception(e)
+            return
+        if future is not None:
+            future.set_result(result)
+
+    def _apply_batch(self, conn: sqlite3.Connection, ops: list) -> None:
+        """Apply ``ops`` in one transaction, retrying it while SQLite is busy.
+
+        An op that raises is dropped on its own; the others still commit.
+        ``on_done(committed)`` runs once each op's fate is final, so queued
+        state (``_pending``) is only released after the commit.
+        """
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                results = self._try_batch(conn, ops)
+                break
+            except sqlite3.Error as e:
+                if attempt == WRITE_ATTEMPTS:
+                    logger.error(f"Cache writer gave up on a batch of {len(ops)} write(s): {e}")
+                    results = [(None, e)] * len(ops)
+                    break
+                delay = WRITE_RETRY_SECONDS * 2 ** (attempt - 1)
+                logger.warning(
+                    f"Cache writer: {e}; retrying {len(ops)} write(s) in {delay:.1f}s "
+                    f"(attempt {attempt}/{WRITE_ATTEMPTS})"
+                )
+                time.sleep(delay)
+
+        for (_, future, on_done, label), (result, error) in zip(ops, results):
+            if error is not None and future is None:
+                logger.error(f"Cache write dropped: {label or 'unlabelled write'}: {error}")
+            if on_done is not None:
+                on_done(error is None)
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _try_batch(conn: sqlite3.Connection, ops: list) -> list:
+        """One attempt at ``ops``: (result, error) per op, or raise if the transaction failed."""
+        conn.execute("BEGIN IMMEDIATE")
+        results = []
+        for fn, _, _, _ in ops:
+            try:
+                results.append((fn(conn), None))
+            except Exception as e:
+                logger.error(f"Cache write failed: {e}")
+                results.append((None, e))
+        try:
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return results
+
+    def _submit(
+        self,
+        fn: Callable[[sqlite3.Connection], Any],
+        wait: bool = False,
+        transactional: bool = True,
+        on_done: Optional[Callable[[bool], None]] = None,
+        label: str = "",
+    ) -> Any:
+        """Queue ``fn(conn)`` for the writer thread.
+
+        With ``wait=True`` block until it has been committed and return its
+        result; otherwise return immediately. ``transactional=False`` runs
+        the op on its own, outside a transaction. ``on_done(committed)`` is
+        called by the writer once the op has committed or been dropped;
+        ``label`` names the op in the log if it is dropped.
+
+        After close() a write that waits for its result raises RuntimeError;
+        any other write is dropped and logged.
+        """
+        if self._closed:
+            if wait:
+                raise RuntimeError("cache is closed")
+            logger.warning(f"Cache write dropped: {label or 'unlabelled write'}: cache is closed")
+            if on_done is not None:
+                on_done(False)
+            return None
+        future: Optional[Future] = Future() if wait else None
+        self._queue.put((fn, future, transactional, on_done, label))
+        return future.result() if future is not None else None
+
+    def flush(self) -> None:
+        """Block until every queued write has been committed."""
+        if not self._closed:
+            self._queue.join()
+
+    # --- public API -------------------------------------------------------
+
+    @staticmethod
+    def _retry_due(action: Optional[str], retry_after: Optional[str], now: str) -> bool:
+        return action == "failed" and bool(retry_after) and retry_after <= now
+
+    def is_processed(self, file_key: str, now: Optional[datetime] = None) -> bool:
+        """True if ``file_key`` has an outcome, unless it is a failure due for retry."""
+        now_iso = (now or datetime.now()).isoformat()
+        with self._pending_lock:
+            pending = self._pending.get(file_key)
+        if pending is not None:
+            return not self._retry_due(pending.get("action"), pending.get("retry_after"), now_iso)
         row = self.conn.execute(
-            "SELECT 1 FROM processed_files WHERE file_key = ? LIMIT 1",
+            "SELECT action, json_extract(metadata_json, '$.retry_after') "
+            "FROM processed_files WHERE file_key = ? LIMIT 1",
             (file_key,),
         ).fetchone()
-        return row is not None
+        return row is not None and not self._retry_due(row[0], row[1], now_iso)
+
+    def get_outcome(self, file_key: str) -> Optional[Dict[str, Any]]:
+        """The recorded outcome of ``file_key`` (``action`` plus its metadata), or None."""
+        with self._pending_lock:
+            pending = self._pending.get(file_key)
+        if pending is not None:
+            return dict(pending)
+        row = self.conn.execute(
+            "SELECT action, metadata_json FROM processed_files WHERE file_key = ? LIMIT 1",
+            (file_key,),
+        ).fetchone()
+        if row is None:
+            return None
+        try:
+            metadata = json.loads(row[1]) if row[1] else {}
+        except json.JSONDecodeError:
+            metadata = {}
+        return {**metadata, "action": row[0]}
 
     def mark_processed(self, file_key: str, metadata: Dict[str, Any]) -> None:
         path = metadata.get("path", "")
@@ -50,20 +383,299 @@ class CacheManager:
             k: v for k, v in metadata.items()
             if k not in ("path", "size", "mtime", "action", "timestamp")
         }
-        self.conn.execute(
-            "INSERT OR REPLACE INTO processed_files "
-            "(file_key, path, size, mtime, action, timestamp, metadata_json) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (file_key, path, size, mtime, action, timestamp, json.dumps(extras)),
+        row = (file_key, path, size, mtime, action, timestamp, json.dumps(extras))
+
+        with self._pending_lock:
+            self._pending[file_key] = metadata
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT OR REPLACE INTO processed_files "
+                "(file_key, path, size, mtime, action, timestamp, metadata_json) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                row,
+            )
+
+        def done(committed: bool) -> None:
+            # Committed rows are readable from disk now; a dropped one must
+            # not look processed either.
+            with self._pending_lock:
+                if self._pending.get(file_key) is metadata:
+                    del self._pending[file_key]
+
+        self._submit(write, on_done=done, label=f"{action} {path or file_key}")
+
+    def record_history(self, entry: Dict[str, Any]) -> None:
+        """Append one successful conversion to ``conversion_history``.
+
+        Keys not in HISTORY_COLUMNS are ignored; missing ones are stored as NULL.
+        """
+        values = tuple(entry.get(column) for column in HISTORY_COLUMNS)
+        placeholders = ", ".join("?" for _ in HISTORY_COLUMNS)
+        self._submit(lambda conn: conn.execute(
+            f"INSERT INTO conversion_history ({', '.join(HISTORY_COLUMNS)}) "
+            f"VALUES ({placeholders})",
+            values,
+        ), label=f"history of {entry.get('path')}")
+
+    def get_history(self, limit: int = 1000) -> list[Dict[str, Any]]:
+        """Most recent conversions first, as dicts keyed by column name."""
+        self.flush()
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(HISTORY_COLUMNS)} FROM conversion_history "
+            "ORDER BY id DESC LIMIT ?",
+            (limit,),
+        )
+        return [dict(zip(HISTORY_COLUMNS, row)) for row in cursor.fetchall()]
+
+    def record_run(self, run: Dict[str, Any]) -> None:
+        """Append one processing run to ``runs`` (see RunStats.finish)."""
+        values = tuple(run.get(column) for column in RUN_COLUMNS)
+        placeholders = ", ".join("?" for _ in RUN_COLUMNS)
+        self._submit(lambda conn: conn.execute(
+            f"INSERT INTO runs ({', '.join(RUN_COLUMNS)}) VALUES ({placeholders})",
+            values,
+        ), label=f"run started {run.get('started_at')}")
+
+    def get_runs(self, limit: int = 30) -> list[Dict[str, Any]]:
+        """Most recent runs first, as dicts keyed by column name."""
+        self.flush()
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(RUN_COLUMNS)} FROM runs ORDER BY id DESC LIMIT ?",
+            (limit,),
         )
+        return [dict(zip(RUN_COLUMNS, row)) for row in cursor.fetchall()]
+
+    def get_outcome_counts(self) -> list[tuple[str, str, int]]:
+        """(action, reason, count) over the whole cache, most frequent first."""
+        self.flush()
+        return self.conn.execute(
+            "SELECT action, COALESCE(json_extract(metadata_json, '$.reason'), ''), COUNT(*) "
+            "FROM processed_files GROUP BY 1, 2 ORDER BY 3 DESC"
+        ).fetchall()
+
+    def get_history_totals(self) -> Dict[str, Any]:
+        """Aggregates over ``conversion_history``."""
+        self.flush()
+        row = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(input_bytes), 0), COALESCE(SUM(output_bytes), 0), "
+            "COALESCE(SUM(encode_seconds), 0), AVG(encode_speed), MIN(timestamp), MAX(timestamp) "
+            "FROM conversion_history"
+        ).fetchone()
+        keys = (
+            "conversions", "input_bytes", "output_bytes", "encode_seconds",
+            "avg_encode_speed", "first", "last",
+        )
+        return dict(zip(keys, row))
 
     def get_cache_size(self) -> int:
+        self.flush()
         row = self.conn.execute("SELECT COUNT(*) FROM processed_files").fetchone()
         return int(row[0]) if row else 0
 
+    # --- maintenance --------------------------------------------------------
+
+    @staticmethod
+    def _path_from_key(file_key: str) -> str:
+        """Recover the file path from a ``<path>_<size>_<mtime>`` key."""
+        parts = file_key.rsplit("_", 2)
+        return parts[0] if len(parts) == 3 else file_key
+
+    def iter_entries(self) -> Iterator[Dict[str, Any]]:
+        """Every ``processed_files`` row, with ``metadata_json`` decoded.
+
+        Legacy rows without path/size/mtime columns get them from the key.
+        """
+        self.flush()
+        cursor = self.conn.execute(
+            "SELECT file_key, path, size, mtime, action, timestamp, metadata_json FROM processed_files"
+        )
+        for file_key, path, size, mtime, action, timestamp, metadata_json in cursor:
+            if not path or size is None or mtime is None:
+                parts = file_key.rsplit("_", 2)
+                if len(parts) == 3:
+                    try:
+                        path, size, mtime = path or parts[0], int(parts[1]), float(parts[2])
+                    except ValueError:
+                        pass
+            try:
+                metadata = json.loads(metadata_json) if metadata_json else {}
+            except json.JSONDecodeError:
+                metadata = {}
+            yield {
+                "file_key": file_key, "path": path or self._path_from_key(file_key),
+                "size": size, "mtime": mtime, "action": action, "timestamp": timestamp,
+                "metadata": metadata,
+            }
+
+    def import_entries(self, entries: Iterable[Dict[str, Any]], overwrite: bool = False) -> int:
+        """Insert entries shaped like ``iter_entries`` output, in batches.
+
+        Existing keys are kept unless ``overwrite``. Returns the number of
+        rows written.
+        """
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        sql = (
+            f"{verb} INTO processed_files "
+            "(file_key, path, size, mtime, action, timestamp, metadata_json) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)"
+        )
+        written = 0
+        batch: list[tuple] = []
+
+        def apply(rows: list[tuple]) -> int:
+            return self._submit(lambda conn: conn.executemany(sql, rows).rowcount, wait=True)
+
+        for entry in entries:
+            batch.append((
+                entry["file_key"], entry["path"], entry["size"], entry["mtime"],
+                entry["action"], entry["timestamp"], json.dumps(entry.get("metadata") or {}),
+            ))
+            if len(batch) >= PRUNE_BATCH_SIZE:
+                written += apply(batch)
+                batch = []
+        if batch:
+            written += apply(batch)
+        return written
+
+    @staticmethod
+    def _library_root(path: str, input_dir: str) -> str:
+        """Top-level directory under ``input_dir`` holding ``path`` (its parent outside it)."""
+        relative = os.path.relpath(path, input_dir)
+        if relative.startswith(os.pardir) or os.path.isabs(relative):
+            return os.path.dirname(path)
+        top = relative.split(os.sep, 1)[0]
+        return input_dir if top == relative else os.path.join(input_dir, top)
+
+    @staticmethod
+    def _root_available(root: str) -> bool:
+        """True if ``root`` exists, is readable and not empty (i.e. its mount is up)."""
+        try:
+            with os.scandir(root) as entries:
+                return next(entries, None) is not None
+        except OSError:
+            return False
+
+    def prune_missing(
+        self,
+        exists: Callable[[str], bool] = os.path.exists,
+        input_dir: str = INPUT_DIR,
+    ) -> int:
+        """Delete rows whose file no longer exists. Returns the row count.
+
+        Rows are grouped by library root (the top-level directory under
+        ``input_dir``). A root that is missing, unreadable or empty is most
+        likely an NFS/SMB mount that is down, so its rows are kept.
+        """
+        self.flush()
+        rows = self.conn.execute("SELECT file_key, path FROM processed_files").fetchall()
+        roots: Dict[str, bool] = {}
+        dead = []
+        skipped = 0
+        for key, path in rows:
+            path = path or self._path_from_key(key)
+            root = self._library_root(path, input_dir)
+            if root not in roots:
+                roots[root] = self._root_available(root)
+            if not roots[root]:
+                skipped += 1
+            elif not exists(path):
+                dead.append((key,))
+        if skipped:
+            unavailable = sorted(root for root, available in roots.items() if not available)
+            logger.warning(
+                f"Cache prune skipped {skipped} entries under {len(unavailable)} missing or empty "
+                f"root(s): {', '.join(unavailable[:5])}{' ...' if len(unavailable) > 5 else ''}"
+            )
+        for start in range(0, len(dead), PRUNE_BATCH_SIZE):
+            chunk = dead[start:start + PRUNE_BATCH_SIZE]
+            self._submit(
+                lambda conn, chunk=chunk: conn.executemany(
+                    "DELETE FROM processed_files WHERE file_key = ?", chunk
+                ),
+                wait=True,
+            )
+        return len(dead)
+
+    def expire_transient(self, failed_ttl_hours: float, disk_space_ttl_hours: float) -> int:
+        """Forget transient outcomes older than their TTL so they get retried.
+
+        A TTL of 0 keeps the outcome forever. Returns the number of rows removed.
+        """
+        rules = [
+            ("action = 'failed'", failed_ttl_hours),
+            ("action = 'skipped' AND "
+             "json_extract(metadata_json, '$.reason') = 'insufficient_disk_space'",
+             disk_space_ttl_hours),
+        ]
+        removed = 0
+        for condition, ttl_hours in rules:
+            if ttl_hours <= 0:
+                continue
+            cutoff = (datetime.now() - timedelta(hours=ttl_hours)).isoformat()
+            removed += self._submit(
+                lambda conn, condition=condition, cutoff=cutoff: conn.execute(
+                    f"DELETE FROM processed_files WHERE {condition} "
+                    "AND timestamp IS NOT NULL AND timestamp < ?",
+                    (cutoff,),
+                ).rowcount,
+                wait=True,
+            )
+        return removed
+
+    def _db_bytes(self) -> int:
+        total = 0
+        for suffix in ("", "-wal"):
+            try:
+                total += os.path.getsize(f"{self.db_path}{suffix}")
+            except OSError:
+                pass
+        return total
+
+    def vacuum(self) -> None:
+        """Return free pages to the filesystem, refresh stats, truncate the WAL."""
+        def compact(conn: sqlite3.Connection) -> None:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+            conn.execute("ANALYZE")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+        self._submit(compact, wait=True, transactional=False)
+
+    def run_maintenance(self, failed_ttl_hours: float, disk_space_ttl_hours: float) -> Dict[str, int]:
+        """Prune vanished files, expire transient outcomes and compact the DB."""
+        bytes_before = self._db_bytes()
+        pruned = self.prune_missing()
+        expired = self.expire_transient(failed_ttl_hours, disk_space_ttl_hours)
+        self.vacuum()
+        report = {
+            "pruned": pruned,
+            "expired": expired,
+            "bytes_reclaimed": max(0, bytes_before - self._db_bytes()),
+            "entries": self.get_cache_size(),
+        }
+        logger.info(
+            f"Cache maintenance: pruned {pruned} vanished, expired {expired} transient, "
+            f"reclaimed {report['bytes_reclaimed']} bytes ({report['entries']} entries left)"
+        )
+        return report
+
     def close(self) -> None:
+        """Drain queued writes, stop the writer thread and close connections.
+
+        Safe to call more than once (e.g. from a signal handler and a
+        ``finally`` block).
+        """
+        if self._closed:
+            return
+        self._closed = True
         try:
-            self.conn.close()
+            self._queue.put(_STOP)
+            self._writer.join()
+            self._writer_conn.close()
+            with self._readers_lock:
+                for conn in self._readers:
+                    conn.close()
+                self._readers.clear()
             logger.debug("Cache DB connection closed")
         except Exception as e:
             logger.warning(f"Error closing cache DB: {e}")
@@ -0,0 +1,104 @@
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .cache_manager import CacheManager, make_file_key
+
+logger = logging.getLogger("eac3_converter")
+
+FORMAT = "eac3-converter-cache"
+VERSION = 1
+
+# Entry fields written to the export; the key is rebuilt from them on import.
+EXPORT_FIELDS = ("path", "size", "mtime", "action", "timestamp", "metadata")
+# Metadata values that are library paths and get the same remap as "path".
+PATH_METADATA = ("output_file", "hardlink_of")
+
+
+def parse_remap(rule: str) -> Tuple[str, str]:
+    """``"/app/input/folder1=/app/input/movies"`` -> (old prefix, new prefix)."""
+    old, sep, new = rule.partition("=")
+    if not sep or not old.strip() or not new.strip():
+        raise ValueError(f"Invalid remap rule {rule!r} (expected OLD_PREFIX=NEW_PREFIX)")
+    return old.strip().rstrip("/") or "/", new.strip().rstrip("/") or "/"
+
+
+def remap_path(path: str, rules: List[Tuple[str, str]]) -> str:
+    """Rewrite ``path`` with the longest matching prefix rule.
+
+    Prefixes only match whole path components, so ``/a/movies`` doesn't
+    rewrite ``/a/movies-4k``.
+    """
+    for old, new in sorted(rules, key=lambda rule: len(rule[0]), reverse=True):
+        if path == old:
+            return new
+        if path.startswith(old.rstrip("/") + "/"):
+            return new.rstrip("/") + path[len(old.rstrip("/")):]
+    return path
+
+
+def export_cache(cache: CacheManager, output_path: str) -> int:
+    """Write every cache entry as gzipped JSON lines. Returns the entry count."""
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    count = 0
+    tmp_path = f"{output_path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        header = {"format": FORMAT, "version": VERSION, "exported_at": datetime.now().isoformat()}
+        f.write(json.dumps(header) + "\n")
+        for entry in cache.iter_entries():
+            if entry["size"] is None or entry["mtime"] is None:
+                logger.debug(f"Not exporting {entry['file_key']}: no size/mtime to rebuild its key")
+                continue
+            f.write(json.dumps({field: entry[field] for field in EXPORT_FIELDS}, separators=(",", ":")) + "\n")
+            count += 1
+    os.replace(tmp_path, output_path)
+    logger.info(f"Exported {count} cache entries to {output_path}")
+    return count
+
+
+def _read_entries(input_path: str, rules: List[Tuple[str, str]], stats: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+    with gzip.open(input_path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != FORMAT or header.get("version") != VERSION:
+            raise ValueError(f"{input_path} is not a version {VERSION} cache export")
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            path = remap_path(entry["path"], rules)
+            if path != entry["path"]:
+                stats["remapped"] += 1
+            stats["read"] += 1
+            metadata = dict(entry.get("metadata") or {})
+            for field in PATH_METADATA:
+                if isinstance(metadata.get(field), str):
+                    metadata[field] = remap_path(metadata[field], rules)
+            yield {
+                **entry,
+                "path": path,
+                "metadata": metadata,
+                "file_key": make_file_key(path, entry["size"], entry["mtime"]),
+            }
+
+
+def import_cache(
+    cache: CacheManager,
+    input_path: str,
+    rules: List[Tuple[str, str]],
+    overwrite: bool = False,
+) -> Dict[str, int]:
+    """Load an export, rewriting paths and keys with ``rules``.
+
+    Returns counts of entries read, remapped and written; existing entries
+    are kept unless ``overwrite``.
+    """
+    stats = {"read": 0, "remapped": 0, "written": 0}
+    stats["written"] = cache.import_entries(_read_entries(input_path, rules, stats), overwrite=overwrite)
+    logger.info(
+        f"Imported {stats['written']} of {stats['read']} cache entries from {input_path} "
+        f"({stats['remapped']} path(s) remapped)"
+    )
+    return stats
@@ -0,0 +1,271 @@
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+from .audio_processor import AudioProcessor
+from .cache_manager import CacheManager
+from .cache_transfer import export_cache, import_cache, parse_remap
+from .config import config, INPUT_DIR
+from .file_processor import FileProcessor, temp_file_for
+from .planner import Planner
+from .run_stats import summarize_trend
+from .scheduler import Scheduler
+from .throughput import ThroughputModel
+
+logger = logging.getLogger("eac3_converter")
+
+DEFAULT_EXPORT = "/app/cache/cache-export.jsonl.gz"
+
+
+def _remap_rule(text: str) -> Tuple[str, str]:
+    try:
+        return parse_remap(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.main",
+        description="Convert DTS/TrueHD audio to EAC3. Without a command, runs the scheduled service.",
+    )
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+
+    commands.add_parser("run", help="run the scheduled service (default)")
+
+    convert = commands.add_parser(
+        "convert", help="process specific files or subtrees now, without a library scan",
+    )
+    convert.add_argument("paths", nargs="+", help="files or directories under the input dir")
+    convert.add_argument("--force", action="store_true", help="ignore existing cache entries")
+
+    scan = commands.add_parser("scan", help="list candidate files and their cache status")
+    scan.add_argument("paths", nargs="*", help=f"directories to scan (default: {INPUT_DIR})")
+    scan.add_argument("--json", action="store_true", help="machine-readable output")
+
+    plan = commands.add_parser("plan", help="write a dry-run conversion plan")
+    plan.add_argument("path", nargs="?", default=INPUT_DIR, help="directory to plan")
+    plan.add_argument(
+        "--output", default=None,
+        help=f"where to write the plan (default: PLAN_OUTPUT, {config.plan.output_path})",
+    )
+
+    stats = commands.add_parser("stats", help="summarise the cache and conversion history")
+    stats.add_argument("--json", action="store_true", help="machine-readable output")
+    stats.add_argument("--runs", type=int, default=10, metavar="N", help="recent runs to show (default: 10)")
+
+    cache = commands.add_parser("cache", help="cache administration")
+    cache_commands = cache.add_subparsers(dest="cache_command", metavar="ACTION", required=True)
+    cache_commands.add_parser("prune", help="prune vanished files, expire transient outcomes, vacuum")
+    export = cache_commands.add_parser("export", help="write cache entries to a portable gzipped JSONL file")
+    export.add_argument("file", nargs="?", default=DEFAULT_EXPORT, help=f"output file (default: {DEFAULT_EXPORT})")
+    import_ = cache_commands.add_parser("import", help="load an export, optionally rewriting path prefixes")
+    import_.add_argument("file", help="file written by 'cache export'")
+    import_.add_argument(
+        "--remap", action="append", default=[], type=_remap_rule, metavar="OLD=NEW",
+        help="rewrite paths starting with OLD to NEW (repeatable; longest prefix wins)",
+    )
+    import_.add_argument("--overwrite", action="store_true", help="replace entries that already exist")
+
+    bench = commands.add_parser("bench", help="measure scan rate and probe latency")
+    bench.add_argument("path", nargs="?", default=INPUT_DIR, help="directory to benchmark")
+    bench.add_argument("--probes", type=int, default=10, help="number of files to probe")
+
+    return parser
+
+
+def parse_args(argv: List[str] | None = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
+
+
+def cleanup_roots(args: argparse.Namespace, input_dir: str = INPUT_DIR) -> List[str]:
+    """Paths whose stale ``.temp_*`` files this command may remove.
+
+    Directories are swept recursively; for ``convert <file>`` only that
+    file's own temp file is listed, so a running service's temp files next
+    to it survive. Paths that don't exist or resolve outside ``input_dir``
+    are left alone.
+    """
+    if args.command in (None, "run"):
+        return [input_dir]
+    if args.command != "convert":
+        return []
+    root = os.path.realpath(input_dir)
+    targets = []
+    for path in map(os.path.realpath, args.paths):
+        if not os.path.exists(path) or os.path.commonpath([path, root]) != root:
+            continue
+        targets.append(path if os.path.isdir(path) else str(temp_file_for(path)))
+    return targets
+
+
+def _emit(data: Any, as_json: bool, lines: List[str]) -> None:
+    if as_json:
+        print(json.dumps(data, indent=2))
+    else:
+        print("\n".join(lines))
+
+
+def _collect_targets(file_processor: FileProcessor, paths: List[str]) -> tuple[List[str], List[str]]:
+    """Expand CLI paths into (mkv files, standalone audio files)."""
+    mkv_files: List[str] = []
+    audio_files: List[str] = []
+    for path in map(os.path.abspath, paths):
+        if os.path.isdir(path):
+            mkv_files.extend(file_processor.find_mkv_files(path))
+            if config.standalone_audio.enabled:
+                audio_files.extend(file_processor.find_standalone_audio_files(path))
+        elif path.endswith(".mkv"):
+            mkv_files.append(path)
+        elif file_processor.is_standalone_audio(path):
+            audio_files.append(path)
+        else:
+            logger.warning(f"Ignoring {path}: not a directory, MKV or standalone audio file")
+    return mkv_files, audio_files
+
+
+def cmd_convert(args: argparse.Namespace, file_processor: FileProcessor) -> int:
+    missing = [path for path in args.paths if not os.path.exists(path)]
+    if missing:
+        logger.error(f"Path(s) not found: {', '.join(missing)}")
+        return 2
+    mkv_files, audio_files = _collect_targets(file_processor, args.paths)
+    logger.info(f"Converting {len(mkv_files)} MKV and {len(audio_files)} standalone audio file(s)")
+    Scheduler(file_processor, use_profile=False).process_paths(mkv_files, audio_files, force=args.force)
+    return 0
+
+
+def cmd_scan(args: argparse.Namespace, file_processor: FileProcessor) -> int:
+    mkv_files, audio_files = _collect_targets(file_processor, args.paths or [INPUT_DIR])
+    entries = []
+    for kind, files in (("mkv", mkv_files), ("standalone", audio_files)):
+        for file_path in files:
+            metadata = file_processor.get_file_metadata(file_path)
+            if metadata is None:
+                continue
+            key = file_processor.generate_file_key(file_path, metadata)
+            status = "cached" if file_processor.cache_manager.is_processed(key) else "pending"
+            entries.append({"path": file_path, "kind": kind, "size": metadata["size"], "status": status})
+    pending = sum(1 for entry in entries if entry["status"] == "pending")
+    lines = [f"{entry['status']:7} {entry['path']}" for entry in entries]
+    lines.append(f"{len(entries)} file(s), {pending} pending")
+    _emit(entries, args.json, lines)
+    return 0
+
+
+def cmd_plan(args: argparse.Namespace, file_processor: FileProcessor) -> int:
+    planner = Planner(file_processor)
+    planner.write_plan(planner.build_plan(args.path), args.output or config.plan.output_path)
+    return 0
+
+
+def cmd_stats(args: argparse.Namespace, file_processor: FileProcessor) -> int:
+    cache = file_processor.cache_manager
+    outcomes = cache.get_outcome_counts()
+    totals = cache.get_history_totals()
+    model = ThroughputModel.fit(cache.get_history())
+    runs = cache.get_runs(args.runs)
+    trend = summarize_trend(runs)
+    data: Dict[str, Any] = {
+        "entries": sum(count for _, _, count in outcomes),
+        "outcomes": [
+            {"action": action, "reason": reason, "count": count}
+            for action, reason, count in outcomes
+        ],
+        "history": totals,
+        "throughput_model": {
+            "seconds_per_gb": model.seconds_per_gb,
+            "seconds_per_channel_hour": model.seconds_per_channel_hour,
+            "samples": model.samples,
+        },
+        "runs": runs,
+        "trend": trend,
+    }
+    lines = [f"Cache entries: {data['entries']}"]
+    lines += [
+        f"  {action or '-'}{f' ({reason})' if reason else ''}: {count}"
+        for action, reason, count in outcomes
+    ]
+    saved = totals["input_bytes"] - totals["output_bytes"]
+    lines.append(
+        f"Conversions recorded: {totals['conversions']}, "
+        f"{saved / 1e9:.1f} GB saved, {totals['encode_seconds'] / 3600:.1f}h encoding"
+    )
+    lines.append(model.describe())
+    if runs:
+        lines.append(f"Last {len(runs)} run(s):")
+        lines += [
+            f"  {run['started_at'][:16]}  {(run['wall_seconds'] or 0) / 60:7.1f} min  "
+            f"{run['files_scanned'] or 0:6d} scanned  {run['conversions'] or 0:4d} converted  "
+            f"{run['failures'] or 0:3d} failed  "
+            f"{((run['bytes_before'] or 0) - (run['bytes_after'] or 0)) / 1e9:6.1f} GB saved"
+            for run in runs
+        ]
+        if trend["wall_seconds_change"] is not None:
+            scanned = trend["files_scanned_change"]
+            lines.append(
+                f"Trend: run time {trend['wall_seconds_change']:+.0%}, "
+                f"files scanned {f'{scanned:+.0%}' if scanned is not None else 'n/a'} "
+                f"(newer vs older half of these runs)"
+            )
+    _emit(data, args.json, lines)
+    return 0
+
+
+def cmd_cache(args: argparse.Namespace, file_processor: FileProcessor) -> int:
+    cache = file_processor.cache_manager
+    if args.cache_command == "prune":
+        cache.run_maintenance(config.cache.failed_ttl_hours, config.cache.disk_space_ttl_hours)
+    elif args.cache_command == "export":
+        export_cache(cache, args.file)
+    elif args.cache_command == "import":
+        if not os.path.isfile(args.file):
+            logger.error(f"No such file: {args.file}")
+            return 2
+        try:
+            import_cache(cache, args.file, args.remap, overwrite=args.overwrite)
+        # Bad JSON or header, truncated or non-gzip data (gzip.BadGzipFile is
+        # an OSError), or an entry missing a field.
+        except (ValueError, KeyError, EOFError, OSError) as e:
+            logger.error(f"Cannot import {args.file}: {e}")
+            return 2
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace, file_processor: FileProcessor) -> int:
+    started = time.monotonic()
+    files = file_processor.find_mkv_files(args.path)
+    scan_seconds = time.monotonic() - started
+
+    probe_times = []
+    for file_path in files[:max(args.probes, 0)]:
+        probe_started = time.monotonic()
+        file_processor.audio_processor.has_dts_or_truehd(file_path)
+        probe_times.append(time.monotonic() - probe_started)
+
+    avg_probe_ms = sum(probe_times) / len(probe_times) * 1000 if probe_times else 0.0
+    print(
+        f"Scan: {len(files)} MKV file(s) in {scan_seconds:.2f}s "
+        f"({len(files) / scan_seconds if scan_seconds else 0:.0f} files/s)\n"
+        f"Probe: {len(probe_times)} file(s), {avg_probe_ms:.0f} ms average"
+    )
+    return 0
+
+
+COMMANDS = {
+    "convert": cmd_convert,
+    "scan": cmd_scan,
+    "plan": cmd_plan,
+    "stats": cmd_stats,
+    "cache": cmd_cache,
+    "bench": cmd_bench,
+}
+
+
+def dispatch(args: argparse.Namespace, cache_manager: CacheManager, audio_processor: AudioProcessor) -> int:
+    """Run a one-shot command (anything but ``run``) and return its exit code."""
+    file_processor = FileProcessor(cache_manager, audio_processor)
+    return COMMANDS[args.command](args, file_processor)
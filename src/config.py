@@ -39,15 +39,99 @@ def _env_float(name: str, default: float) -> float:
         raise ConfigError(f"Invalid float for {name}={value!r}: {e}")
 
 
+def parse_time_window(text: str) -> tuple[int, int]:
+    """``"HH:MM-HH:MM"`` -> (start, end) in minutes after midnight.
+
+    The window may wrap past midnight (``"22:00-06:00"``).
+    """
+    try:
+        start, end = (part.strip() for part in text.split("-"))
+        bounds = []
+        for part in (start, end):
+            hour, minute = map(int, part.split(":"))
+            if not (0 <= hour < 24 and 0 <= minute < 60):
+                raise ValueError("hour/minute out of range")
+            bounds.append(hour * 60 + minute)
+        return bounds[0], bounds[1]
+    except ValueError as e:
+        raise ConfigError(f"Invalid time window '{text}' (expected HH:MM-HH:MM): {e}")
+
+
+def in_time_window(window: tuple[int, int], minute_of_day: int) -> bool:
+    start, end = window
+    if start <= end:
+        return start <= minute_of_day < end
+    return minute_of_day >= start or minute_of_day < end
+
+
+def _env_window_jobs(name: str) -> tuple[tuple[str, int], ...]:
+    """``"01:00-07:00=4,19:00-23:00=0"`` -> ((window, jobs), ...)."""
+    entries = []
+    for item in _env_str(name, "").split(","):
+        if not item.strip():
+            continue
+        window, sep, value = item.rpartition("=")
+        try:
+            if not sep:
+                raise ValueError("expected HH:MM-HH:MM=JOBS")
+            jobs = int(value)
+            if jobs < 0:
+                raise ValueError("job count must be >= 0")
+            entries.append((window.strip(), jobs))
+        except ValueError as e:
+            raise ConfigError(f"Invalid entry {item.strip()!r} in {name}: {e}")
+    return tuple(entries)
+
+
+def _env_path_limits(name: str) -> tuple[tuple[str, float], ...]:
+    """``"/app/input/a=50,/app/input/b=20"`` -> ((path, value), ...)."""
+    limits = []
+    for item in _env_str(name, "").split(","):
+        if not item.strip():
+            continue
+        path, sep, value = item.rpartition("=")
+        try:
+            if not sep or not path.strip():
+                raise ValueError("expected PATH=VALUE")
+            limits.append((path.strip().rstrip("/") or "/", float(value)))
+        except ValueError as e:
+            raise ConfigError(f"Invalid entry {item.strip()!r} in {name}: {e}")
+    return tuple(limits)
+
+
+def _env_prefix_map(name: str) -> tuple[tuple[str, str], ...]:
+    """``"/movies=/app/input/movies,/tv=/app/input/tv"`` -> ((old, new), ...)."""
+    rules = []
+    for item in _env_str(name, "").split(","):
+        if not item.strip():
+            continue
+        old, sep, new = item.partition("=")
+        if not sep or not old.strip() or not new.strip():
+            raise ConfigError(f"Invalid entry {item.strip()!r} in {name}: expected OLD_PREFIX=NEW_PREFIX")
+        rules.append((old.strip().rstrip("/") or "/", new.strip().rstrip("/") or "/"))
+    return tuple(rules)
+
+
 @dataclass
 class AppConfig:
     debug_mode: bool = False
+    # "text" or "json" (one object per line, with per-file trace IDs and stage spans).
+    log_format: str = "text"
+    # Also write logs to this file, rotated by size; empty = stderr only.
+    log_file: str = ""
+    log_file_max_mb: int = 50
+    log_file_backups: int = 5
 
 
 @dataclass
 class ScheduleConfig:
     start_time: str = "04:00"
     run_immediately: bool = False
+    drain_grace_seconds: int = 0
+    # Ignore start_time and rescan every rescan_minutes (pair with a
+    # concurrency profile).
+    continuous: bool = False
+    rescan_minutes: int = 60
 
 
 @dataclass
@@ -58,6 +142,144 @@ class StandaloneAudioConfig:
     output_extension: str = "ec3"
 
 
+@dataclass
+class ConcurrencyConfig:
+    # 0 = derive from the cgroup CPU/memory limits at startup.
+    max_jobs: int = 0
+    memory_per_job_mb: int = 512
+    # Concurrent conversions reading from / writing to one block device (0 = no limit).
+    per_device_jobs: int = 1
+    # (HH:MM-HH:MM window, jobs) overriding max_jobs inside the window; the
+    # first matching window wins and 0 pauses admissions.
+    profile: tuple[tuple[str, int], ...] = ()
+
+    def peak_jobs(self) -> int:
+        """Most conversions that can run at once, in any profile window."""
+        return max([max(1, self.max_jobs)] + [jobs for _, jobs in self.profile])
+
+
+@dataclass
+class ThrottleConfig:
+    enabled: bool = False
+    # PSI "some avg10" percentages; 0 disables that signal.
+    cpu_psi_threshold: float = 20.0
+    io_psi_threshold: float = 30.0
+    # 1-minute load average per CPU; 0 disables it.
+    load_threshold: float = 0.0
+    # Resume once every signal is below threshold * resume_ratio.
+    resume_ratio: float = 0.5
+    poll_seconds: float = 10.0
+    # SIGSTOP running ffmpeg children while pressured, SIGCONT afterwards.
+    pause_running: bool = False
+
+
+@dataclass
+class BandwidthConfig:
+    # Combined read + write MB/s for all conversions; 0 = unlimited.
+    limit_mbps: float = 0.0
+    # Cap used inside day_window instead of limit_mbps; 0 = same as limit_mbps.
+    day_limit_mbps: float = 0.0
+    day_window: str = "08:00-23:00"
+    # Per-mount caps as (path prefix, MB/s), applied on top of the global cap.
+    mount_limits: tuple[tuple[str, float], ...] = ()
+
+
+TARGET_CODECS = ("eac3", "ac3", "ac3_fixed")
+
+
+@dataclass
+class TargetConfig:
+    # eac3 | ac3 | ac3_fixed (AC3 from ffmpeg's cheaper fixed-point encoder)
+    codec: str = "eac3"
+    # Per-library overrides as (path prefix, codec); the longest prefix wins.
+    path_codecs: tuple[tuple[str, str], ...] = ()
+    # DTS/TrueHD tracks with a same-language AC3/EAC3 twin: encode anyway,
+    # skip (leave untouched) or drop (remove them in a copy-only remux).
+    redundant_tracks: str = "encode"
+
+    def codec_for(self, path: str) -> str:
+        path = os.path.abspath(path)
+        best, codec = "", self.codec
+        for prefix, prefix_codec in self.path_codecs:
+            if (path == prefix or path.startswith(prefix.rstrip("/") + "/")) and len(prefix) > len(best):
+                best, codec = prefix, prefix_codec
+        return codec
+
+
+@dataclass
+class PageCacheConfig:
+    # normal | drop (posix_fadvise DONTNEED behind ffmpeg) | drop_sync (also
+    # push the output to disk as it is written so its pages can be dropped)
+    mode: str = "normal"
+    interval_seconds: float = 5.0
+
+
+@dataclass
+class SegmentConfig:
+    # Encode long tracks as time segments on several cores, then concatenate.
+    enabled: bool = False
+    # Tracks shorter than this are encoded in one pass.
+    min_duration_seconds: int = 1800
+    segment_seconds: int = 300
+    # Segments encoded at once; 0 = the job's ffmpeg thread budget.
+    workers: int = 0
+
+
+@dataclass
+class WebhookConfig:
+    enabled: bool = False
+    host: str = "0.0.0.0"
+    port: int = 8787
+    # Shared secret; empty = no authentication.
+    token: str = ""
+    # Rewrites paths as the sender sees them into container paths.
+    path_map: tuple[tuple[str, str], ...] = ()
+
+
+@dataclass
+class CacheConfig:
+    maintenance_on_startup: bool = True
+    maintenance_after_run: bool = False
+    # Hours before a transient outcome is forgotten and retried (0 = never).
+    failed_ttl_hours: float = 168.0
+    disk_space_ttl_hours: float = 24.0
+
+
+@dataclass
+class RetryConfig:
+    # Attempts per file for transient failures (1 = never retry).
+    max_attempts: int = 3
+    # Wait before retry n: backoff_minutes * 2^(n-1), capped.
+    backoff_minutes: float = 30.0
+    max_backoff_hours: float = 24.0
+    # Retries run as a single ffmpeg (no segments) with a longer timeout.
+    timeout_multiplier: float = 2.0
+
+
+@dataclass
+class PlanConfig:
+    output_path: str = "/app/cache/plan.json"
+    # Encode throughput (MB of input per second) assumed when the cache has
+    # no conversion history yet.
+    default_throughput_mbps: float = 60.0
+
+
+@dataclass
+class VerifyConfig:
+    enabled: bool = True
+    duration_tolerance_seconds: float = 2.0
+    sample_frames: int = 5
+
+
+@dataclass
+class ProfileConfig:
+    # off | cpu (cProfile) | memory (tracemalloc) | all
+    mode: str = "off"
+    output_dir: str = "/app/cache/profiles"
+    # Entries in the text summaries.
+    top: int = 30
+
+
 @dataclass
 class FFMpegConfig:
     # Deprecated: parsed for backward compatibility only. Audio bitrate is
@@ -81,8 +303,22 @@ class Config:
     app: AppConfig = field(default_factory=AppConfig)
     schedule: ScheduleConfig = field(default_factory=ScheduleConfig)
     ffmpeg: FFMpegConfig = field(default_factory=FFMpegConfig)
+    target: TargetConfig = field(default_factory=TargetConfig)
     standalone_audio: StandaloneAudioConfig = field(default_factory=StandaloneAudioConfig)
+    concurrency: ConcurrencyConfig = field(default_factory=ConcurrencyConfig)
+    throttle: ThrottleConfig = field(default_factory=ThrottleConfig)
+    bandwidth: BandwidthConfig = field(default_factory=BandwidthConfig)
+    page_cache: PageCacheConfig = field(default_factory=PageCacheConfig)
+    segments: SegmentConfig = field(default_factory=SegmentConfig)
+    webhook: WebhookConfig = field(default_factory=WebhookConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
+    retry: RetryConfig = field(default_factory=RetryConfig)
+    plan: PlanConfig = field(default_factory=PlanConfig)
+    verify: VerifyConfig = field(default_factory=VerifyConfig)
+    profile: ProfileConfig = field(default_factory=ProfileConfig)
     excluded_dirs: tuple[str, ...] = ("download",)
+    # Directories listed concurrently while scanning (1 = one at a time).
+    scan_workers: int = 8
     tz: str = "Europe/Paris"
 
     def get_parsed_start_time(self) -> tuple[int, int]:
@@ -100,10 +336,17 @@ def load_config() -> Config:
     cfg = Config(
         app=AppConfig(
             debug_mode=_env_bool("DEBUG_MODE", False),
+            log_format=_env_str("LOG_FORMAT", "text").strip().lower(),
+            log_file=_env_str("LOG_FILE", ""),
+            log_file_max_mb=_env_int("LOG_FILE_MAX_MB", 50),
+            log_file_backups=_env_int("LOG_FILE_BACKUPS", 5),
         ),
         schedule=ScheduleConfig(
             start_time=_env_str("START_TIME", "04:00"),
             run_immediately=_env_bool("RUN_IMMEDIATELY", False),
+            drain_grace_seconds=max(_env_int("DRAIN_GRACE_SECONDS", 0), 0),
+            continuous=_env_bool("RUN_CONTINUOUSLY", False),
+            rescan_minutes=max(_env_int("RESCAN_INTERVAL_MINUTES", 60), 1),
         ),
         ffmpeg=FFMpegConfig(
             kbps_per_channel=_env_int("FFMPEG_KBPS_PER_CHANNEL", 256),
@@ -119,6 +362,13 @@ def load_config() -> Config:
             avoid_negative_ts=_env_str("FFMPEG_AVOID_NEGATIVE_TS", "make_zero"),
             max_muxing_queue_size=_env_int("FFMPEG_MAX_MUXING_QUEUE_SIZE", 1024),
         ),
+        target=TargetConfig(
+            codec=_env_str("TARGET_CODEC", "eac3").strip().lower(),
+            path_codecs=tuple(
+                (prefix, codec.lower()) for prefix, codec in _env_prefix_map("TARGET_CODEC_PATHS")
+            ),
+            redundant_tracks=_env_str("REDUNDANT_TRACK_POLICY", "encode").strip().lower(),
+        ),
         standalone_audio=StandaloneAudioConfig(
             enabled=_env_bool("PROCESS_STANDALONE_AUDIO", False),
             extensions=tuple(
@@ -129,14 +379,101 @@ def load_config() -> Config:
             keep_original=_env_bool("STANDALONE_AUDIO_KEEP_ORIGINAL", False),
             output_extension=_env_str("STANDALONE_AUDIO_OUTPUT_EXTENSION", "ec3").strip().lstrip("."),
         ),
+        concurrency=ConcurrencyConfig(
+            max_jobs=_env_int("MAX_CONCURRENT_JOBS", 0),
+            memory_per_job_mb=_env_int("MEMORY_PER_JOB_MB", 512),
+            per_device_jobs=_env_int("PER_DEVICE_MAX_JOBS", 1),
+            profile=_env_window_jobs("CONCURRENCY_PROFILE"),
+        ),
+        throttle=ThrottleConfig(
+            enabled=_env_bool("THROTTLE_ENABLED", False),
+            cpu_psi_threshold=_env_float("THROTTLE_CPU_PSI_THRESHOLD", 20.0),
+            io_psi_threshold=_env_float("THROTTLE_IO_PSI_THRESHOLD", 30.0),
+            load_threshold=_env_float("THROTTLE_LOAD_THRESHOLD", 0.0),
+            resume_ratio=_env_float("THROTTLE_RESUME_RATIO", 0.5),
+            poll_seconds=_env_float("THROTTLE_POLL_SECONDS", 10.0),
+            pause_running=_env_bool("THROTTLE_PAUSE_RUNNING", False),
+        ),
+        bandwidth=BandwidthConfig(
+            limit_mbps=_env_float("BANDWIDTH_LIMIT_MBPS", 0.0),
+            day_limit_mbps=_env_float("BANDWIDTH_DAY_LIMIT_MBPS", 0.0),
+            day_window=_env_str("BANDWIDTH_DAY_WINDOW", "08:00-23:00"),
+            mount_limits=_env_path_limits("BANDWIDTH_MOUNT_LIMITS"),
+        ),
+        page_cache=PageCacheConfig(
+            mode=_env_str("PAGE_CACHE_MODE", "normal").strip().lower(),
+            interval_seconds=_env_float("PAGE_CACHE_INTERVAL_SECONDS", 5.0),
+        ),
+        segments=SegmentConfig(
+            enabled=_env_bool("SEGMENT_ENCODE", False),
+            min_duration_seconds=_env_int("SEGMENT_MIN_DURATION_SECONDS", 1800),
+            segment_seconds=max(_env_int("SEGMENT_SECONDS", 300), 10),
+            workers=max(_env_int("SEGMENT_WORKERS", 0), 0),
+        ),
+        webhook=WebhookConfig(
+            enabled=_env_bool("WEBHOOK_ENABLED", False),
+            host=_env_str("WEBHOOK_HOST", "0.0.0.0"),
+            port=_env_int("WEBHOOK_PORT", 8787),
+            token=_env_str("WEBHOOK_TOKEN", ""),
+            path_map=_env_prefix_map("WEBHOOK_PATH_MAP"),
+        ),
+        cache=CacheConfig(
+            maintenance_on_startup=_env_bool("CACHE_MAINTENANCE_ON_STARTUP", True),
+            maintenance_after_run=_env_bool("CACHE_MAINTENANCE_AFTER_RUN", False),
+            failed_ttl_hours=_env_float("CACHE_FAILED_TTL_HOURS", 168.0),
+            disk_space_ttl_hours=_env_float("CACHE_DISK_SPACE_TTL_HOURS", 24.0),
+        ),
+        retry=RetryConfig(
+            max_attempts=max(_env_int("RETRY_MAX_ATTEMPTS", 3), 1),
+            backoff_minutes=max(_env_float("RETRY_BACKOFF_MINUTES", 30.0), 0.0),
+            max_backoff_hours=max(_env_float("RETRY_MAX_BACKOFF_HOURS", 24.0), 0.0),
+            timeout_multiplier=max(_env_float("RETRY_TIMEOUT_MULTIPLIER", 2.0), 1.0),
+        ),
+        plan=PlanConfig(
+            output_path=_env_str("PLAN_OUTPUT", "/app/cache/plan.json"),
+            default_throughput_mbps=_env_float("PLAN_DEFAULT_THROUGHPUT_MBPS", 60.0),
+        ),
+        verify=VerifyConfig(
+            enabled=_env_bool("VERIFY_OUTPUT", True),
+            duration_tolerance_seconds=_env_float("VERIFY_DURATION_TOLERANCE_SECONDS", 2.0),
+            sample_frames=_env_int("VERIFY_SAMPLE_FRAMES", 5),
+        ),
+        profile=ProfileConfig(
+            mode=_env_str("PROFILE_MODE", "off").strip().lower(),
+            output_dir=_env_str("PROFILE_DIR", "/app/cache/profiles"),
+            top=_env_int("PROFILE_TOP", 30),
+        ),
         excluded_dirs=tuple(
             name.strip().lower()
             for name in _env_str("EXCLUDED_DIRS", "download").split(",")
             if name.strip()
         ),
+        scan_workers=max(_env_int("SCAN_WORKERS", 8), 1),
         tz=_env_str("TZ", "Europe/Paris"),
     )
     cfg.get_parsed_start_time()
+    if cfg.app.log_format not in ("text", "json"):
+        raise ConfigError(f"Invalid LOG_FORMAT {cfg.app.log_format!r} (expected 'text' or 'json')")
+    if cfg.profile.mode not in ("off", "cpu", "memory", "all"):
+        raise ConfigError(f"Invalid PROFILE_MODE {cfg.profile.mode!r} (expected off, cpu, memory or all)")
+    for codec in (cfg.target.codec, *(codec for _, codec in cfg.target.path_codecs)):
+        if codec not in TARGET_CODECS:
+            raise ConfigError(f"Invalid target codec {codec!r} (expected {', '.join(TARGET_CODECS)})")
+    if cfg.target.redundant_tracks not in ("encode", "skip", "drop"):
+        raise ConfigError(
+            f"Invalid REDUNDANT_TRACK_POLICY {cfg.target.redundant_tracks!r} (expected encode, skip or drop)"
+        )
+    if cfg.page_cache.mode not in ("normal", "drop", "drop_sync"):
+        raise ConfigError(
+            f"Invalid PAGE_CACHE_MODE {cfg.page_cache.mode!r} (expected normal, drop or drop_sync)"
+        )
+    if cfg.page_cache.interval_seconds <= 0:
+        raise ConfigError(
+            f"Invalid PAGE_CACHE_INTERVAL_SECONDS {cfg.page_cache.interval_seconds:g} (must be greater than 0)"
+        )
+    parse_time_window(cfg.bandwidth.day_window)
+    for window, _ in cfg.concurrency.profile:
+        parse_time_window(window)
     return cfg
 
 
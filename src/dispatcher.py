@@ -0,0 +1,144 @@
+import logging
+import os
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+logger = logging.getLogger("eac3_converter")
+
+
+@dataclass
+class Job:
+    path: str
+    run: Callable[[], None]
+    devices: frozenset = field(default_factory=frozenset)
+
+
+def devices_for(path: str) -> frozenset:
+    """Block devices a conversion of ``path`` reads from and writes to.
+
+    The source and the temp file's directory usually share a device, but
+    bind mounts can put them on different ones.
+    """
+    try:
+        return frozenset({os.stat(path).st_dev, os.stat(os.path.dirname(path) or ".").st_dev})
+    except OSError:
+        # The job will fail on its own; don't let it hold a device slot.
+        return frozenset()
+
+
+@dataclass
+class _Batch:
+    """One ``run`` call's share of the dispatcher."""
+    running: int = 0
+    peak: int = 0
+    error: Optional[BaseException] = None
+
+
+class JobDispatcher:
+    """Runs jobs on worker threads under a global and a per-device limit.
+
+    Jobs are admitted in order, except that a job whose device is saturated
+    is skipped over so jobs on idle devices can start. ``max_jobs`` is a
+    callable and is re-read on every admission pass, so the global limit can
+    change while the dispatcher runs. ``may_admit`` can veto new admissions
+    altogether (e.g. while the host is under pressure); once ``should_stop``
+    is true, jobs not yet started are dropped. ``on_worker_exit`` runs on each
+    worker thread after its job, to release per-thread resources.
+
+    ``run`` may be called from several threads at once (a scheduled run and
+    webhook conversions); the limits apply to all their jobs together.
+    """
+
+    def __init__(
+        self,
+        max_jobs: Callable[[], int],
+        per_device_limit: int = 0,
+        may_admit: Callable[[], bool] = lambda: True,
+        should_stop: Callable[[], bool] = lambda: False,
+        on_worker_exit: Callable[[], None] = lambda: None,
+        poll_seconds: float = 1.0,
+    ):
+        self.max_jobs = max_jobs
+        self.per_device_limit = per_device_limit
+        self.may_admit = may_admit
+        self.should_stop = should_stop
+        self.on_worker_exit = on_worker_exit
+        self.poll_seconds = poll_seconds
+
+        self._cond = threading.Condition()
+        self._running: List[Job] = []
+        self._device_load: Counter = Counter()
+
+    def _device_has_room(self, job: Job) -> bool:
+        if self.per_device_limit <= 0:
+            return True
+        return all(self._device_load[device] < self.per_device_limit for device in job.devices)
+
+    def _next_admissible(self, pending: List[Job]) -> Optional[Job]:
+        for job in pending:
+            if self._device_has_room(job):
+                return job
+        return None
+
+    def _start(self, job: Job, batch: _Batch) -> None:
+        self._running.append(job)
+        self._device_load.update(job.devices)
+        batch.running += 1
+        batch.peak = max(batch.peak, len(self._running))
+        threading.Thread(target=self._work, args=(job, batch), name="convert", daemon=True).start()
+
+    def _work(self, job: Job, batch: _Batch) -> None:
+        try:
+            job.run()
+        except BaseException as e:
+            logger.error(f"Unexpected error processing {job.path}: {e}")
+            with self._cond:
+                if batch.error is None:
+                    batch.error = e
+        finally:
+            try:
+                self.on_worker_exit()
+            except Exception as e:
+                logger.warning(f"Worker cleanup after {job.path} failed: {e}")
+            with self._cond:
+                self._running.remove(job)
+                self._device_load.subtract(job.devices)
+                batch.running -= 1
+                self._cond.notify_all()
+
+    def run(self, jobs: List[Job]) -> int:
+        """Run every job and return when all have finished.
+
+        After an unexpected error no new job of this call is admitted; the
+        error is re-raised once its running ones have finished. The same
+        goes for ``should_stop``, without the error. Returns the most jobs
+        (from any caller) that ran at once while this call had jobs running.
+        """
+        pending = list(jobs)
+        batch = _Batch()
+        with self._cond:
+            while pending or batch.running:
+                if pending and self.should_stop():
+                    logger.info(
+                        f"Not starting {len(pending)} queued file(s); "
+                        f"waiting for {batch.running} running conversion(s)"
+                    )
+                    pending.clear()
+                    continue
+                while pending and batch.error is None and self.may_admit() \
+                        and len(self._running) < max(self.max_jobs(), 0):
+                    job = self._next_admissible(pending)
+                    if job is None:
+                        break
+                    pending.remove(job)
+                    self._start(job, batch)
+                if batch.error is not None:
+                    pending.clear()
+                    if not batch.running:
+                        break
+                self._cond.wait(timeout=self.poll_seconds)
+            if batch.error is not None:
+                raise batch.error
+        return batch.peak
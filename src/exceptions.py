@@ -1,5 +1,7 @@
 """Custom exceptions for EAC3 Converter."""
 
+from typing import Optional
+
 
 class EAC3ConverterError(Exception):
     """Base exception for EAC3 Converter errors."""
@@ -12,8 +14,15 @@ class ConfigError(EAC3ConverterError):
 
 
 class ConversionError(EAC3ConverterError):
-    """Audio conversion errors."""
-    pass
+    """Audio conversion errors.
+
+    ``returncode`` and ``stderr`` are set when an ffmpeg run failed.
+    """
+
+    def __init__(self, message: str = "", returncode: Optional[int] = None, stderr: str = ""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr = stderr or ""
 
 
 class ConversionTimeoutError(ConversionError):
@@ -21,6 +30,11 @@ class ConversionTimeoutError(ConversionError):
     pass
 
 
+class OutputVerificationError(ConversionError):
+    """Converted output does not match the source."""
+    pass
+
+
 class DiskSpaceError(ConversionError):
     """Insufficient disk space for conversion."""
     pass
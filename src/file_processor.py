@@ -1,16 +1,62 @@
 import logging
 import os
+import time
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
-from .audio_processor import AudioProcessor
-from .cache_manager import CacheManager
+from . import marker, retry, scanner, segments, tracing
+from .audio_processor import AudioProcessor, resolve_target
+from .cache_manager import CacheManager, make_file_key
 from .config import config
 from .exceptions import ConversionError, ConversionTimeoutError, DiskSpaceError, FileProcessingError
+from .run_stats import RunStats
+from .verifier import OutputVerifier
 
 logger = logging.getLogger("eac3_converter")
 
+# RunStats of the run that the file being handled belongs to (see _stats).
+_run_stats: ContextVar[Optional[RunStats]] = ContextVar("eac3_run_stats", default=None)
+
+
+def group_hardlinks(paths: List[str]) -> List[List[str]]:
+    """Group paths that are hardlinks of the same inode, in first-seen order.
+
+    The first path of each group is its representative. Paths that can't be
+    stat'ed form their own group.
+    """
+    groups: Dict[Tuple[int, int], List[str]] = {}
+    result: List[List[str]] = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            result.append([path])
+            continue
+        inode = (stat.st_dev, stat.st_ino)
+        if inode in groups:
+            groups[inode].append(path)
+        else:
+            groups[inode] = [path]
+            result.append(groups[inode])
+    return result
+
+
+def standalone_output_extension(file_path: str) -> str:
+    """Extension of the file a standalone audio conversion of ``file_path`` writes."""
+    if resolve_target(file_path)[0] == "eac3":
+        return config.standalone_audio.output_extension or "ec3"
+    return "ac3"
+
+
+def temp_file_for(file_path: str) -> Path:
+    """The ``.temp_*`` file a conversion of ``file_path`` writes next to it."""
+    source = Path(file_path)
+    if source.suffix == ".mkv":
+        return source.parent / f".temp_{source.name}"
+    return source.parent / f".temp_{source.stem}.{standalone_output_extension(file_path)}"
+
 
 class FileProcessor:
     """Handles file metadata extraction and processing."""
@@ -18,6 +64,13 @@ class FileProcessor:
     def __init__(self, cache_manager: CacheManager, audio_processor: AudioProcessor):
         self.cache_manager = cache_manager
         self.audio_processor = audio_processor
+        self.verifier = OutputVerifier(audio_processor)
+        # Counts files handled outside a scheduled run (webhook, CLI).
+        self.run_stats = RunStats()
+
+    def _stats(self) -> RunStats:
+        """Counters of the run the current file belongs to."""
+        return _run_stats.get() or self.run_stats
 
     def get_file_metadata(self, file_path: str) -> Optional[Dict[str, Any]]:
         """Get file metadata for cache identification."""
@@ -27,7 +80,8 @@ class FileProcessor:
                 "path": file_path,
                 "size": stat_info.st_size,
                 "mtime": stat_info.st_mtime,
-                "ctime": stat_info.st_ctime
+                "ctime": stat_info.st_ctime,
+                "nlink": stat_info.st_nlink,
             }
             logger.debug(f"File metadata for {file_path}: size={metadata['size']}, mtime={metadata['mtime']}")
             return metadata
@@ -37,75 +91,266 @@ class FileProcessor:
 
     def generate_file_key(self, file_path: str, metadata: Dict[str, Any]) -> str:
         """Generate a unique key for file caching."""
-        return f"{file_path}_{metadata['size']}_{metadata['mtime']}"
+        return make_file_key(file_path, metadata["size"], metadata["mtime"])
+
+    def _mark(self, file_key: str, file_metadata: Dict[str, Any], outcome: Dict[str, Any]) -> None:
+        """Record an outcome together with the file's path, size and mtime.
+
+        Hardlinks of the file (``file_metadata["aliases"]``) get the same
+        outcome under their own path.
+        """
+        tracing.annotate(action=outcome["action"], reason=outcome.get("reason"))
+        counter = {"converted": "conversions", "failed": "failures", "skipped": "skipped"}.get(outcome["action"])
+        if counter:
+            self._stats().incr(counter)
+        with tracing.span("cache_write"):
+            self.cache_manager.mark_processed(file_key, {
+                "path": file_metadata["path"],
+                "size": file_metadata["size"],
+                "mtime": file_metadata["mtime"],
+                "timestamp": datetime.now().isoformat(),
+                **outcome,
+            })
+            for alias in file_metadata.get("aliases", ()):
+                self.cache_manager.mark_processed(
+                    make_file_key(alias, file_metadata["size"], file_metadata["mtime"]), {
+                        "path": alias,
+                        "size": file_metadata["size"],
+                        "mtime": file_metadata["mtime"],
+                        "timestamp": datetime.now().isoformat(),
+                        **outcome,
+                        "hardlink_of": file_metadata["path"],
+                    })
+
+    def _record_history(
+        self,
+        file_key: str,
+        file_metadata: Dict[str, Any],
+        kind: str,
+        conversion_metrics: Dict[str, Any],
+        output_bytes: int,
+        stage_seconds: Dict[str, float],
+    ) -> None:
+        encode_seconds = conversion_metrics["conversion_time"]
+        duration = conversion_metrics.get("duration_seconds") or 0.0
+        self._stats().add_conversion(file_metadata["size"], output_bytes, encode_seconds)
+        self.cache_manager.record_history({
+            "file_key": file_key,
+            "path": file_metadata["path"],
+            "timestamp": datetime.now().isoformat(),
+            "kind": kind,
+            "codec": conversion_metrics.get("codec"),
+            "input_bytes": file_metadata["size"],
+            "output_bytes": output_bytes,
+            "duration_seconds": duration,
+            "streams_encoded": conversion_metrics.get("streams_encoded"),
+            "channels_encoded": conversion_metrics.get("channels_encoded"),
+            "encode_speed": duration / encode_seconds if encode_seconds > 0 else None,
+            "encode_seconds": encode_seconds,
+            **stage_seconds,
+        })
+
+    def process_file(
+        self,
+        file_path: str,
+        force: bool = False,
+        hardlinks: List[str] = (),
+        stats: Optional[RunStats] = None,
+    ) -> None:
+        """Process a single file, using cache to avoid re-processing.
+
+        ``force`` ignores an existing cache entry for the file. ``hardlinks``
+        are other paths of the same inode: they are re-linked to the
+        converted file instead of being converted again. Outcomes are
+        counted in ``stats`` (default: ``self.run_stats``).
+        """
+        token = _run_stats.set(stats)
+        try:
+            with tracing.trace(file_path, kind="mkv"):
+                self._process_file(file_path, force, list(hardlinks))
+        finally:
+            _run_stats.reset(token)
+
+    def _mark_failed(
+        self,
+        file_key: str,
+        file_metadata: Dict[str, Any],
+        error: BaseException,
+        error_type: str,
+        previous: Optional[Dict[str, Any]],
+    ) -> None:
+        """Record a failure, scheduling a retry if it looks transient (see retry.py)."""
+        outcome = retry.failure_outcome(error, error_type, previous)
+        filename = Path(file_metadata["path"]).name
+        if "retry_after" in outcome:
+            logger.info(
+                f"{filename}: transient failure (attempt {outcome['attempt']}/{config.retry.max_attempts}), "
+                f"will retry after {outcome['retry_after']}"
+            )
+        elif outcome["failure"] == "transient":
+            logger.warning(f"{filename}: giving up after {outcome['attempt']} attempt(s)")
+        if "retry_after" not in outcome:
+            # No attempt will resume these segments.
+            segments.remove_checkpoints(file_metadata["path"])
+        self._mark(file_key, file_metadata, outcome)
+
+    def _retrying(self, file_key: str, filename: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(previous outcome, whether this attempt retries a transient failure)."""
+        previous = self.cache_manager.get_outcome(file_key)
+        retrying = retry.is_retry(previous)
+        if retrying:
+            logger.info(
+                f"Retrying {filename} (attempt {retry.failed_attempts(previous) + 1}/"
+                f"{config.retry.max_attempts}) with conservative settings"
+            )
+        return previous, retrying
+
+    @staticmethod
+    def _relink(file_path: str, aliases: List[str]) -> List[str]:
+        """Point every alias at ``file_path``'s new inode; return those that were re-linked.
+
+        Each alias is swapped atomically (link to a temp name, then rename),
+        so it never disappears.
+        """
+        relinked = []
+        for alias in aliases:
+            alias_path = Path(alias)
+            temp_link = alias_path.parent / f".temp_link_{alias_path.name}"
+            try:
+                os.link(file_path, temp_link)
+                os.replace(temp_link, alias_path)
+                relinked.append(alias)
+            except OSError as e:
+                logger.warning(f"Could not re-link {alias} to the converted file, it keeps the old copy: {e}")
+                try:
+                    temp_link.unlink()
+                except OSError:
+                    pass
+        return relinked
 
-    def process_file(self, file_path: str) -> None:
-        """Process a single file, using cache to avoid re-processing."""
+    def _process_file(self, file_path: str, force: bool, hardlinks: List[str]) -> None:
+        started = time.monotonic()
         filename = Path(file_path).name
-        file_metadata = self.get_file_metadata(file_path)
+        with tracing.span("stat"):
+            file_metadata = self.get_file_metadata(file_path)
 
         if file_metadata is None:
             return
+        file_metadata["aliases"] = hardlinks
+        if hardlinks:
+            logger.info(f"{filename}: {len(hardlinks)} other hardlink(s) will share the result")
+        links_outside = file_metadata["nlink"] - 1 - len(hardlinks)
+        if links_outside > 0:
+            logger.warning(
+                f"{filename} has {links_outside} hardlink(s) outside the scanned paths; "
+                "they will keep the unconverted copy"
+            )
 
         file_key = self.generate_file_key(file_path, file_metadata)
 
         logger.debug(f"Processing file: {filename} with key: {file_key}")
 
-        if self.cache_manager.is_processed(file_key):
+        with tracing.span("cache_lookup") as lookup:
+            cached = not force and self.cache_manager.is_processed(file_key)
+            lookup.fields["hit"] = cached
+        if cached:
+            self._stats().incr("cache_hits")
             logger.debug(f"Cache hit for {filename} with key: {file_key}")
             logger.info(f"Skipping {filename} (already processed according to cache)")
             return
 
         logger.debug(f"Cache miss for {filename} with key: {file_key}")
 
-        temp_file = Path(file_path).parent / f".temp_{filename}"
+        if not force:
+            with tracing.span("marker_check") as marker_check:
+                converted_by = marker.read_marker(file_path)
+                marker_check.fields["found"] = converted_by is not None
+            if converted_by is not None:
+                logger.info(
+                    f"Skipping {filename} (converted by version {converted_by.get('version', '?')} "
+                    f"on {converted_by.get('converted', '?')})"
+                )
+                self._mark(file_key, file_metadata, {
+                    "action": "skipped",
+                    "reason": "converted_marker",
+                    "marker": converted_by,
+                })
+                return
+
+        temp_file = temp_file_for(file_path)
+
+        with tracing.span("probe") as probe:
+            has_lossless = self.audio_processor.has_dts_or_truehd(file_path)
+            if has_lossless and config.target.redundant_tracks == "skip" \
+                    and self.audio_processor.lossless_tracks_redundant(file_path):
+                logger.info(f"Skipping {filename}: every DTS/TrueHD track has a compatible AC3/EAC3 track")
+                self._mark(file_key, file_metadata, {
+                    "action": "skipped",
+                    "reason": "compatible_track_present",
+                })
+                return
 
-        if self.audio_processor.has_dts_or_truehd(file_path):
+        if has_lossless:
+            previous, retrying = self._retrying(file_key, filename)
             try:
                 # Check disk space before starting conversion - now raises DiskSpaceError
-                self.audio_processor.check_disk_space(file_path)
+                with tracing.span("disk_check"):
+                    self.audio_processor.check_disk_space(file_path)
 
                 logger.info(f"Converting audio tracks for {filename}...")
-                conversion_metrics = self.audio_processor.convert_audio_tracks(file_path, str(temp_file))
+                with tracing.span("encode", input_bytes=file_metadata["size"]) as encode:
+                    conversion_metrics = self.audio_processor.convert_audio_tracks(
+                        file_path, str(temp_file), degraded=retrying
+                    )
+                    if temp_file.exists():
+                        encode.fields["output_bytes"] = temp_file.stat().st_size
                 logger.info(f"Conversion completed for {filename}.")
 
                 # Check if temp file exists before replacement
                 if not temp_file.exists():
                     raise FileProcessingError(f"Temporary file {temp_file} does not exist after conversion")
-
-                os.replace(temp_file, file_path)
+                output_bytes = temp_file.stat().st_size
+
+                verify_seconds = None
+                if config.verify.enabled:
+                    with tracing.span("verify") as verify:
+                        self.verifier.verify(file_path, str(temp_file), conversion_metrics["audio_plan"])
+                    verify_seconds = verify.seconds
+
+                with tracing.span("replace", bytes=output_bytes) as replace:
+                    os.replace(temp_file, file_path)
+                    if hardlinks:
+                        file_metadata["aliases"] = self._relink(file_path, hardlinks)
                 logger.info(f"File {filename} replaced successfully.")
 
-                metadata = {
-                    "timestamp": datetime.now().isoformat(),
+                outcome = {
                     "action": "converted",
                     "original_codecs": "dts_or_truehd",
                     "conversion_time": conversion_metrics["conversion_time"],
                     "ffmpeg_command": conversion_metrics["command"]
                 }
-                self.cache_manager.mark_processed(file_key, metadata)
+                self._mark(file_key, file_metadata, outcome)
+                self._record_history(file_key, file_metadata, "mkv", conversion_metrics, output_bytes, {
+                    "probe_seconds": probe.seconds,
+                    "verify_seconds": verify_seconds,
+                    "replace_seconds": replace.seconds,
+                    "wall_seconds": time.monotonic() - started,
+                })
                 logger.info(f"Metrics: conversion_time={conversion_metrics['conversion_time']:.2f}s")
 
             except DiskSpaceError as e:
                 logger.error(f"Skipping conversion of {filename}: {e}")
-                metadata = {
-                    "timestamp": datetime.now().isoformat(),
+                outcome = {
                     "action": "skipped",
                     "reason": "insufficient_disk_space",
                     "error": str(e)
                 }
-                self.cache_manager.mark_processed(file_key, metadata)
+                self._mark(file_key, file_metadata, outcome)
                 return
 
             except (ConversionError, ConversionTimeoutError) as e:
                 logger.error(f"Conversion failed for {filename}: {e}")
-                metadata = {
-                    "timestamp": datetime.now().isoformat(),
-                    "action": "failed",
-                    "error_type": type(e).__name__,
-                    "error": str(e)
-                }
-                self.cache_manager.mark_processed(file_key, metadata)
+                self._mark_failed(file_key, file_metadata, e, type(e).__name__, previous)
                 # Clean up the temporary file if conversion fails
                 if temp_file.exists():
                     temp_file.unlink()
@@ -113,64 +358,75 @@ class FileProcessor:
 
             except Exception as e:
                 logger.error(f"Unexpected error processing {filename}: {e}")
-                metadata = {
-                    "timestamp": datetime.now().isoformat(),
-                    "action": "failed",
-                    "error_type": "unexpected_error",
-                    "error": str(e)
-                }
-                self.cache_manager.mark_processed(file_key, metadata)
+                self._mark_failed(file_key, file_metadata, e, "unexpected_error", previous)
                 # Clean up the temporary file if conversion fails
                 if temp_file.exists():
                     temp_file.unlink()
                 return
         else:
-            metadata = {
-                "timestamp": datetime.now().isoformat(),
+            outcome = {
                 "action": "skipped",
                 "reason": "no_dts_or_truehd"
             }
-            self.cache_manager.mark_processed(file_key, metadata)
+            self._mark(file_key, file_metadata, outcome)
             logger.debug(f"No DTS or TrueHD tracks found in {filename}, skipping.")
 
     @staticmethod
-    def _prune_excluded_dirs(dirs: list[str]) -> None:
-        excluded_dirs = set(config.excluded_dirs)
-        if not excluded_dirs:
-            return
-        dirs[:] = [directory for directory in dirs if directory.lower() not in excluded_dirs]
+    def _scan(input_dir: str, accept) -> list[str]:
+        return scanner.scan([input_dir], accept, config.excluded_dirs, config.scan_workers)
 
     def find_mkv_files(self, input_dir: str) -> list[str]:
         """Find all MKV files recursively, excluding configured dirs and temporary files."""
-        mkv_files = []
-        for root, dirs, files in os.walk(input_dir):
-            self._prune_excluded_dirs(dirs)
-            for file in files:
-                if file.endswith(".mkv") and not file.startswith(".temp_"):
-                    mkv_files.append(os.path.join(root, file))
+        mkv_files = self._scan(input_dir, lambda name: name.endswith(".mkv"))
         logger.debug(f"Found {len(mkv_files)} MKV files in {input_dir}")
         return mkv_files
 
+    def find_media_files(self, input_dir: str) -> Tuple[list[str], list[str]]:
+        """MKV and (when enabled) standalone audio files, found in a single scan."""
+        audio_enabled = config.standalone_audio.enabled
+        found = self._scan(
+            input_dir,
+            lambda name: name.endswith(".mkv") or (audio_enabled and self.is_standalone_audio(name)),
+        )
+        mkv_files = [path for path in found if path.endswith(".mkv")]
+        audio_files = [path for path in found if not path.endswith(".mkv")]
+        logger.debug(f"Found {len(mkv_files)} MKV and {len(audio_files)} standalone audio files in {input_dir}")
+        return mkv_files, audio_files
+
+    @staticmethod
+    def is_standalone_audio(file_path: str) -> bool:
+        extensions = tuple(f".{ext.lower()}" for ext in config.standalone_audio.extensions)
+        return bool(extensions) and file_path.lower().endswith(extensions)
+
     def find_standalone_audio_files(self, input_dir: str) -> list[str]:
         """Find standalone audio files recursively, excluding configured dirs."""
         extensions = tuple(f".{ext.lower()}" for ext in config.standalone_audio.extensions)
         if not extensions:
             return []
-        audio_files = []
-        for root, dirs, files in os.walk(input_dir):
-            self._prune_excluded_dirs(dirs)
-            for file in files:
-                if file.startswith(".temp_"):
-                    continue
-                if file.lower().endswith(extensions):
-                    audio_files.append(os.path.join(root, file))
+        audio_files = self._scan(input_dir, lambda name: name.lower().endswith(extensions))
         logger.debug(f"Found {len(audio_files)} standalone audio files in {input_dir}")
         return audio_files
 
-    def process_standalone_audio_file(self, file_path: str) -> None:
-        """Convert a standalone audio file (e.g. .dts) to a sibling EAC3 file."""
+    def process_standalone_audio_file(
+        self, file_path: str, force: bool = False, stats: Optional[RunStats] = None
+    ) -> None:
+        """Convert a standalone audio file (e.g. .dts) to a sibling EAC3 file.
+
+        ``force`` ignores an existing cache entry for the file; outcomes are
+        counted in ``stats`` (default: ``self.run_stats``).
+        """
+        token = _run_stats.set(stats)
+        try:
+            with tracing.trace(file_path, kind="standalone"):
+                self._process_standalone_audio_file(file_path, force)
+        finally:
+            _run_stats.reset(token)
+
+    def _process_standalone_audio_file(self, file_path: str, force: bool) -> None:
+        started = time.monotonic()
         filename = Path(file_path).name
-        file_metadata = self.get_file_metadata(file_path)
+        with tracing.span("stat"):
+            file_metadata = self.get_file_metadata(file_path)
 
         if file_metadata is None:
             return
@@ -178,17 +434,21 @@ class FileProcessor:
         file_key = self.generate_file_key(file_path, file_metadata)
         logger.debug(f"Processing standalone audio file: {filename} with key: {file_key}")
 
-        if self.cache_manager.is_processed(file_key):
+        with tracing.span("cache_lookup") as lookup:
+            cached = not force and self.cache_manager.is_processed(file_key)
+            lookup.fields["hit"] = cached
+        if cached:
+            self._stats().incr("cache_hits")
             logger.debug(f"Cache hit for {filename} with key: {file_key}")
             logger.info(f"Skipping {filename} (already processed according to cache)")
             return
 
-        streams = self.audio_processor.get_audio_streams_info(file_path)
+        with tracing.span("probe") as probe:
+            streams = self.audio_processor.get_audio_streams_info(file_path)
         codec = streams[0].get("codec_name", "").lower() if streams else ""
         if codec in ("eac3", "ac3"):
             logger.info(f"Skipping {filename}: already in {codec.upper()} (no conversion needed).")
-            self.cache_manager.mark_processed(file_key, {
-                "timestamp": datetime.now().isoformat(),
+            self._mark(file_key, file_metadata, {
                 "action": "skipped",
                 "reason": "already_eac3_compatible",
                 "codec": codec,
@@ -196,8 +456,7 @@ class FileProcessor:
             return
         if codec and codec not in ("dts", "truehd"):
             logger.info(f"Skipping {filename}: unsupported codec {codec!r} for standalone conversion.")
-            self.cache_manager.mark_processed(file_key, {
-                "timestamp": datetime.now().isoformat(),
+            self._mark(file_key, file_metadata, {
                 "action": "skipped",
                 "reason": "unsupported_codec",
                 "codec": codec,
@@ -205,38 +464,44 @@ class FileProcessor:
             return
         if not codec:
             logger.warning(f"Could not determine codec for {filename}; skipping.")
-            self.cache_manager.mark_processed(file_key, {
-                "timestamp": datetime.now().isoformat(),
+            self._mark(file_key, file_metadata, {
                 "action": "skipped",
                 "reason": "codec_unknown",
             })
             return
 
         source = Path(file_path)
-        out_ext = config.standalone_audio.output_extension or "ec3"
-        output_file = source.with_suffix(f".{out_ext}")
-        temp_file = source.parent / f".temp_{source.stem}.{out_ext}"
+        output_file = source.with_suffix(f".{standalone_output_extension(file_path)}")
+        temp_file = temp_file_for(file_path)
 
         if output_file.exists() and not config.standalone_audio.keep_original:
             # An EAC3 sibling already exists; mark as processed to avoid loops.
             logger.info(f"Output {output_file.name} already exists for {filename}, marking as processed.")
-            self.cache_manager.mark_processed(file_key, {
-                "timestamp": datetime.now().isoformat(),
+            self._mark(file_key, file_metadata, {
                 "action": "skipped",
                 "reason": "output_already_exists",
             })
             return
 
+        previous, retrying = self._retrying(file_key, filename)
         try:
-            self.audio_processor.check_disk_space(file_path)
+            with tracing.span("disk_check"):
+                self.audio_processor.check_disk_space(file_path)
 
             logger.info(f"Converting standalone audio {filename}...")
-            conversion_metrics = self.audio_processor.convert_standalone_audio(file_path, str(temp_file))
+            with tracing.span("encode", input_bytes=file_metadata["size"]) as encode:
+                conversion_metrics = self.audio_processor.convert_standalone_audio(
+                    file_path, str(temp_file), degraded=retrying
+                )
+                if temp_file.exists():
+                    encode.fields["output_bytes"] = temp_file.stat().st_size
 
             if not temp_file.exists():
                 raise FileProcessingError(f"Temporary file {temp_file} does not exist after conversion")
+            output_bytes = temp_file.stat().st_size
 
-            os.replace(temp_file, output_file)
+            with tracing.span("replace", bytes=output_bytes) as replace:
+                os.replace(temp_file, output_file)
             logger.info(f"Standalone audio {filename} -> {output_file.name} written.")
 
             if not config.standalone_audio.keep_original:
@@ -246,8 +511,7 @@ class FileProcessor:
                 except OSError as e:
                     logger.warning(f"Failed to remove original {filename}: {e}")
 
-            self.cache_manager.mark_processed(file_key, {
-                "timestamp": datetime.now().isoformat(),
+            self._mark(file_key, file_metadata, {
                 "action": "converted",
                 "original_codecs": "standalone_audio",
                 "conversion_time": conversion_metrics["conversion_time"],
@@ -255,33 +519,27 @@ class FileProcessor:
                 "output_file": str(output_file),
                 "kept_original": config.standalone_audio.keep_original,
             })
+            self._record_history(file_key, file_metadata, "standalone", conversion_metrics, output_bytes, {
+                "probe_seconds": probe.seconds,
+                "replace_seconds": replace.seconds,
+                "wall_seconds": time.monotonic() - started,
+            })
             logger.info(f"Metrics: conversion_time={conversion_metrics['conversion_time']:.2f}s")
 
         except DiskSpaceError as e:
             logger.error(f"Skipping standalone conversion of {filename}: {e}")
-            self.cache_manager.mark_processed(file_key, {
-                "timestamp": datetime.now().isoformat(),
+            self._mark(file_key, file_metadata, {
                 "action": "skipped",
                 "reason": "insufficient_disk_space",
                 "error": str(e),
             })
         except (ConversionError, ConversionTimeoutError) as e:
             logger.error(f"Standalone conversion failed for {filename}: {e}")
-            self.cache_manager.mark_processed(file_key, {
-                "timestamp": datetime.now().isoformat(),
-                "action": "failed",
-                "error_type": type(e).__name__,
-                "error": str(e),
-            })
+            self._mark_failed(file_key, file_metadata, e, type(e).__name__, previous)
             if temp_file.exists():
                 temp_file.unlink()
         except Exception as e:
             logger.error(f"Unexpected error processing standalone {filename}: {e}")
-            self.cache_manager.mark_processed(file_key, {
-                "timestamp": datetime.now().isoformat(),
-                "action": "failed",
-                "error_type": "unexpected_error",
-                "error": str(e),
-            })
+            self._mark_failed(file_key, file_metadata, e, "unexpected_error", previous)
             if temp_file.exists():
                 temp_file.unlink()
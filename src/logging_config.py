@@ -1,39 +1,88 @@
+import json
 import logging
 import logging.config
+import os
 import sys
+from datetime import datetime, timezone
 from .config import config
+from .tracing import TraceContextFilter
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the trace ID and any event fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        trace_id = getattr(record, "trace_id", None)
+        if trace_id:
+            entry["trace_id"] = trace_id
+        event = getattr(record, "event", None)
+        if event:
+            entry["event"] = event
+            entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
 
 
 def setup_logging():
-    """Set up logging configuration based on debug mode."""
+    """Set up logging configuration based on debug mode and LOG_FORMAT / LOG_FILE."""
 
     log_level = logging.DEBUG if config.app.debug_mode else logging.INFO
+    formatter = "json" if config.app.log_format == "json" else "simple"
+
+    handlers = {
+        "console": {
+            "class": "logging.StreamHandler",
+            "level": log_level,
+            "formatter": formatter,
+            "filters": ["trace"],
+            "stream": sys.stderr
+        }
+    }
+    if config.app.log_file:
+        os.makedirs(os.path.dirname(os.path.abspath(config.app.log_file)), exist_ok=True)
+        handlers["file"] = {
+            "class": "logging.handlers.RotatingFileHandler",
+            "level": log_level,
+            "formatter": formatter,
+            "filters": ["trace"],
+            "filename": config.app.log_file,
+            "maxBytes": config.app.log_file_max_mb * 1024 * 1024,
+            "backupCount": config.app.log_file_backups,
+            "encoding": "utf-8",
+        }
 
     logging_config = {
         "version": 1,
         "disable_existing_loggers": False,
+        "filters": {
+            "trace": {"()": TraceContextFilter}
+        },
         "formatters": {
             "simple": {
                 "format": "[%(asctime)s] %(levelname)s - %(message)s",
                 "datefmt": "%Y-%m-%d %H:%M:%S"
+            },
+            "json": {
+                "()": JsonFormatter
             }
         },
-        "handlers": {
-            "console": {
-                "class": "logging.StreamHandler",
-                "level": log_level,
-                "formatter": "simple",
-                "stream": sys.stderr
-            }
-        },
+        "handlers": handlers,
         "root": {
             "level": log_level,
-            "handlers": ["console"]
+            "handlers": list(handlers)
         },
         "loggers": {
             "eac3_converter": {
                 "level": log_level,
-                "handlers": ["console"],
+                "handlers": list(handlers),
                 "propagate": False
             }
         }
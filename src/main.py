@@ -1,26 +1,57 @@
 import logging
 import os
+import shutil
 import signal
 import sys
+import threading
 import time
 
+from . import cli, shutdown
 from .cache_manager import CacheManager
 from .config import config, INPUT_DIR, CACHE_DB
 from .exceptions import ConfigError
 from .logging_config import setup_logging
+from .resources import autotune
 from .audio_processor import AudioProcessor
 from .file_processor import FileProcessor
+from .processes import registry
 from .scheduler import Scheduler
+from .throttle import PressureThrottle
+from .webhook import WebhookServer
 
 logger = logging.getLogger("eac3_converter")
 
 cache_manager: CacheManager | None = None
+# Directories (and single .temp_* files) the current command owns.
+cleanup_roots: list[str] = [INPUT_DIR]
 
 
 def cleanup_temp_files(input_dir: str) -> int:
-    """Clean up temporary .temp_* files from previous runs recursively."""
+    """Clean up temporary .temp_* files from previous runs recursively.
+
+    ``input_dir`` may also name a single ``.temp_*`` file, which alone is
+    removed. Segment checkpoints (``.segments_*``) are kept for a resumed
+    encode unless their source file is gone.
+    """
+    if os.path.basename(input_dir).startswith(".temp_"):
+        try:
+            os.remove(input_dir)
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            logger.warning(f"Failed to remove temporary file {input_dir}: {e}")
+            return 0
+        logger.info(f"Cleaned up temporary file: {input_dir}")
+        return 1
+
     cleaned_count = 0
-    for root, _, files in os.walk(input_dir):
+    for root, dirs, files in os.walk(input_dir):
+        for name in list(dirs):
+            if name.startswith(".segments_"):
+                dirs.remove(name)
+                if not os.path.exists(os.path.join(root, name[len(".segments_"):])):
+                    shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+                    logger.info(f"Cleaned up orphaned segments: {os.path.join(root, name)}")
         for file in files:
             if file.startswith(".temp_"):
                 temp_file_path = os.path.join(root, file)
@@ -37,12 +68,43 @@ def cleanup_temp_files(input_dir: str) -> int:
     return cleaned_count
 
 
+def _drain_expired(signum: int) -> None:
+    logger.warning("Drain grace period expired, stopping running conversions")
+    os.kill(os.getpid(), signum)
+
+
 def signal_handler(signum, frame):
-    """Handle shutdown signals to close cache and cleanup temp files."""
-    logger.info(f"Received signal {signum}, closing cache and cleaning up...")
+    """Handle shutdown signals to close cache and cleanup temp files.
+
+    With DRAIN_GRACE_SECONDS set, the first signal only starts a drain: no
+    new conversion is started and the running ones get that long to finish
+    before the process exits normally. A second signal, or the grace period
+    running out, stops immediately.
+
+    Closing the cache drains the writer queue, so outcomes recorded just
+    before the signal are not lost. It is closed before ffmpeg children are
+    killed so the interrupted conversions are not recorded as failed.
+    """
+    grace = config.schedule.drain_grace_seconds
+    if grace > 0 and not shutdown.draining.is_set():
+        logger.info(
+            f"Received signal {signum}, draining: no new conversions, waiting up to {grace}s "
+            f"for running ones (signal again to stop now)"
+        )
+        shutdown.draining.set()
+        timer = threading.Timer(grace, _drain_expired, (signum,))
+        timer.daemon = True
+        timer.start()
+        return
+
+    logger.info(f"Received signal {signum}, flushing cache and cleaning up...")
     if cache_manager is not None:
         cache_manager.close()
-    cleanup_temp_files(INPUT_DIR)
+    killed = registry.kill_all()
+    if killed:
+        logger.info(f"Stopped {killed} running ffmpeg process(es)")
+    for root in cleanup_roots:
+        cleanup_temp_files(root)
     sys.exit(0)
 
 
@@ -61,32 +123,61 @@ def setup_timezone():
         logger.warning("time.tzset() unavailable on this platform; TZ may be ignored")
 
 
-def main():
-    """Main application entry point."""
-    signal.signal(signal.SIGTERM, signal_handler)
-    signal.signal(signal.SIGINT, signal_handler)
+def main(argv: list[str] | None = None) -> int:
+    """Main application entry point.
 
+    Without a command this runs the scheduled service. One-shot commands
+    (see cli.py) skip the whole-library startup work: temp files are only
+    cleaned under the paths they touch, and read-only commands never clean.
+    """
+    args = cli.parse_args(argv)
     setup_timezone()
     setup_logging()
 
-    cleanup_temp_files(INPUT_DIR)
+    global cache_manager, cleanup_roots
+    cleanup_roots = cli.cleanup_roots(args)
 
-    global cache_manager
-    cache_manager = CacheManager(CACHE_DB)
+    signal.signal(signal.SIGTERM, signal_handler)
+    signal.signal(signal.SIGINT, signal_handler)
 
+    for root in cleanup_roots:
+        cleanup_temp_files(root)
+
+    autotune(config)
+    cache_manager = CacheManager(CACHE_DB)
     audio_processor = AudioProcessor(config.app.debug_mode)
-    file_processor = FileProcessor(cache_manager, audio_processor)
-    scheduler = Scheduler(file_processor)
 
     try:
-        scheduler.run()
+        if args.command not in (None, "run"):
+            return cli.dispatch(args, cache_manager, audio_processor)
+
+        if config.cache.maintenance_on_startup:
+            cache_manager.run_maintenance(
+                config.cache.failed_ttl_hours, config.cache.disk_space_ttl_hours
+            )
+        file_processor = FileProcessor(cache_manager, audio_processor)
+        throttle = PressureThrottle.from_config() if config.throttle.enabled else None
+        if throttle is not None:
+            throttle.start()
+        scheduler = Scheduler(file_processor, throttle)
+        webhook = WebhookServer(config.webhook, file_processor, scheduler) if config.webhook.enabled else None
+        if webhook is not None:
+            webhook.start()
+        try:
+            scheduler.run()
+        finally:
+            if webhook is not None:
+                webhook.stop()
+            if throttle is not None:
+                throttle.stop()
+        return 0
     finally:
         cache_manager.close()
 
 
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except ConfigError as e:
         print(f"Configuration error: {e}", file=sys.stderr)
         sys.exit(1)
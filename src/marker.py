@@ -0,0 +1,175 @@
+import io
+import logging
+import os
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, Optional, Tuple
+
+from . import __version__
+
+logger = logging.getLogger("eac3_converter")
+
+# Global Matroska tag written into every converted MKV.
+MARKER_TAG = "EAC3_CONVERTER"
+# Bumped when the rules deciding what gets converted change.
+POLICY_VERSION = 1
+
+# EBML element IDs (with their length marker bits, as they appear on disk).
+EBML = 0x1A45DFA3
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+TAGS = 0x1254C367
+TAG = 0x7373
+SIMPLE_TAG = 0x67C8
+TAG_NAME = 0x45A3
+TAG_STRING = 0x4487
+CLUSTER = 0x1F43B675
+
+# Top-level elements are skipped by seeking, but never read past this much
+# of a Tags or SeekHead element.
+MAX_ELEMENT_BYTES = 1024 * 1024
+UNKNOWN_SIZE = -1
+
+
+def marker_value(now: Optional[datetime] = None) -> str:
+    """Value of the marker tag for a file converted now."""
+    now = now or datetime.now()
+    return f"version={__version__};policy={POLICY_VERSION};converted={now.isoformat(timespec='seconds')}"
+
+
+def parse_marker(value: str) -> Dict[str, str]:
+    """``"version=2.3.0;policy=1;..."`` -> dict."""
+    fields = {}
+    for part in value.split(";"):
+        key, sep, val = part.partition("=")
+        if sep:
+            fields[key.strip()] = val.strip()
+    return fields
+
+
+def _read_vint(f: BinaryIO, keep_marker: bool) -> Optional[Tuple[int, int]]:
+    """Read an EBML variable-length integer; returns (value, length) or None at EOF."""
+    first = f.read(1)
+    if not first:
+        return None
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first[0] & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML variable-length integer")
+    rest = f.read(length - 1)
+    if len(rest) < length - 1:
+        return None
+    value = first[0] if keep_marker else first[0] & (mask - 1)
+    all_ones = value == mask - 1
+    for byte in rest:
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    if not keep_marker and all_ones:
+        return UNKNOWN_SIZE, length
+    return value, length
+
+
+def _read_header(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """(element ID, data size) of the next element, or None at EOF."""
+    element_id = _read_vint(f, keep_marker=True)
+    size = _read_vint(f, keep_marker=False)
+    if element_id is None or size is None:
+        return None
+    return element_id[0], size[0]
+
+
+def _children(data: bytes) -> Iterator[Tuple[int, bytes]]:
+    """(ID, payload) of the elements packed in ``data``."""
+    f = io.BytesIO(data)
+    while True:
+        header = _read_header(f)
+        if header is None or header[1] == UNKNOWN_SIZE:
+            return
+        yield header[0], f.read(header[1])
+
+
+def _tags_in(data: bytes) -> Iterator[Tuple[str, str]]:
+    for tag_id, tag in _children(data):
+        if tag_id != TAG:
+            continue
+        for simple_id, simple in _children(tag):
+            if simple_id != SIMPLE_TAG:
+                continue
+            fields = dict(_children(simple))
+            if TAG_NAME in fields:
+                yield (
+                    fields[TAG_NAME].decode("utf-8", "replace"),
+                    fields.get(TAG_STRING, b"").decode("utf-8", "replace"),
+                )
+
+
+def _read_element(f: BinaryIO, size: int) -> bytes:
+    if size == UNKNOWN_SIZE or size > MAX_ELEMENT_BYTES:
+        raise ValueError("element too large")
+    return f.read(size)
+
+
+def read_tags(path: str) -> Dict[str, str]:
+    """Global tags of a Matroska file, read from its header only.
+
+    Walks the top-level elements of the Segment without reading their
+    payload, so attachments and clusters cost a seek each. Tags written
+    after the first cluster are found through the SeekHead.
+    """
+    tags: Dict[str, str] = {}
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        if header is None or header[0] != EBML:
+            raise ValueError("not a Matroska file")
+        f.seek(header[1], os.SEEK_CUR)
+        header = _read_header(f)
+        if header is None or header[0] != SEGMENT:
+            raise ValueError("no Matroska segment")
+        segment_start = f.tell()
+
+        tags_positions = []
+        while True:
+            element_start = f.tell()
+            header = _read_header(f)
+            if header is None:
+                break
+            element_id, size = header
+            if element_id == CLUSTER:
+                break
+            if element_id == SEEK_HEAD:
+                for seek_id, seek in _children(_read_element(f, size)):
+                    fields = dict(_children(seek))
+                    if seek_id == SEEK and fields.get(SEEK_ID) == TAGS.to_bytes(4, "big"):
+                        tags_positions.append(int.from_bytes(fields.get(SEEK_POSITION, b""), "big"))
+            elif element_id == TAGS:
+                tags.update(_tags_in(_read_element(f, size)))
+                tags_positions = [p for p in tags_positions if segment_start + p != element_start]
+            elif size == UNKNOWN_SIZE:
+                break
+            else:
+                f.seek(size, os.SEEK_CUR)
+
+        for position in tags_positions:
+            f.seek(segment_start + position)
+            header = _read_header(f)
+            if header is not None and header[0] == TAGS:
+                tags.update(_tags_in(_read_element(f, header[1])))
+    return tags
+
+
+def read_marker(path: str) -> Optional[Dict[str, str]]:
+    """The converter marker of an MKV as a dict, or None if it has none.
+
+    Unreadable or malformed files count as unmarked; ffprobe then decides.
+    """
+    try:
+        value = read_tags(path).get(MARKER_TAG)
+    except (OSError, ValueError) as e:
+        logger.debug(f"Could not read Matroska tags of {path}: {e}")
+        return None
+    return parse_marker(value) if value else None
@@ -0,0 +1,159 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from .config import PageCacheConfig, config
+from .processes import registry
+
+logger = logging.getLogger("eac3_converter")
+
+# Pages this close behind ffmpeg's read/write position are left alone, so
+# readahead and the muxer's seeks back into recent output stay cached.
+TRAILING_BYTES = 64 * 1024 * 1024
+
+# <linux/fs.h>
+SYNC_FILE_RANGE_WAIT_BEFORE = 1
+SYNC_FILE_RANGE_WRITE = 2
+SYNC_FILE_RANGE_WAIT_AFTER = 4
+
+
+def _load_sync_file_range() -> Optional[Callable[[int, int, int, int], int]]:
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        func = libc.sync_file_range
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_longlong, ctypes.c_longlong, ctypes.c_uint]
+    func.restype = ctypes.c_int
+    return func
+
+
+_sync_file_range = _load_sync_file_range()
+
+
+def reader_position(path: str) -> Optional[int]:
+    """Furthest offset a tracked ffmpeg process has reached in ``path``.
+
+    Read from ``/proc/<pid>/fdinfo``; None when no tracked process has the
+    file open or /proc is unavailable.
+    """
+    real = os.path.realpath(path)
+    positions = []
+    for process in registry.snapshot():
+        fd_dir = f"/proc/{process.pid}/fd"
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                if os.readlink(os.path.join(fd_dir, fd)) != real:
+                    continue
+                with open(f"/proc/{process.pid}/fdinfo/{fd}") as f:
+                    for line in f:
+                        if line.startswith("pos:"):
+                            positions.append(int(line.split()[1]))
+            except (OSError, ValueError):
+                continue
+    return max(positions) if positions else None
+
+
+class PageCacheJanitor:
+    """Keeps conversions from flushing the media server's page cache.
+
+    While ffmpeg streams a remux, pages of the source it has already read
+    and of the output it has already written are dropped with
+    ``posix_fadvise(POSIX_FADV_DONTNEED)`` every ``interval_seconds``.
+    Dirty output pages can't be dropped until they reach the disk, so
+    ``drop_sync`` also writes the output back with ``sync_file_range`` as
+    it grows instead of leaving it to the kernel's flusher.
+    """
+
+    def __init__(self, cfg: PageCacheConfig):
+        self.cfg = cfg
+
+    @property
+    def enabled(self) -> bool:
+        return self.cfg.mode != "normal" and hasattr(os, "posix_fadvise")
+
+    @property
+    def write_back(self) -> bool:
+        return self.cfg.mode == "drop_sync" and _sync_file_range is not None
+
+    def drop(self, path: str, end: Optional[int] = None, write_back: bool = False) -> None:
+        """Drop cached pages of ``path`` before ``end`` (None = the whole file).
+
+        With ``write_back`` dirty pages in that range are written out first
+        (this thread waits, ffmpeg doesn't), so they are clean and dropped
+        now instead of lingering until the kernel flushes them.
+        """
+        if end is not None and end <= 0:
+            # Nothing is far enough behind ffmpeg yet.
+            return
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            if write_back:
+                flags = SYNC_FILE_RANGE_WAIT_BEFORE | SYNC_FILE_RANGE_WRITE | SYNC_FILE_RANGE_WAIT_AFTER
+                if _sync_file_range(fd, 0, end or 0, flags) != 0:
+                    logger.debug(f"sync_file_range failed for {path}: {os.strerror(ctypes.get_errno())}")
+            os.posix_fadvise(fd, 0, end or 0, os.POSIX_FADV_DONTNEED)
+        except OSError as e:
+            logger.debug(f"posix_fadvise failed for {path}: {e}")
+        finally:
+            os.close(fd)
+
+    def _pass(self, source: str, output: str) -> None:
+        position = reader_position(source)
+        if position is not None:
+            self.drop(source, position - TRAILING_BYTES)
+        try:
+            written = os.path.getsize(output)
+        except OSError:
+            return
+        self.drop(output, written - TRAILING_BYTES, write_back=self.write_back)
+
+    @contextmanager
+    def limit(self, source: str, output: str) -> Iterator[None]:
+        """Drop ``source`` and ``output`` pages behind ffmpeg while the block runs.
+
+        Both files are dropped entirely afterwards; the output is flushed
+        first with ``drop_sync``.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.wait(self.cfg.interval_seconds):
+                self._pass(source, output)
+
+        thread = threading.Thread(target=loop, name="pagecache", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+            self.drop(source)
+            if self.write_back:
+                try:
+                    fd = os.open(output, os.O_RDONLY)
+                    try:
+                        os.fdatasync(fd)
+                    finally:
+                        os.close(fd)
+                except OSError:
+                    pass
+            self.drop(output)
+
+
+janitor = PageCacheJanitor(config.page_cache)
@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from . import marker
+from .audio_processor import stream_duration_seconds
+from .config import config
+from .file_processor import FileProcessor, group_hardlinks
+from .throughput import ThroughputModel
+
+logger = logging.getLogger("eac3_converter")
+
+MB = 1_000_000
+
+
+def parse_bitrate(value: str) -> int:
+    """Convert an ffmpeg bitrate such as ``640k`` to bits per second."""
+    value = value.strip().lower()
+    multiplier = 1
+    if value.endswith("k"):
+        multiplier, value = 1_000, value[:-1]
+    elif value.endswith("m"):
+        multiplier, value = 1_000_000, value[:-1]
+    return int(float(value) * multiplier)
+
+
+def _tag(stream: Dict[str, Any], name: str) -> Optional[str]:
+    """Matroska statistics tags are written either bare or with a language suffix."""
+    tags = stream.get("tags") or {}
+    for key, value in tags.items():
+        if key == name or key.startswith(f"{name}-"):
+            return value
+    return None
+
+
+def estimate_stream_bytes(stream: Dict[str, Any], duration: float) -> Optional[int]:
+    """Best-effort size of one source stream, or None when the probe has no hint."""
+    number_of_bytes = _tag(stream, "NUMBER_OF_BYTES")
+    if number_of_bytes and number_of_bytes.isdigit():
+        return int(number_of_bytes)
+    bit_rate = stream.get("bit_rate") or _tag(stream, "BPS")
+    try:
+        return int(int(bit_rate) * duration / 8) if bit_rate and duration else None
+    except ValueError:
+        return None
+
+
+class Planner:
+    """Builds a dry-run conversion plan: scan and probe only, nothing is converted."""
+
+    def __init__(self, file_processor: FileProcessor):
+        self.file_processor = file_processor
+        self.audio_processor = file_processor.audio_processor
+        self.cache_manager = file_processor.cache_manager
+
+    def estimate_encode_seconds(
+        self, model: ThroughputModel, input_bytes: int, duration: float, channels: int
+    ) -> float:
+        """Model prediction, or input size over the configured default throughput."""
+        predicted = model.predict(input_bytes, duration, channels)
+        if predicted is None:
+            predicted = input_bytes / (config.plan.default_throughput_mbps * MB)
+        return round(predicted, 1)
+
+    def plan_file(self, file_path: str, model: ThroughputModel) -> Optional[Dict[str, Any]]:
+        """Plan one MKV file, mirroring the decisions of process_file."""
+        metadata = self.file_processor.get_file_metadata(file_path)
+        if metadata is None:
+            return None
+        entry: Dict[str, Any] = {"path": file_path, "size": metadata["size"]}
+
+        file_key = self.file_processor.generate_file_key(file_path, metadata)
+        if self.cache_manager.is_processed(file_key):
+            entry["action"] = "cached"
+            return entry
+        if marker.read_marker(file_path) is not None:
+            entry["action"] = "skip"
+            entry["reason"] = "converted_marker"
+            return entry
+
+        probe = self.audio_processor.probe_file(file_path)
+        audio_streams = [s for s in probe["streams"] if s.get("codec_type") == "audio"]
+        audio_plan = self.audio_processor.build_audio_plan(
+            audio_streams, config.target.codec_for(file_path), config.target.redundant_tracks
+        )
+        if not any(stream["action"] in ("encode", "drop") for stream in audio_plan):
+            entry["action"] = "skip"
+            if any("redundant_with" in stream for stream in audio_plan):
+                entry["reason"] = "compatible_track_present"
+            else:
+                entry["reason"] = "no_dts_or_truehd"
+            return entry
+
+        try:
+            duration = float(probe["format"].get("duration") or 0)
+        except ValueError:
+            duration = 0.0
+        if not duration:
+            duration = max((stream_duration_seconds(s) for s in audio_streams), default=0.0)
+
+        output_size: Optional[int] = metadata["size"]
+        for stream_plan, stream in zip(audio_plan, audio_streams):
+            if stream_plan["action"] not in ("encode", "drop"):
+                continue
+            source_bytes = estimate_stream_bytes(stream, duration)
+            if source_bytes is None or not duration:
+                # Without a size hint the only safe bound is the source size.
+                output_size = metadata["size"]
+                break
+            if stream_plan["action"] == "encode":
+                output_size += parse_bitrate(stream_plan["bitrate"]) * duration / 8
+            output_size -= source_bytes
+
+        entry.update({
+            "action": "convert",
+            "duration_seconds": duration,
+            "audio_plan": audio_plan,
+            "estimated_output_bytes": int(max(output_size, 0)),
+            "estimated_encode_seconds": self.estimate_encode_seconds(
+                model,
+                metadata["size"],
+                duration,
+                sum(s["out_channels"] for s in audio_plan if s["action"] == "encode"),
+            ),
+        })
+        return entry
+
+    def build_plan(self, input_dir: str) -> Dict[str, Any]:
+        """Scan ``input_dir`` and plan every MKV file found."""
+        model = ThroughputModel.fit(self.cache_manager.get_history())
+        logger.info(model.describe())
+        files: List[Dict[str, Any]] = []
+        for group in group_hardlinks(self.file_processor.find_mkv_files(input_dir)):
+            entry = self.plan_file(group[0], model)
+            if entry is not None:
+                files.append(entry)
+                # Other hardlinks are re-linked to the converted file, not converted.
+                files.extend({"path": alias, "action": "hardlink", "hardlink_of": group[0]}
+                             for alias in group[1:])
+
+        conversions = [f for f in files if f["action"] == "convert"]
+        filesystems: Dict[int, Dict[str, Any]] = {}
+        for entry in conversions:
+            # Temp files are written next to the source.
+            parent = os.path.dirname(entry["path"])
+            device = os.stat(parent).st_dev
+            fs = filesystems.get(device)
+            if fs is None:
+                stat = os.statvfs(parent)
+                fs = filesystems[device] = {
+                    "example_path": parent,
+                    "available_bytes": stat.f_bavail * stat.f_frsize,
+                    "conversions": 0,
+                    "peak_temp_bytes": 0,
+                    "required_free_bytes": 0,
+                    "_outputs": [],
+                }
+            fs["conversions"] += 1
+            fs["_outputs"].append(entry["estimated_output_bytes"])
+            fs["required_free_bytes"] = max(
+                fs["required_free_bytes"],
+                int(entry["size"] * config.ffmpeg.min_disk_space_ratio),
+            )
+
+        # Up to this many conversions hold a temp file on one filesystem at once.
+        per_device = config.concurrency.per_device_jobs
+        concurrent = max(1, min(per_device, config.concurrency.max_jobs) if per_device > 0
+                         else config.concurrency.max_jobs)
+        for fs in filesystems.values():
+            fs["peak_temp_bytes"] = sum(sorted(fs.pop("_outputs"), reverse=True)[:concurrent])
+
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "input_dir": input_dir,
+            "throughput_model": {
+                "seconds_per_gb": round(model.seconds_per_gb, 3),
+                "seconds_per_channel_hour": round(model.seconds_per_channel_hour, 3),
+                "samples": model.samples,
+            },
+            "throughput_source": "history" if model.samples else "default",
+            "summary": {
+                "files_scanned": len(files),
+                "cached": sum(1 for f in files if f["action"] == "cached"),
+                "skipped": sum(1 for f in files if f["action"] == "skip"),
+                "hardlinks": sum(1 for f in files if f["action"] == "hardlink"),
+                "conversions": len(conversions),
+                "input_bytes": sum(f["size"] for f in conversions),
+                "estimated_output_bytes": sum(f["estimated_output_bytes"] for f in conversions),
+                "estimated_encode_seconds": round(
+                    sum(f["estimated_encode_seconds"] for f in conversions), 1
+                ),
+            },
+            "filesystems": list(filesystems.values()),
+            "files": files,
+        }
+
+    @staticmethod
+    def write_plan(plan: Dict[str, Any], output_path: str) -> None:
+        path = Path(output_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(plan, indent=2))
+        os.replace(tmp, path)
+        summary = plan["summary"]
+        logger.info(
+            f"Plan written to {path}: {summary['conversions']} conversion(s) of "
+            f"{summary['files_scanned']} file(s), ~{summary['estimated_encode_seconds'] / 3600:.1f}h "
+            f"encode time ({plan['throughput_source']} throughput)"
+        )
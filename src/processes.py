@@ -0,0 +1,137 @@
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger("eac3_converter")
+
+# How often a waiting caller wakes up to account for paused time.
+POLL_SECONDS = 5.0
+
+
+class ProcessRegistry:
+    """Tracks running ffmpeg children so they can be paused, resumed or stopped."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes: set[subprocess.Popen] = set()
+        self.paused = False
+
+    def add(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(process)
+            if self.paused:
+                self._send(process, signal.SIGSTOP)
+
+    def remove(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+    def snapshot(self) -> List[subprocess.Popen]:
+        with self._lock:
+            return list(self._processes)
+
+    @staticmethod
+    def _send(process: subprocess.Popen, signum: int) -> None:
+        try:
+            os.kill(process.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def pause_all(self) -> int:
+        """SIGSTOP every running child (and any started while paused)."""
+        with self._lock:
+            self.paused = True
+            for process in self._processes:
+                self._send(process, signal.SIGSTOP)
+            return len(self._processes)
+
+    def resume_all(self) -> int:
+        with self._lock:
+            self.paused = False
+            for process in self._processes:
+                self._send(process, signal.SIGCONT)
+            return len(self._processes)
+
+    def kill_all(self) -> int:
+        """SIGKILL every running child; their callers see a failed command."""
+        with self._lock:
+            for process in self._processes:
+                self._send(process, signal.SIGKILL)
+            return len(self._processes)
+
+
+registry = ProcessRegistry()
+
+
+class WaitStats:
+    """Cumulative time threads spent blocked on child processes, per program.
+
+    With several workers the total can exceed the run's wall time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Tuple[int, float]] = {}
+
+    def add(self, program: str, seconds: float) -> None:
+        with self._lock:
+            calls, total = self._totals.get(program, (0, 0.0))
+            self._totals[program] = (calls + 1, total + seconds)
+
+    def snapshot(self) -> Dict[str, Tuple[int, float]]:
+        """``{program: (calls, seconds)}`` so far."""
+        with self._lock:
+            return dict(self._totals)
+
+
+wait_stats = WaitStats()
+
+
+def run_probe(command: List[str]) -> subprocess.CompletedProcess:
+    """``subprocess.run(command, capture_output=True, text=True)``, timed in ``wait_stats``."""
+    started = time.monotonic()
+    try:
+        return subprocess.run(command, capture_output=True, text=True)
+    finally:
+        wait_stats.add(os.path.basename(command[0]), time.monotonic() - started)
+
+
+def run_tracked(command: List[str], timeout: float) -> subprocess.CompletedProcess:
+    """Run ``command`` like ``subprocess.run(check=True, capture_output=True, text=True)``.
+
+    The child is registered in ``registry`` while it runs, and time spent
+    paused by the registry does not count against ``timeout``.
+    """
+    launched = time.monotonic()
+    process = subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    registry.add(process)
+    try:
+        budget = float(timeout)
+        while True:
+            started = time.monotonic()
+            try:
+                stdout, stderr = process.communicate(timeout=max(min(budget, POLL_SECONDS), 0.01))
+                break
+            except subprocess.TimeoutExpired:
+                if not registry.paused:
+                    budget -= time.monotonic() - started
+                if budget <= 0:
+                    process.kill()
+                    process.communicate()
+                    raise subprocess.TimeoutExpired(command, timeout)
+    finally:
+        registry.remove(process)
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        wait_stats.add(os.path.basename(command[0]), time.monotonic() - launched)
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
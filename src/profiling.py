@@ -0,0 +1,136 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, List
+
+from .config import ProfileConfig, config
+from .processes import wait_stats
+
+logger = logging.getLogger("eac3_converter")
+
+# Frames kept per tracemalloc traceback; enough to see the caller of a hot allocation.
+TRACEMALLOC_FRAMES = 10
+
+
+class RunProfiler:
+    """Profiles one processing run of the Python orchestration layer.
+
+    ``cpu`` writes a ``.pstats`` file (open it with ``python -m pstats`` or
+    snakeviz) plus a text summary of the top functions by cumulative time;
+    ``memory`` writes the top allocation sites from tracemalloc; ``all``
+    does both. Every mode logs how much time went to waiting on ffmpeg /
+    ffprobe versus everything else.
+    """
+
+    def __init__(self, cfg: ProfileConfig):
+        self.cfg = cfg
+        self._lock = threading.Lock()
+        self._thread_profiles: List[cProfile.Profile] = []
+
+    @property
+    def cpu(self) -> bool:
+        return self.cfg.mode in ("cpu", "all")
+
+    @property
+    def memory(self) -> bool:
+        return self.cfg.mode in ("memory", "all")
+
+    def _profile_new_thread(self, frame, event, arg) -> None:
+        # Before 3.12 a cProfile.Profile only sees the thread that enabled it,
+        # so each worker thread gets its own, merged when the run ends.
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self._lock:
+            self._thread_profiles.append(profile)
+        profile.enable()
+
+    @contextmanager
+    def profile(self, label: str = "run") -> Iterator[None]:
+        if self.cfg.mode == "off":
+            yield
+            return
+
+        os.makedirs(self.cfg.output_dir, exist_ok=True)
+        base = os.path.join(self.cfg.output_dir, f"{label}-{datetime.now():%Y%m%d-%H%M%S}")
+        waits_before = wait_stats.snapshot()
+        wall_started, cpu_started = time.monotonic(), time.process_time()
+
+        profile = None
+        if self.cpu:
+            profile = cProfile.Profile()
+            if sys.version_info < (3, 12):
+                threading.setprofile(self._profile_new_thread)
+            profile.enable()
+        if self.memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                threading.setprofile(None)
+                self._write_cpu_report(profile, base)
+            if self.memory:
+                self._write_memory_report(base)
+            self._log_wait_summary(waits_before, time.monotonic() - wall_started,
+                                   time.process_time() - cpu_started)
+
+    def _write_cpu_report(self, profile: cProfile.Profile, base: str) -> None:
+        stats = pstats.Stats(profile)
+        with self._lock:
+            thread_profiles, self._thread_profiles = self._thread_profiles, []
+        for thread_profile in thread_profiles:
+            thread_profile.disable()
+            stats.add(thread_profile)
+        stats.dump_stats(f"{base}.pstats")
+
+        summary = io.StringIO()
+        pstats.Stats(f"{base}.pstats", stream=summary).sort_stats("cumulative").print_stats(self.cfg.top)
+        with open(f"{base}-cpu.txt", "w") as f:
+            f.write(summary.getvalue())
+        logger.info(f"Profile: CPU profile written to {base}.pstats")
+
+    def _write_memory_report(self, base: str) -> None:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        lines = [f"current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB", ""]
+        for stat in snapshot.statistics("traceback")[:self.cfg.top]:
+            lines.append(f"{stat.size / 1024:.1f} KiB in {stat.count} block(s)")
+            lines.extend(f"    {line}" for line in stat.traceback.format())
+        with open(f"{base}-alloc.txt", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        logger.info(
+            f"Profile: peak traced memory {peak / (1024 * 1024):.1f} MiB, "
+            f"top allocations written to {base}-alloc.txt"
+        )
+
+    @staticmethod
+    def _log_wait_summary(before, wall_seconds: float, cpu_seconds: float) -> None:
+        waits = []
+        waited = 0.0
+        for program, (calls, seconds) in sorted(wait_stats.snapshot().items()):
+            prev_calls, prev_seconds = before.get(program, (0, 0.0))
+            if calls > prev_calls:
+                waits.append(f"{program} {seconds - prev_seconds:.1f}s over {calls - prev_calls} call(s)")
+                waited += seconds - prev_seconds
+        logger.info(
+            f"Profile: run took {wall_seconds:.1f}s wall, {cpu_seconds:.1f}s Python CPU; "
+            f"waiting on subprocesses: {', '.join(waits) or 'none'} "
+            f"(total {waited:.1f}s across all workers)"
+        )
+
+
+profiler = RunProfiler(config.profile)
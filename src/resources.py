@@ -0,0 +1,142 @@
+import logging
+import math
+import os
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from .config import Config
+
+logger = logging.getLogger("eac3_converter")
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root: str = CGROUP_ROOT) -> Optional[float]:
+    """CPU quota in cores from cgroup v2 ``cpu.max`` (v1 CFS files as fallback).
+
+    None means unlimited or unknown.
+    """
+    value = _read(os.path.join(root, "cpu.max"))
+    if value is not None:
+        quota, _, period = value.partition(" ")
+        if quota == "max":
+            return None
+        try:
+            return int(quota) / int(period or 100000)
+        except ValueError:
+            return None
+
+    quota = _read(os.path.join(root, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(root, "cpu", "cpu.cfs_period_us"))
+    try:
+        if quota is not None and period is not None and int(quota) > 0:
+            return int(quota) / int(period)
+    except ValueError:
+        pass
+    return None
+
+
+def cgroup_memory_limit(root: str = CGROUP_ROOT) -> Optional[int]:
+    """Memory limit in bytes from cgroup v2 ``memory.max``; None if unlimited."""
+    value = _read(os.path.join(root, "memory.max"))
+    if value is None or value == "max":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def affinity_cpus() -> int:
+    """CPUs this process may be scheduled on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+@dataclass
+class Tuning:
+    cpus: int
+    memory_bytes: Optional[int]
+    max_jobs: int
+    ffmpeg_threads: int
+    # CONCURRENCY_PROFILE with each window's jobs clamped to the memory budget.
+    profile: Tuple[Tuple[str, int], ...] = ()
+
+
+def compute_tuning(
+    cfg: Config,
+    cpu_limit: Optional[float],
+    memory_limit: Optional[int],
+    visible_cpus: int,
+) -> Tuning:
+    """Derive concurrent jobs and ffmpeg threads per job from the limits.
+
+    Each job gets at least two cores (one for demux/mux, one for the audio
+    encode) and ``memory_per_job_mb`` of memory. Explicit settings (non-zero
+    MAX_CONCURRENT_JOBS / FFMPEG_THREADS) win. CONCURRENCY_PROFILE windows
+    are clamped to what memory allows (or to an explicit, higher
+    MAX_CONCURRENT_JOBS), and threads are sized for the busiest window.
+    """
+    cpus = visible_cpus
+    if cpu_limit is not None:
+        cpus = min(cpus, max(1, math.ceil(cpu_limit)))
+    cpus = max(cpus, 1)
+
+    memory_jobs = None
+    if memory_limit is not None:
+        memory_jobs = max(1, memory_limit // (cfg.concurrency.memory_per_job_mb * 1024 * 1024))
+
+    max_jobs = cfg.concurrency.max_jobs
+    if max_jobs <= 0:
+        max_jobs = max(1, cpus // 2)
+        if memory_jobs is not None:
+            max_jobs = min(max_jobs, memory_jobs)
+
+    profile = []
+    for window, jobs in cfg.concurrency.profile:
+        if memory_jobs is not None and jobs > max(memory_jobs, max_jobs):
+            logger.warning(
+                f"CONCURRENCY_PROFILE {window}={jobs} exceeds the memory budget; "
+                f"using {max(memory_jobs, max_jobs)}"
+            )
+            jobs = max(memory_jobs, max_jobs)
+        profile.append((window, jobs))
+
+    threads = cfg.ffmpeg.threads
+    if threads <= 0:
+        peak_jobs = max([max_jobs] + [jobs for _, jobs in profile])
+        threads = max(1, cpus // peak_jobs)
+
+    return Tuning(
+        cpus=cpus, memory_bytes=memory_limit, max_jobs=max_jobs, ffmpeg_threads=threads,
+        profile=tuple(profile),
+    )
+
+
+def autotune(cfg: Config, root: str = CGROUP_ROOT) -> Tuning:
+    """Resolve ``0 = auto`` settings against the container's real limits.
+
+    The resolved values are written back into ``cfg`` so the rest of the
+    app keeps reading ``config.ffmpeg.threads`` / ``config.concurrency.max_jobs``
+    / ``config.concurrency.profile``.
+    """
+    tuning = compute_tuning(cfg, cgroup_cpu_limit(root), cgroup_memory_limit(root), affinity_cpus())
+    cfg.concurrency.max_jobs = tuning.max_jobs
+    cfg.ffmpeg.threads = tuning.ffmpeg_threads
+    cfg.concurrency.profile = tuning.profile
+    memory = f"{tuning.memory_bytes // (1024 * 1024)} MiB" if tuning.memory_bytes else "unlimited"
+    logger.info(
+        f"Resources: {tuning.cpus} usable CPU(s), memory limit {memory} -> "
+        f"{tuning.max_jobs} concurrent job(s), ffmpeg -threads {tuning.ffmpeg_threads}"
+    )
+    return tuning
@@ -0,0 +1,98 @@
+import errno
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from .config import config
+from .exceptions import ConversionError, ConversionTimeoutError, OutputVerificationError
+
+# ffmpeg stderr that points at the environment (storage, memory, a signal)
+# rather than at the file itself.
+TRANSIENT_MESSAGES = (
+    "input/output error",
+    "stale file handle",
+    "resource temporarily unavailable",
+    "connection reset",
+    "connection timed out",
+    "network is unreachable",
+    "host is down",
+    "no space left on device",
+    "cannot allocate memory",
+    "too many open files",
+    "device or resource busy",
+    "received signal",
+)
+TRANSIENT_ERRNOS = {
+    errno.EIO, errno.ESTALE, errno.EAGAIN, errno.ENOSPC, errno.ENOMEM, errno.EMFILE,
+    errno.ENFILE, errno.EBUSY, errno.ETIMEDOUT, errno.ECONNRESET, errno.ENETUNREACH,
+}
+# The fatal error is at the end of ffmpeg's stderr; earlier lines are often
+# harmless warnings about the input.
+STDERR_TAIL_CHARS = 2000
+
+
+def classify_failure(error: BaseException) -> str:
+    """``"transient"`` or ``"permanent"`` for an exception raised by a conversion.
+
+    Timeouts, ffmpeg killed by a signal (negative exit code, e.g. the OOM
+    killer) and I/O-level errors are transient. Verification failures and
+    anything else ffmpeg rejects are permanent: the file would fail again.
+    """
+    if isinstance(error, ConversionTimeoutError):
+        return "transient"
+    if isinstance(error, OutputVerificationError):
+        return "permanent"
+    if isinstance(error, OSError):
+        return "transient" if error.errno in TRANSIENT_ERRNOS else "permanent"
+    if isinstance(error, ConversionError):
+        if error.returncode is not None and error.returncode < 0:
+            return "transient"
+        tail = (error.stderr or str(error))[-STDERR_TAIL_CHARS:].lower()
+        if any(message in tail for message in TRANSIENT_MESSAGES):
+            return "transient"
+    return "permanent"
+
+
+def backoff(attempt: int) -> timedelta:
+    """Wait after failed attempt ``attempt`` (1-based) before the next one."""
+    minutes = config.retry.backoff_minutes * 2 ** (attempt - 1)
+    return timedelta(minutes=min(minutes, config.retry.max_backoff_hours * 60))
+
+
+def failed_attempts(previous: Optional[Dict[str, Any]]) -> int:
+    """Attempts already failed, from the file's previous outcome (CacheManager.get_outcome)."""
+    if not previous or previous.get("action") != "failed":
+        return 0
+    return int(previous.get("attempt") or 1)
+
+
+def is_retry(previous: Optional[Dict[str, Any]]) -> bool:
+    """True if this attempt retries a transient failure (and should run degraded)."""
+    return failed_attempts(previous) > 0 and previous.get("failure") == "transient"
+
+
+def failure_outcome(
+    error: BaseException,
+    error_type: str,
+    previous: Optional[Dict[str, Any]],
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Cache outcome for a failed conversion, with its retry schedule.
+
+    Transient failures get ``retry_after`` (exponential backoff) until
+    RETRY_MAX_ATTEMPTS attempts have failed; CacheManager.is_processed lets
+    the file through again once it passes. Permanent and exhausted failures
+    have none and stay cached until CACHE_FAILED_TTL_HOURS or the file changes.
+    """
+    now = now or datetime.now()
+    failure = classify_failure(error)
+    attempt = failed_attempts(previous) + 1
+    outcome = {
+        "action": "failed",
+        "error_type": error_type,
+        "error": str(error),
+        "failure": failure,
+        "attempt": attempt,
+    }
+    if failure == "transient" and attempt < config.retry.max_attempts:
+        outcome["retry_after"] = (now + backoff(attempt)).isoformat(timespec="seconds")
+    return outcome
@@ -0,0 +1,88 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .processes import wait_stats
+
+
+class RunStats:
+    """Counters for one processing run, shared by all worker threads."""
+
+    COUNTERS = (
+        "files_scanned", "cache_hits", "conversions", "failures", "skipped",
+        "bytes_before", "bytes_after",
+    )
+
+    def __init__(self, command: str = "run"):
+        self.command = command
+        self.started_at = datetime.now()
+        self._started = time.monotonic()
+        self._probes_before = wait_stats.snapshot().get("ffprobe", (0, 0.0))[0]
+        self._lock = threading.Lock()
+        self._values: Dict[str, Any] = {name: 0 for name in self.COUNTERS}
+        self._values["encode_seconds"] = 0.0
+        self._values["peak_concurrency"] = 0
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._values[name] += amount
+
+    def add_conversion(self, bytes_before: int, bytes_after: int, encode_seconds: float) -> None:
+        with self._lock:
+            self._values["bytes_before"] += bytes_before
+            self._values["bytes_after"] += bytes_after
+            self._values["encode_seconds"] += encode_seconds
+
+    def note_concurrency(self, running: int) -> None:
+        with self._lock:
+            self._values["peak_concurrency"] = max(self._values["peak_concurrency"], running)
+
+    def __getitem__(self, name: str) -> Any:
+        with self._lock:
+            return self._values[name]
+
+    def finish(self) -> Dict[str, Any]:
+        """The run as a ``runs`` row."""
+        probes = wait_stats.snapshot().get("ffprobe", (0, 0.0))[0] - self._probes_before
+        with self._lock:
+            return {
+                "command": self.command,
+                "started_at": self.started_at.isoformat(),
+                "finished_at": datetime.now().isoformat(),
+                "wall_seconds": time.monotonic() - self._started,
+                "probes": probes,
+                **self._values,
+            }
+
+
+def _mean(values: List[float]) -> Optional[float]:
+    return sum(values) / len(values) if values else None
+
+
+def _change(older: List[float], newer: List[float]) -> Optional[float]:
+    before, after = _mean(older), _mean(newer)
+    if not before or after is None:
+        return None
+    return after / before - 1
+
+
+def summarize_trend(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compare the older and newer half of ``runs`` (newest first).
+
+    Changes are relative (0.25 = +25 %); None when there are fewer than two
+    runs to compare.
+    """
+    ordered = list(reversed(runs))
+    half = len(ordered) // 2
+    older, newer = ordered[:half], ordered[len(ordered) - half:]
+
+    def pick(rows, key):
+        return [row[key] or 0 for row in rows]
+
+    return {
+        "runs": len(runs),
+        "wall_seconds_change": _change(pick(older, "wall_seconds"), pick(newer, "wall_seconds")),
+        "files_scanned_change": _change(pick(older, "files_scanned"), pick(newer, "files_scanned")),
+        "bytes_saved": sum((row["bytes_before"] or 0) - (row["bytes_after"] or 0) for row in runs),
+    }
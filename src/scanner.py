@@ -0,0 +1,63 @@
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, List, Set, Tuple
+
+logger = logging.getLogger("eac3_converter")
+
+
+def _list_dir(path: str, excluded_dirs: Set[str]) -> Tuple[List[str], List[str]]:
+    """(file paths, subdirectory paths to descend into) of one directory.
+
+    Follows os.walk: symlinked directories are not descended into, and an
+    unreadable directory is skipped.
+    """
+    files, subdirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.path)
+                elif entry.name.lower() not in excluded_dirs and not entry.is_symlink():
+                    subdirs.append(entry.path)
+    except OSError as e:
+        logger.debug(f"Cannot list {path}: {e}")
+    return files, subdirs
+
+
+def _sort_key(path: str) -> List[str]:
+    return path.split(os.sep)
+
+
+def scan(
+    roots: Iterable[str],
+    accept: Callable[[str], bool],
+    excluded_dirs: Iterable[str] = (),
+    workers: int = 1,
+) -> List[str]:
+    """Files under ``roots`` whose name passes ``accept``, sorted by path.
+
+    Every directory is listed as its own task on a pool of ``workers``
+    threads, so separate mounts and large subtrees are read in parallel and
+    a scan takes about as long as the slowest mount rather than their sum.
+    Directories named in ``excluded_dirs`` (case-insensitive) are pruned
+    and ``.temp_*`` files are never returned.
+    """
+    excluded = {name.lower() for name in excluded_dirs}
+    found: List[str] = []
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="scan") as pool:
+        pending: Set[Future] = {pool.submit(_list_dir, root, excluded) for root in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                for path in files:
+                    name = os.path.basename(path)
+                    if not name.startswith(".temp_") and accept(name):
+                        found.append(path)
+                pending.update(pool.submit(_list_dir, subdir, excluded) for subdir in subdirs)
+    return sorted(found, key=_sort_key)
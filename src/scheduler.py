@@ -1,9 +1,16 @@
 import logging
+import threading
 import time
 from datetime import datetime, date, timedelta
+from typing import Callable
 
-from .config import config, INPUT_DIR
-from .file_processor import FileProcessor
+from . import profiling, shutdown
+from .config import config, in_time_window, parse_time_window, INPUT_DIR
+from .dispatcher import Job, JobDispatcher, devices_for
+from .file_processor import FileProcessor, group_hardlinks
+from .run_stats import RunStats
+from .throttle import PressureThrottle
+from .throughput import ThroughputModel
 
 logger = logging.getLogger("eac3_converter")
 
@@ -11,12 +18,32 @@ logger = logging.getLogger("eac3_converter")
 class Scheduler:
     """Handles the scheduling and main processing loop."""
 
-    def __init__(self, file_processor: FileProcessor):
+    def __init__(
+        self,
+        file_processor: FileProcessor,
+        throttle: PressureThrottle | None = None,
+        clock: Callable[[], datetime] = datetime.now,
+        use_profile: bool = True,
+    ):
         self.file_processor = file_processor
+        self.throttle = throttle
+        self.clock = clock
+        # CONCURRENCY_PROFILE shapes the service; one-off CLI conversions
+        # (use_profile=False) run at MAX_CONCURRENT_JOBS at any hour.
+        self.concurrency_profile = [
+            (parse_time_window(window), jobs) for window, jobs in config.concurrency.profile
+        ] if use_profile else []
+        self._profile_jobs: int | None = None
+        # One admission gate for every caller, so webhook conversions count
+        # against the same global and per-device limits as the scheduled run.
+        self.dispatcher = self._dispatcher()
         self.start_hour, self.start_minute = config.get_parsed_start_time()
         self.run_immediately = config.schedule.run_immediately
         self.input_dir = INPUT_DIR
         self.last_run_date: date | None = None
+        # Paths being processed by any caller (scheduled run, webhook, ...).
+        self._in_flight: set[str] = set()
+        self._in_flight_lock = threading.Lock()
 
     def should_run_now(self) -> bool:
         """Determine if processing should run at the current time."""
@@ -39,31 +66,139 @@ class Scheduler:
         return False
 
     def process_files(self) -> None:
-        """Process all MKV files (and optionally standalone audio files) in the input directory."""
-        files_to_process = self.file_processor.find_mkv_files(self.input_dir)
-        logger.debug(f"Total MKV files to process: {len(files_to_process)}")
+        """Process all MKV files (and optionally standalone audio files) in the input directory.
+
+        Profiled when PROFILE_MODE is set.
+        """
+        with profiling.profiler.profile("run"):
+            self._process_files()
 
-        processed_count = 0
-        for file_path in files_to_process:
-            self.file_processor.process_file(file_path)
-            processed_count += 1
+    def _process_files(self) -> None:
+        stats = RunStats("run")
+        history = self.file_processor.cache_manager.get_history()
+        logger.info(ThroughputModel.fit(history).describe())
 
+        scan_started = time.monotonic()
+        files_to_process, audio_files = self.file_processor.find_media_files(self.input_dir)
+        logger.info(f"Scan: {len(files_to_process)} MKV file(s) in {time.monotonic() - scan_started:.1f}s")
+        logger.debug(f"Total MKV files to process: {len(files_to_process)}")
         if config.standalone_audio.enabled:
-            audio_files = self.file_processor.find_standalone_audio_files(self.input_dir)
             logger.info(f"Standalone audio enabled: {len(audio_files)} file(s) to inspect")
-            for file_path in audio_files:
-                self.file_processor.process_standalone_audio_file(file_path)
-                processed_count += 1
+
+        stats.incr("files_scanned", len(files_to_process) + len(audio_files))
+        processed_count, peak = self._process_paths(files_to_process, audio_files, stats=stats)
+        stats.note_concurrency(peak)
+
+        cache = self.file_processor.cache_manager
+        run = stats.finish()
+        cache.record_run(run)
+        if config.cache.maintenance_after_run:
+            cache.run_maintenance(config.cache.failed_ttl_hours, config.cache.disk_space_ttl_hours)
 
         # Get cache size for summary
-        cache_size = self.file_processor.cache_manager.get_cache_size()
+        cache_size = cache.get_cache_size()
 
         logger.info(f"Processing summary: {processed_count} files processed, "
                    f"{cache_size} total cached entries")
+        logger.info(
+            f"Run: {run['wall_seconds']:.0f}s, {run['cache_hits']} cache hit(s), {run['probes']} probe(s), "
+            f"{run['conversions']} converted, {run['failures']} failed, "
+            f"{(run['bytes_before'] - run['bytes_after']) / 1e9:.2f} GB saved, "
+            f"peak {run['peak_concurrency']} concurrent job(s)"
+        )
 
-        if not self.run_immediately:
+        if not self.run_immediately and not config.schedule.continuous:
             logger.info("Finishing daily processing...")
 
+    def process_paths(self, mkv_files: list[str], audio_files: list[str], force: bool = False) -> int:
+        """Process the given files with up to ``config.concurrency.max_jobs`` workers.
+
+        At most ``config.concurrency.per_device_jobs`` of them touch the same
+        block device at once; both limits count jobs from concurrent calls
+        together. Hardlinks of one MKV are converted once. Paths another
+        caller is already processing are skipped. Returns the number of
+        files handled.
+        """
+        return self._process_paths(mkv_files, audio_files, force)[0]
+
+    def _process_paths(
+        self,
+        mkv_files: list[str],
+        audio_files: list[str],
+        force: bool = False,
+        stats: RunStats | None = None,
+    ) -> tuple[int, int]:
+        """process_paths, counting outcomes in ``stats``; returns (files handled, peak concurrency)."""
+        mkv_files, audio_files = self._claim(mkv_files), self._claim(audio_files)
+        try:
+            peak = self._run(mkv_files, audio_files, force, stats)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.difference_update(mkv_files + audio_files)
+        return len(mkv_files) + len(audio_files), peak
+
+    def _claim(self, paths: list[str]) -> list[str]:
+        with self._in_flight_lock:
+            claimed = [path for path in paths if path not in self._in_flight]
+            self._in_flight.update(claimed)
+        if len(claimed) < len(paths):
+            logger.info(f"Skipping {len(paths) - len(claimed)} file(s) already being processed")
+        return claimed
+
+    def _run(self, mkv_files: list[str], audio_files: list[str], force: bool, stats: RunStats | None) -> int:
+        jobs = [
+            Job(
+                path=group[0],
+                run=lambda group=group: self.file_processor.process_file(
+                    group[0], force=force, hardlinks=group[1:], stats=stats
+                ),
+                devices=devices_for(group[0]),
+            )
+            for group in group_hardlinks(mkv_files)
+        ]
+        jobs += self._jobs(
+            lambda path: self.file_processor.process_standalone_audio_file(path, force=force, stats=stats),
+            audio_files,
+        )
+        return self.dispatcher.run(jobs)
+
+    @staticmethod
+    def _jobs(job: Callable[[str], None], paths: list[str]) -> list[Job]:
+        return [Job(path=path, run=lambda path=path: job(path), devices=devices_for(path)) for path in paths]
+
+    def max_jobs(self) -> int:
+        """Concurrent jobs allowed right now.
+
+        The first CONCURRENCY_PROFILE window containing the current time
+        decides (0 = admit nothing); outside every window MAX_CONCURRENT_JOBS
+        applies. Re-read by the dispatcher on every admission pass, so a
+        change takes effect mid-run: running jobs finish, new ones follow
+        the new limit.
+        """
+        now = self.clock()
+        minute_of_day = now.hour * 60 + now.minute
+        jobs = max(1, config.concurrency.max_jobs)
+        for window, window_jobs in self.concurrency_profile:
+            if in_time_window(window, minute_of_day):
+                jobs = window_jobs
+                break
+        if self.concurrency_profile and jobs != self._profile_jobs:
+            paused = " (new conversions paused)" if jobs == 0 else ""
+            logger.info(f"Concurrency profile: {jobs} concurrent job(s) from {now:%H:%M}{paused}")
+        self._profile_jobs = jobs
+        return jobs
+
+    def _dispatcher(self) -> JobDispatcher:
+        may_admit = (lambda: True) if self.throttle is None else (lambda: not self.throttle.pressured)
+        return JobDispatcher(
+            max_jobs=self.max_jobs,
+            per_device_limit=config.concurrency.per_device_jobs,
+            may_admit=may_admit,
+            should_stop=shutdown.draining.is_set,
+            # Each job runs on a fresh thread; don't leak its cache reader.
+            on_worker_exit=lambda: self.file_processor.cache_manager.release_connection(),
+        )
+
     def calculate_wait_seconds(self) -> int:
         """Calculate seconds to wait until start time."""
         now = datetime.now()
@@ -94,15 +229,31 @@ class Scheduler:
                 self.process_files()
                 break
 
+            if config.schedule.continuous:
+                # Admissions follow the concurrency profile; START_TIME is ignored.
+                self.process_files()
+                if shutdown.draining.is_set():
+                    logger.info("Drain complete, stopping watch service")
+                    break
+                logger.info(f"Next scan in {config.schedule.rescan_minutes} minute(s)")
+                if shutdown.draining.wait(config.schedule.rescan_minutes * 60):
+                    break
+                continue
+
             # Calculate wait time until next execution
             wait_seconds = self.calculate_wait_seconds()
             if wait_seconds > 0:
                 logger.info(f"Waiting for start time {self.start_hour}:{self.start_minute:02d} "
                            f"({wait_seconds} seconds)...")
-                time.sleep(wait_seconds)
+                if shutdown.draining.wait(wait_seconds):
+                    break
 
             # Process files at the scheduled time
             if self.should_run_now():
                 self.process_files()
 
+            if shutdown.draining.is_set():
+                logger.info("Drain complete, stopping watch service")
+                break
+
             # After processing, the loop will continue and wait for the next day
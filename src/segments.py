@@ -0,0 +1,323 @@
+import json
+import logging
+import math
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from . import bandwidth
+from .config import config
+from .exceptions import ConversionError, ConversionTimeoutError
+from .processes import run_tracked
+
+logger = logging.getLogger("eac3_converter")
+
+# Samples per AC3/EAC3 sync frame (6 blocks of 256, what ffmpeg's encoders emit).
+FRAME_SAMPLES = 1536
+# Rates the AC3/EAC3 encoders accept; other sources are resampled to 48 kHz.
+ENCODER_SAMPLE_RATES = (48000, 44100, 32000)
+# AC3 frmsizecod >> 1 -> kbps.
+AC3_BITRATES = (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384, 448, 512, 576, 640)
+
+MANIFEST = "manifest.json"
+
+
+def checkpoint_dir(input_file: str) -> str:
+    """Where segments of ``input_file`` are checkpointed: ``.segments_<name>/`` next to it."""
+    return os.path.join(
+        os.path.dirname(os.path.abspath(input_file)), f".segments_{os.path.basename(input_file)}"
+    )
+
+
+def remove_checkpoints(input_file: str) -> None:
+    """Drop ``input_file``'s checkpoints, whether or not this conversion used them."""
+    shutil.rmtree(checkpoint_dir(input_file), ignore_errors=True)
+
+
+def frame_size(header: bytes) -> int:
+    """Length in bytes of the AC3/EAC3 sync frame starting with ``header`` (6+ bytes)."""
+    if len(header) < 6 or header[0] != 0x0B or header[1] != 0x77:
+        raise ValueError("lost AC3 sync")
+    bsid = header[5] >> 3
+    if bsid > 10:
+        # E-AC-3: 11-bit frmsiz, in 16-bit words minus one.
+        return ((((header[2] & 0x07) << 8) | header[3]) + 1) * 2
+    fscod, frmsizecod = header[4] >> 6, header[4] & 0x3F
+    if fscod == 3 or frmsizecod >> 1 >= len(AC3_BITRATES):
+        raise ValueError("invalid AC3 frame header")
+    kbps = AC3_BITRATES[frmsizecod >> 1]
+    # 48 kHz, 44.1 kHz (odd codes carry one padding word), 32 kHz.
+    words = (kbps * 2, kbps * 320 // 147 + (frmsizecod & 1), kbps * 3)[fscod]
+    return words * 2
+
+
+def copy_frames(src: BinaryIO, dst: BinaryIO, skip: int = 0, keep: Optional[int] = None) -> int:
+    """Copy sync frames from ``src`` to ``dst``; returns the number written.
+
+    The first ``skip`` frames are dropped and copying stops after ``keep``
+    frames (None = to the end).
+    """
+    written = 0
+    while keep is None or written < keep:
+        header = src.read(6)
+        if not header:
+            break
+        size = frame_size(header)
+        body = src.read(size - 6)
+        if len(body) < size - 6:
+            raise ValueError("truncated AC3 frame")
+        if skip:
+            skip -= 1
+            continue
+        dst.write(header)
+        dst.write(body)
+        written += 1
+    return written
+
+
+def output_sample_rate(stream: Dict[str, Any]) -> int:
+    try:
+        rate = int(stream.get("sample_rate") or 48000)
+    except (TypeError, ValueError):
+        rate = 48000
+    return rate if rate in ENCODER_SAMPLE_RATES else 48000
+
+
+@dataclass
+class Segment:
+    number: int
+    # Input window in seconds; length None = to the end of the source.
+    start: float
+    length: Optional[float]
+    # Warm-up frames dropped from the front, then frames kept (None = all).
+    skip: int
+    keep: Optional[int]
+
+
+def plan_segments(duration_seconds: float, sample_rate: int, segment_seconds: float) -> List[Segment]:
+    """Cut a track into segments whose encodes concatenate into one seamless stream.
+
+    Boundaries fall on whole frames, so frame ``n`` of a single-pass encode
+    and of the concatenation cover the same samples. Every segment but the
+    first starts one frame early and drops that frame: it only primes the
+    encoder's transform overlap, and the boundary frame is then encoded from
+    the same input as in one pass.
+    """
+    frames = max(1, round(segment_seconds * sample_rate / FRAME_SAMPLES))
+    span = frames * FRAME_SAMPLES
+    count = max(1, math.ceil(duration_seconds * sample_rate / span))
+    segments = []
+    for number in range(count):
+        last = number == count - 1
+        preroll = FRAME_SAMPLES if number else 0
+        segments.append(Segment(
+            number=number,
+            start=(number * span - preroll) / sample_rate,
+            # One extra frame of input past the boundary so the last kept frame is complete.
+            length=None if last else (preroll + span + FRAME_SAMPLES) / sample_rate,
+            skip=1 if number else 0,
+            keep=None if last else frames,
+        ))
+    return segments
+
+
+class SegmentedEncode:
+    """Encodes a file's DTS/TrueHD tracks in time segments on several cores.
+
+    A single audio encode runs on one core, so a three-hour track takes as
+    long on an idle 16-core box as on a 2-core one. Here each encoded track
+    is split with plan_segments, segments are encoded concurrently (each
+    ffmpeg decodes only its window) and their frames are concatenated into
+    a raw track that the final remux copies in.
+
+    Segments are checkpointed in ``.segments_<name>/`` next to the source.
+    ``manifest.json`` ties them to the source's size/mtime and the encode
+    settings; a retry after an interruption reuses the finished segments
+    and encodes only the missing ones.
+    """
+
+    def __init__(
+        self,
+        input_file: str,
+        streams: List[Dict[str, Any]],
+        audio_plan: List[Dict[str, Any]],
+        duration_seconds: float,
+        workers: int,
+        loglevel: str = "error",
+        timeout: Optional[float] = None,
+    ):
+        self.input_file = input_file
+        self.work_dir = checkpoint_dir(input_file)
+        self.workers = workers
+        self.loglevel = loglevel
+        self.timeout = timeout or config.ffmpeg.timeout_seconds
+        self.segment_seconds = config.segments.segment_seconds
+        # audio index -> (plan entry, output sample rate, segments)
+        self.tracks: Dict[int, Tuple[Dict[str, Any], int, List[Segment]]] = {}
+        for entry in audio_plan:
+            if entry["action"] != "encode":
+                continue
+            rate = output_sample_rate(streams[entry["index"]])
+            self.tracks[entry["index"]] = (
+                entry, rate, plan_segments(duration_seconds, rate, self.segment_seconds)
+            )
+
+    def _path(self, index: int, segment: Segment) -> str:
+        codec = self.tracks[index][0]["target_codec"]
+        return os.path.join(self.work_dir, f"a{index}.{segment.number:04d}.{codec}")
+
+    def _manifest(self) -> Dict[str, Any]:
+        st = os.stat(self.input_file)
+        return {
+            "source": {"size": st.st_size, "mtime": st.st_mtime},
+            "segment_seconds": self.segment_seconds,
+            "tracks": {
+                str(index): {
+                    "encoder": entry["encoder"],
+                    "bitrate": entry["bitrate"],
+                    "channels": entry["out_channels"],
+                    "sample_rate": rate,
+                    "segments": len(segments),
+                }
+                for index, (entry, rate, segments) in self.tracks.items()
+            },
+        }
+
+    def _prepare(self) -> None:
+        """Keep checkpoints that match this encode, start over otherwise."""
+        manifest = self._manifest()
+        path = os.path.join(self.work_dir, MANIFEST)
+        try:
+            with open(path) as f:
+                if json.load(f) == manifest:
+                    return
+        except (OSError, ValueError):
+            pass
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        os.makedirs(self.work_dir)
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+
+    def _encode(self, index: int, segment: Segment) -> None:
+        entry, rate, _ = self.tracks[index]
+        path = self._path(index, segment)
+        window = ["-t", f"{segment.length:.6f}"] if segment.length is not None else []
+        command = [
+            "ffmpeg", "-ss", f"{segment.start:.6f}", *window, "-i", self.input_file,
+            "-hide_banner", "-loglevel", self.loglevel,
+            "-threads", "1",
+            "-strict", config.ffmpeg.strict_mode,
+            "-map", f"0:a:{index}", "-c:a", entry["encoder"],
+            "-b:a", entry["bitrate"],
+            "-ac:a", str(entry["out_channels"]),
+            "-ar:a", str(rate),
+            "-dialnorm", str(config.ffmpeg.dialnorm),
+            "-mixing_level", str(config.ffmpeg.mixing_level),
+            "-f", entry["target_codec"],
+            path + ".part", "-y",
+        ]
+        logger.debug(f"Running segment ffmpeg command: {' '.join(command)}")
+        try:
+            run_tracked(command, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            raise ConversionTimeoutError(
+                f"Timeout after {self.timeout:g}s for segment {segment.number} "
+                f"of audio stream {index} in {self.input_file}"
+            )
+        except subprocess.CalledProcessError as e:
+            raise ConversionError(
+                f"ffmpeg error (code {e.returncode}) on segment {segment.number} "
+                f"of audio stream {index}: {e.stderr.strip()}",
+                e.returncode, e.stderr,
+            )
+        os.replace(path + ".part", path)
+
+    def _concat(self, index: int) -> str:
+        entry, _, segments = self.tracks[index]
+        output = os.path.join(self.work_dir, f"a{index}.{entry['target_codec']}")
+        short = None
+        with open(output, "wb") as dst:
+            for segment in segments:
+                try:
+                    with open(self._path(index, segment), "rb") as src:
+                        written = copy_frames(src, dst, segment.skip, segment.keep)
+                except ValueError as e:
+                    os.remove(self._path(index, segment))
+                    raise ConversionError(f"Segment {segment.number} of audio stream {index} is corrupt: {e}")
+                if written and short is not None:
+                    # A gap mid-track would shift everything after it out of sync.
+                    raise ConversionError(f"Segment {short} of audio stream {index} ended early")
+                if segment.keep is not None and written < segment.keep:
+                    # Fine only at the end: the probed duration can overshoot.
+                    short = segment.number
+        return output
+
+    def run(self) -> Dict[int, str]:
+        """Encode missing segments and concatenate; returns audio index -> raw track path."""
+        self._prepare()
+        pending = [
+            (index, segment)
+            for index, (_, _, segments) in self.tracks.items()
+            for segment in segments
+            if not os.path.exists(self._path(index, segment))
+        ]
+        total = sum(len(segments) for _, _, segments in self.tracks.values())
+        if len(pending) < total:
+            logger.info(f"Resuming segmented encode: {total - len(pending)}/{total} segment(s) already done")
+        logger.info(
+            f"Segmented encode: {len(pending)} segment(s) of {self.segment_seconds}s "
+            f"on {self.workers} worker(s)"
+        )
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="segment") as pool:
+            futures = [pool.submit(self._encode, index, segment) for index, segment in pending]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return {index: self._concat(index) for index in self.tracks}
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def segmented_encode(
+    input_file: str,
+    streams: List[Dict[str, Any]],
+    audio_plan: List[Dict[str, Any]],
+    duration_seconds: float,
+    loglevel: str = "error",
+    degraded: bool = False,
+    timeout: Optional[float] = None,
+) -> Optional[SegmentedEncode]:
+    """A SegmentedEncode for this conversion, or None to encode in one pass.
+
+    Segments are used when SEGMENT_ENCODE is on, the file is at least
+    SEGMENT_MIN_DURATION_SECONDS long, more than one worker is available
+    and no bandwidth cap applies (parallel readers would each get the
+    whole cap). A ``degraded`` retry only resumes checkpoints left by the
+    failed attempt, on half the workers; with none it encodes in one pass.
+    """
+    cfg = config.segments
+    if not cfg.enabled or duration_seconds < max(cfg.min_duration_seconds, 1):
+        return None
+    if not any(entry["action"] == "encode" for entry in audio_plan):
+        return None
+    workers = cfg.workers or config.ffmpeg.threads
+    if degraded:
+        if not os.path.isdir(checkpoint_dir(input_file)):
+            return None
+        workers = max(1, workers // 2)
+    elif workers <= 1:
+        return None
+    if bandwidth.limiter.enabled:
+        logger.info("Segmented encode skipped: a bandwidth cap is set")
+        return None
+    return SegmentedEncode(input_file, streams, audio_plan, duration_seconds, workers, loglevel, timeout)
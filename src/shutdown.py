@@ -0,0 +1,5 @@
+import threading
+
+# Set by the first SIGTERM/SIGINT when DRAIN_GRACE_SECONDS > 0: running
+# conversions finish, nothing new is started and the service loop exits.
+draining = threading.Event()
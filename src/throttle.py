@@ -0,0 +1,145 @@
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+from .config import config
+from .processes import ProcessRegistry, registry as default_registry
+
+logger = logging.getLogger("eac3_converter")
+
+PSI_CPU = "/proc/pressure/cpu"
+PSI_IO = "/proc/pressure/io"
+
+
+def read_psi_avg10(path: str) -> Optional[float]:
+    """``some avg10`` from a PSI file: % of the last 10 s some task was stalled.
+
+    None when PSI is unavailable (old kernel, not mounted, no permission).
+    """
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith("some "):
+                    for field in line.split()[1:]:
+                        key, _, value = field.partition("=")
+                        if key == "avg10":
+                            return float(value)
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def load_per_cpu() -> Optional[float]:
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        return None
+
+
+class PressureThrottle:
+    """Pauses admission of new jobs while the host is under pressure.
+
+    Pressure is read from Linux PSI (``/proc/pressure/cpu`` and ``io``) and
+    the 1-minute load average per CPU. A monitor thread re-evaluates it every
+    ``poll_seconds``; when ``pause_running`` is set it also SIGSTOPs running
+    ffmpeg children until pressure drops. Resuming uses a lower threshold
+    (``resume_ratio``) so jobs don't flap on the boundary. The dispatcher
+    checks ``pressured`` before admitting each job (its ``may_admit`` hook).
+    """
+
+    def __init__(
+        self,
+        cpu_threshold: float,
+        io_threshold: float,
+        load_threshold: float,
+        resume_ratio: float,
+        poll_seconds: float,
+        pause_running: bool,
+        registry: ProcessRegistry = default_registry,
+        read_psi: Callable[[str], Optional[float]] = read_psi_avg10,
+        read_load: Callable[[], Optional[float]] = load_per_cpu,
+    ):
+        self.cpu_threshold = cpu_threshold
+        self.io_threshold = io_threshold
+        self.load_threshold = load_threshold
+        self.resume_ratio = resume_ratio
+        self.poll_seconds = poll_seconds
+        self.pause_running = pause_running
+        self.registry = registry
+        self.read_psi = read_psi
+        self.read_load = read_load
+
+        self._clear = threading.Event()
+        self._clear.set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls) -> "PressureThrottle":
+        t = config.throttle
+        return cls(
+            cpu_threshold=t.cpu_psi_threshold,
+            io_threshold=t.io_psi_threshold,
+            load_threshold=t.load_threshold,
+            resume_ratio=t.resume_ratio,
+            poll_seconds=t.poll_seconds,
+            pause_running=t.pause_running,
+        )
+
+    @property
+    def pressured(self) -> bool:
+        return not self._clear.is_set()
+
+    def _readings(self) -> list[tuple[str, Optional[float], float]]:
+        return [
+            ("cpu psi", self.read_psi(PSI_CPU), self.cpu_threshold),
+            ("io psi", self.read_psi(PSI_IO), self.io_threshold),
+            ("load/cpu", self.read_load(), self.load_threshold),
+        ]
+
+    def check(self) -> bool:
+        """Re-evaluate pressure, apply pause/resume, return True if pressured."""
+        # A threshold of 0 disables that signal; unreadable signals are ignored.
+        readings = [(name, value, limit) for name, value, limit in self._readings()
+                    if limit > 0 and value is not None]
+        if self.pressured:
+            over = [r for r in readings if r[1] >= r[2] * self.resume_ratio]
+        else:
+            over = [r for r in readings if r[1] >= r[2]]
+
+        if over and not self.pressured:
+            details = ", ".join(f"{name} {value:.1f} >= {limit:g}" for name, value, limit in over)
+            self._clear.clear()
+            paused = self.registry.pause_all() if self.pause_running else 0
+            logger.info(
+                f"Host under pressure ({details}): holding new jobs"
+                + (f", paused {paused} running ffmpeg process(es)" if self.pause_running else "")
+            )
+        elif not over and self.pressured:
+            resumed = self.registry.resume_all() if self.pause_running else 0
+            self._clear.set()
+            logger.info(
+                "Pressure dropped: admitting jobs again"
+                + (f", resumed {resumed} ffmpeg process(es)" if self.pause_running else "")
+            )
+        return self.pressured
+
+    def _monitor(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            self.check()
+
+    def start(self) -> None:
+        self.check()
+        self._thread = threading.Thread(target=self._monitor, name="pressure-throttle", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop monitoring and let everything run again."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.pressured:
+            if self.pause_running:
+                self.registry.resume_all()
+            self._clear.set()
@@ -0,0 +1,77 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger("eac3_converter")
+
+GB = 1_000_000_000
+HOUR = 3600.0
+
+
+@dataclass
+class ThroughputModel:
+    """Predicts encode wall time from conversion history.
+
+    A remux costs roughly ``seconds_per_gb * input_GB`` (reading and writing
+    the container) plus ``seconds_per_channel_hour * media_hours * channels``
+    (the audio encode). Both coefficients are fitted by least squares from
+    ``conversion_history``; with too little spread in the data the model
+    falls back to a single input-size ratio.
+    """
+
+    seconds_per_gb: float = 0.0
+    seconds_per_channel_hour: float = 0.0
+    samples: int = 0
+
+    @staticmethod
+    def _features(input_bytes: float, duration_seconds: float, channels: float) -> tuple[float, float]:
+        return input_bytes / GB, duration_seconds / HOUR * channels
+
+    @classmethod
+    def fit(cls, history: Iterable[Dict[str, Any]]) -> "ThroughputModel":
+        rows = []
+        for entry in history:
+            seconds = entry.get("encode_seconds")
+            input_bytes = entry.get("input_bytes")
+            if not seconds or not input_bytes:
+                continue
+            x1, x2 = cls._features(
+                input_bytes,
+                entry.get("duration_seconds") or 0.0,
+                entry.get("channels_encoded") or 0,
+            )
+            rows.append((x1, x2, float(seconds)))
+        if not rows:
+            return cls()
+
+        # Normal equations for y = a*x1 + b*x2 (no intercept).
+        s11 = sum(x1 * x1 for x1, _, _ in rows)
+        s22 = sum(x2 * x2 for _, x2, _ in rows)
+        s12 = sum(x1 * x2 for x1, x2, _ in rows)
+        s1y = sum(x1 * y for x1, _, y in rows)
+        s2y = sum(x2 * y for _, x2, y in rows)
+        det = s11 * s22 - s12 * s12
+        if det > 1e-9 * max(s11 * s22, 1e-12):
+            a = (s1y * s22 - s2y * s12) / det
+            b = (s2y * s11 - s1y * s12) / det
+            if a >= 0 and b >= 0:
+                return cls(seconds_per_gb=a, seconds_per_channel_hour=b, samples=len(rows))
+
+        # Degenerate or non-physical fit: time is proportional to input size.
+        return cls(seconds_per_gb=s1y / s11 if s11 else 0.0, samples=len(rows))
+
+    def predict(self, input_bytes: int, duration_seconds: float = 0.0, channels: int = 0) -> Optional[float]:
+        """Predicted encode seconds for one job, or None without history."""
+        if not self.samples:
+            return None
+        x1, x2 = self._features(input_bytes, duration_seconds, channels)
+        return self.seconds_per_gb * x1 + self.seconds_per_channel_hour * x2
+
+    def describe(self) -> str:
+        if not self.samples:
+            return "throughput model: no conversion history yet"
+        return (
+            f"throughput model: {self.seconds_per_gb:.1f}s/GB input + "
+            f"{self.seconds_per_channel_hour:.1f}s per channel-hour encoded "
+            f"({self.samples} samples)"
+        )
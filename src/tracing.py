@@ -0,0 +1,85 @@
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+from .config import config
+
+logger = logging.getLogger("eac3_converter")
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    path: str
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Span:
+    name: str
+    fields: Dict[str, Any] = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("eac3_trace", default=None)
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current.get()
+    return trace.trace_id if trace is not None else None
+
+
+def annotate(**fields: Any) -> None:
+    """Attach fields to the current file's trace (reported when it ends)."""
+    trace = _current.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+def _emit(event: str, message: str, fields: Dict[str, Any]) -> None:
+    # Spans are the point of the JSON log; in text mode they'd only be noise.
+    level = logging.INFO if config.app.log_format == "json" else logging.DEBUG
+    logger.log(level, message, extra={"event": event, "fields": fields})
+
+
+@contextmanager
+def trace(path: str, **fields: Any) -> Iterator[Trace]:
+    """Give everything logged while handling ``path`` a shared trace ID."""
+    current = Trace(trace_id=uuid.uuid4().hex[:16], path=path, fields=dict(fields))
+    token = _current.set(current)
+    started = time.monotonic()
+    try:
+        yield current
+    finally:
+        seconds = time.monotonic() - started
+        _emit("file", f"file {path} done in {seconds:.3f}s",
+              {"path": path, "seconds": round(seconds, 6), **current.fields})
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **fields: Any) -> Iterator[Span]:
+    """Time one stage of the current file; add byte counts etc. to ``.fields``."""
+    current = Span(name=name, fields=dict(fields))
+    started = time.monotonic()
+    try:
+        yield current
+    except BaseException as e:
+        current.fields["error"] = type(e).__name__
+        raise
+    finally:
+        current.seconds = time.monotonic() - started
+        _emit("span", f"span {name} {current.seconds:.3f}s",
+              {"stage": name, "seconds": round(current.seconds, 6), **current.fields})
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamps every record with the trace ID of the file being handled."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id()
+        return True
@@ -0,0 +1,112 @@
+import logging
+from typing import Any, Dict, List
+
+from .audio_processor import AudioProcessor
+from .config import config
+from .exceptions import OutputVerificationError
+
+logger = logging.getLogger("eac3_converter")
+
+# How far a decoded sample frame may land from the requested seek point.
+SAMPLE_WINDOW_SECONDS = 30.0
+
+
+def _duration(probe: Dict[str, Any]) -> float:
+    try:
+        return float(probe["format"].get("duration") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _audio_streams(probe: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [s for s in probe["streams"] if s.get("codec_type") == "audio"]
+
+
+class OutputVerifier:
+    """Cheap structural check of a converted file before it replaces the source.
+
+    Compares container headers (stream count, audio codecs and channels,
+    duration) and decodes a handful of frames near the start, middle and end
+    of every encoded stream. Only headers and those frames are read, a few
+    MB per file, instead of a full decode pass.
+    """
+
+    def __init__(self, audio_processor: AudioProcessor):
+        self.audio_processor = audio_processor
+
+    def verify(self, source_file: str, output_file: str, audio_plan: List[Dict[str, Any]]) -> None:
+        """Raise OutputVerificationError if ``output_file`` doesn't match the plan."""
+        source = self.audio_processor.probe_file(source_file)
+        output = self.audio_processor.probe_file(output_file)
+        problems = self._compare_headers(source, output, audio_plan)
+
+        duration = _duration(output)
+        if not problems:
+            for entry in audio_plan:
+                if entry["action"] == "encode":
+                    problems.extend(self._check_sample_frames(output_file, entry, duration))
+
+        if problems:
+            raise OutputVerificationError(
+                f"Output verification failed for {output_file}: {'; '.join(problems)}"
+            )
+        logger.debug(f"Output verified: {output_file}")
+
+    @staticmethod
+    def _compare_headers(
+        source: Dict[str, Any], output: Dict[str, Any], audio_plan: List[Dict[str, Any]]
+    ) -> List[str]:
+        if not output["streams"]:
+            return ["output could not be probed"]
+
+        problems = []
+        kept = [entry for entry in audio_plan if entry["action"] != "drop"]
+        dropped = len(audio_plan) - len(kept)
+        if len(output["streams"]) != len(source["streams"]) - dropped:
+            problems.append(
+                f"stream count {len(output['streams'])} != source {len(source['streams'])}"
+                + (f" minus {dropped} dropped" if dropped else "")
+            )
+
+        output_audio = _audio_streams(output)
+        if len(output_audio) != len(kept):
+            problems.append(f"audio stream count {len(output_audio)} != expected {len(kept)}")
+        for entry, stream in zip(kept, output_audio):
+            if entry["action"] == "encode":
+                expected_codec, expected_channels = entry["target_codec"], entry["out_channels"]
+            else:
+                expected_codec, expected_channels = entry["codec"], entry["channels"]
+            codec = (stream.get("codec_name") or "").lower()
+            channels = int(stream.get("channels") or 0)
+            if codec != expected_codec or channels != expected_channels:
+                problems.append(
+                    f"audio {entry['index']}: {codec} {channels}ch != "
+                    f"expected {expected_codec} {expected_channels}ch"
+                )
+
+        source_duration, output_duration = _duration(source), _duration(output)
+        if source_duration and abs(output_duration - source_duration) > config.verify.duration_tolerance_seconds:
+            problems.append(
+                f"duration {output_duration:.1f}s != source {source_duration:.1f}s"
+            )
+        return problems
+
+    def _check_sample_frames(self, output_file: str, entry: Dict[str, Any], duration: float) -> List[str]:
+        count = max(config.verify.sample_frames, 1)
+        points = [0.0]
+        if duration > 2 * SAMPLE_WINDOW_SECONDS:
+            points += [duration / 2, duration - SAMPLE_WINDOW_SECONDS]
+        intervals = ",".join(f"{point:.3f}%+#{count}" for point in points)
+
+        frames = self.audio_processor.probe_frames(output_file, entry["out_index"], intervals)
+        problems = []
+        for point in points:
+            near = [
+                frame for frame in frames
+                if abs(float(frame.get("pts_time") or -1e9) - point) <= SAMPLE_WINDOW_SECONDS
+            ]
+            if not near:
+                problems.append(f"audio {entry['index']}: no decodable frame near {point:.0f}s")
+            elif any(int(frame.get("channels") or 0) != entry["out_channels"] for frame in near):
+                problems.append(f"audio {entry['index']}: frame channel mismatch near {point:.0f}s")
+        return problems
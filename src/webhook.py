@@ -0,0 +1,223 @@
+import base64
+import hmac
+import json
+import logging
+import os
+import queue
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cache_transfer import remap_path
+from .config import INPUT_DIR, WebhookConfig
+from .file_processor import FileProcessor
+from .scheduler import Scheduler
+
+logger = logging.getLogger("eac3_converter")
+
+# Largest request body accepted; *arr payloads are a few KB.
+MAX_BODY_BYTES = 1024 * 1024
+
+_STOP = object()
+
+
+def extract_paths(payload: Any) -> List[str]:
+    """File paths named by a webhook payload.
+
+    Understands Radarr (``movieFile``), Sonarr (``episodeFile`` /
+    ``episodeFiles``) import events and a generic ``{"path": ...}`` or
+    ``{"paths": [...]}`` body. Test and non-import events yield nothing.
+    """
+    if not isinstance(payload, dict):
+        return []
+    if "path" in payload or "paths" in payload:
+        paths = payload.get("paths") or [payload.get("path")]
+        return [p for p in paths if isinstance(p, str) and p]
+
+    if payload.get("eventType") not in ("Download", "Upgrade"):
+        return []
+    files: List[Dict[str, Any]] = []
+    for key in ("movieFile", "episodeFile"):
+        if isinstance(payload.get(key), dict):
+            files.append(payload[key])
+    files.extend(f for f in payload.get("episodeFiles") or [] if isinstance(f, dict))
+
+    folder = (payload.get("movie") or payload.get("series") or {}).get("folderPath") \
+        or (payload.get("series") or {}).get("path")
+    paths = []
+    for item in files:
+        if item.get("path"):
+            paths.append(item["path"])
+        elif folder and item.get("relativePath"):
+            paths.append(os.path.join(folder, item["relativePath"]))
+    return paths
+
+
+class WebhookServer:
+    """HTTP listener that queues imported files for immediate conversion.
+
+    ``POST /`` (or any path) with a JSON body; ``GET /health`` answers
+    ``ok``. Accepted files are converted one at a time by a worker thread
+    through the scheduler, so concurrency limits and throttling apply and a
+    file already being converted by the nightly run is not picked up twice.
+    """
+
+    def __init__(
+        self,
+        cfg: WebhookConfig,
+        file_processor: FileProcessor,
+        scheduler: Scheduler,
+        input_dir: str = INPUT_DIR,
+    ):
+        self.cfg = cfg
+        self.file_processor = file_processor
+        self.scheduler = scheduler
+        self.input_dir = os.path.realpath(input_dir)
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._queued: set[str] = set()
+        self._queued_lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._httpd.server_address[:2] if self._httpd else (self.cfg.host, self.cfg.port)
+
+    def authorized(self, headers) -> bool:
+        if not self.cfg.token:
+            return True
+        supplied = headers.get("X-Webhook-Token", "")
+        auth = headers.get("Authorization", "")
+        if auth.startswith("Bearer "):
+            supplied = auth[len("Bearer "):]
+        elif auth.startswith("Basic "):
+            # *arr webhooks only offer basic auth: the password is the token.
+            try:
+                supplied = base64.b64decode(auth[len("Basic "):]).decode().partition(":")[2]
+            except ValueError:
+                return False
+        return hmac.compare_digest(supplied.encode(), self.cfg.token.encode())
+
+    def validate(self, path: str) -> Tuple[Optional[str], Optional[str]]:
+        """(container path, None) if ``path`` may be converted, else (None, reason)."""
+        mapped = remap_path(path, list(self.cfg.path_map))
+        real = os.path.realpath(mapped)
+        if os.path.commonpath([real, self.input_dir]) != self.input_dir:
+            return None, f"not under {self.input_dir}"
+        if not os.path.isfile(real):
+            return None, "no such file"
+        name = os.path.basename(real)
+        if name.startswith(".temp_"):
+            return None, "temporary file"
+        if not (name.endswith(".mkv") or self.file_processor.is_standalone_audio(real)):
+            return None, "not an MKV or standalone audio file"
+        return real, None
+
+    def enqueue(self, path: str) -> bool:
+        """Queue a validated path; False if it is already waiting."""
+        with self._queued_lock:
+            if path in self._queued:
+                return False
+            self._queued.add(path)
+        self._queue.put(path)
+        return True
+
+    def _worker(self) -> None:
+        while True:
+            path = self._queue.get()
+            if path is _STOP:
+                return
+            with self._queued_lock:
+                self._queued.discard(path)
+            logger.info(f"Webhook: converting {path}")
+            try:
+                if path.endswith(".mkv"):
+                    self.scheduler.process_paths([path], [])
+                else:
+                    self.scheduler.process_paths([], [path])
+            except Exception as e:
+                logger.error(f"Webhook: unexpected error processing {path}: {e}")
+
+    def handle(self, headers, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """Process one POST; returns (status, JSON response)."""
+        if not self.authorized(headers):
+            return 401, {"error": "unauthorized"}
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "invalid JSON"}
+
+        queued, rejected = [], []
+        for path in extract_paths(payload):
+            real, reason = self.validate(path)
+            if real is None:
+                rejected.append({"path": path, "reason": reason})
+                continue
+            self.enqueue(real)
+            queued.append(real)
+        if rejected:
+            logger.warning(f"Webhook: rejected {rejected}")
+        if queued:
+            logger.info(f"Webhook: queued {len(queued)} file(s)")
+        status = 422 if rejected and not queued else 202
+        return status, {"queued": queued, "rejected": rejected}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, data: Dict[str, Any]) -> None:
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                if self.path.rstrip("/") == "/health":
+                    self._reply(200, {"status": "ok", "queued": server._queue.qsize()})
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_BYTES:
+                    self._reply(413, {"error": "body too large"})
+                    return
+                self._reply(*server.handle(self.headers, self.rfile.read(length)))
+
+            def log_message(self, format: str, *args: Any) -> None:
+                logger.debug(f"Webhook: {self.address_string()} {format % args}")
+
+        return Handler
+
+    def start(self) -> None:
+        self._httpd = ThreadingHTTPServer((self.cfg.host, self.cfg.port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._threads = [
+            threading.Thread(target=self._httpd.serve_forever, name="webhook-http", daemon=True),
+            threading.Thread(target=self._worker, name="webhook-worker", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        host, port = self.address
+        logger.info(f"Webhook listening on http://{host}:{port}")
+
+    def stop(self) -> None:
+        """Stop listening and let the worker finish the file it is on.
+
+        Files still waiting in the queue are dropped; the next scheduled run
+        picks them up.
+        """
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
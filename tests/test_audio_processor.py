@@ -1,6 +1,6 @@
 import pytest
 
-from src.audio_processor import AudioProcessor, resolve_audio_profile
+from src.audio_processor import AudioProcessor, find_redundant_tracks, resolve_audio_profile
 from src import config as config_module
 
 
@@ -84,7 +84,7 @@ def test_convert_audio_tracks_uses_fixed_eac3_profiles(monkeypatch):
     def fake_run(command, **kwargs):
         captured["command"] = command
 
-    monkeypatch.setattr("src.audio_processor.subprocess.run", fake_run)
+    monkeypatch.setattr("src.audio_processor.run_tracked", fake_run)
 
     ap.convert_audio_tracks("input.mkv", "output.mkv")
 
@@ -114,7 +114,7 @@ def test_convert_audio_tracks_uses_stereo_profile(monkeypatch):
     def fake_run(command, **kwargs):
         captured["command"] = command
 
-    monkeypatch.setattr("src.audio_processor.subprocess.run", fake_run)
+    monkeypatch.setattr("src.audio_processor.run_tracked", fake_run)
 
     ap.convert_audio_tracks("input.mkv", "output.mkv")
 
@@ -135,10 +135,78 @@ def test_convert_standalone_audio_uses_fixed_eac3_profile(monkeypatch):
     def fake_run(command, **kwargs):
         captured["command"] = command
 
-    monkeypatch.setattr("src.audio_processor.subprocess.run", fake_run)
+    monkeypatch.setattr("src.audio_processor.run_tracked", fake_run)
 
     ap.convert_standalone_audio("track.dts", "track.ec3")
 
     command = captured["command"]
     assert command[command.index("-b:a") + 1] == "640k"
     assert command[command.index("-ac:a") + 1] == "6"
+
+
+def test_library_target_codec_selects_ac3_fixed(monkeypatch):
+    from src.config import config
+
+    monkeypatch.setattr(config.target, "path_codecs", (("/app/input/kids", "ac3_fixed"),))
+    ap = AudioProcessor()
+    ap.get_audio_streams_info = lambda _: [{"codec_name": "truehd", "channels": 8}]
+    captured = {}
+    monkeypatch.setattr("src.audio_processor.run_tracked", lambda command, **kwargs: captured.update(command=command))
+
+    metrics = ap.convert_audio_tracks("/app/input/kids/movie.mkv", "/app/input/kids/.temp_movie.mkv")
+
+    command = captured["command"]
+    assert command[command.index("-c:a:0") + 1] == "ac3_fixed"
+    assert command[command.index("-b:a:0") + 1] == "640k"
+    assert command[command.index("-metadata:s:a:0") + 1] == "title=AC3 5.1"
+    assert metrics["codec"] == "ac3"
+    assert metrics["audio_plan"][0]["target_codec"] == "ac3"
+
+    ap.convert_standalone_audio("/app/input/kids/track.dts", "/app/input/kids/track.ac3")
+    command = captured["command"]
+    assert command[command.index("-c:a") + 1] == "ac3_fixed"
+    assert command[command.index("-f") + 1] == "ac3"
+
+    ap.convert_audio_tracks("/app/input/movies/movie.mkv", "/app/input/movies/.temp_movie.mkv")
+    assert captured["command"][captured["command"].index("-c:a:0") + 1] == "eac3"
+
+
+REDUNDANT_STREAMS = [
+    {"codec_name": "truehd", "channels": 8, "tags": {"language": "eng"}},
+    {"codec_name": "ac3", "channels": 6, "tags": {"language": "eng"}},
+    {"codec_name": "dts", "channels": 6, "tags": {"language": "fre"}},
+]
+
+
+def test_find_redundant_tracks_matches_language_and_channels():
+    assert find_redundant_tracks(REDUNDANT_STREAMS) == {0: 1}
+    stereo_twin = [dict(REDUNDANT_STREAMS[0]), {**REDUNDANT_STREAMS[1], "channels": 2}]
+    assert find_redundant_tracks(stereo_twin) == {}
+
+
+def test_ac3_library_only_accepts_ac3_twins():
+    eac3_twin = [dict(REDUNDANT_STREAMS[0]), {**REDUNDANT_STREAMS[1], "codec_name": "eac3"}]
+    assert find_redundant_tracks(eac3_twin, "eac3") == {0: 1}
+    # AC3-only clients can't play the EAC3 track, so the TrueHD track must not be dropped.
+    assert find_redundant_tracks(eac3_twin, "ac3") == {}
+    assert find_redundant_tracks(eac3_twin, "ac3_fixed") == {}
+    assert find_redundant_tracks(REDUNDANT_STREAMS, "ac3_fixed") == {0: 1}
+    drop = AudioProcessor.build_audio_plan(eac3_twin, "ac3", redundant_tracks="drop")
+    assert [entry["action"] for entry in drop] == ["encode", "copy"]
+
+
+def test_redundant_track_policies():
+    encode = AudioProcessor.build_audio_plan(REDUNDANT_STREAMS)
+    assert [entry["action"] for entry in encode] == ["encode", "copy", "encode"]
+
+    skip = AudioProcessor.build_audio_plan(REDUNDANT_STREAMS, redundant_tracks="skip")
+    assert [entry["action"] for entry in skip] == ["copy", "copy", "encode"]
+    assert skip[0]["redundant_with"] == 1
+
+    drop = AudioProcessor.build_audio_plan(REDUNDANT_STREAMS, redundant_tracks="drop")
+    assert [entry["action"] for entry in drop] == ["drop", "copy", "encode"]
+    assert [entry.get("out_index") for entry in drop] == [None, 0, 1]
+    args = AudioProcessor.codec_args_for_plan(drop)
+    assert args[:2] == ["-map", "-0:a:0"]
+    assert args[args.index("-c:a:0") + 1] == "copy"
+    assert args[args.index("-c:a:1") + 1] == "eac3"
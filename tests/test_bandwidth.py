@@ -0,0 +1,109 @@
+from datetime import datetime
+
+import pytest
+
+from src.bandwidth import BandwidthLimiter
+from src.config import BandwidthConfig, in_time_window, parse_time_window
+from src.exceptions import ConfigError
+
+
+def make_file(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"\0" * size)
+    return str(path)
+
+
+def limiter(clock_hour=3, clock_minute=0, slots=1, device_slots=0, **kwargs):
+    return BandwidthLimiter(
+        BandwidthConfig(**kwargs),
+        clock=lambda: datetime(2026, 1, 1, clock_hour, clock_minute),
+        slots=lambda: slots,
+        device_slots=lambda: device_slots,
+    )
+
+
+def test_disabled_limiter_adds_no_options(tmp_path):
+    path = make_file(tmp_path, "movie.mkv", 1000)
+    with limiter().session(path, 10.0) as args:
+        assert args == []
+
+
+def test_global_cap_becomes_readrate(tmp_path):
+    # 2 MB over 1 s = 2 MB/s native; 8 MB/s cap / 2 directions = 4 MB/s -> 2x realtime.
+    path = make_file(tmp_path, "movie.mkv", 2_000_000)
+    with limiter(limit_mbps=8).session(path, 1.0) as args:
+        assert args == ["-readrate", "2.000"]
+
+
+def readrate(args):
+    return float(args[1])
+
+
+def test_concurrent_jobs_never_exceed_the_cap(tmp_path):
+    # 2 MB/s native; 8 MB/s cap split across 4 job slots and 2 directions.
+    path = make_file(tmp_path, "movie.mkv", 2_000_000)
+    bw = limiter(limit_mbps=8, slots=4)
+    sessions = [bw.session(path, 1.0) for _ in range(4)]
+    rates = [readrate(session.__enter__()) for session in sessions]
+    for session in sessions:
+        session.__exit__(None, None, None)
+    # Jobs started early keep no larger share than late ones.
+    assert len(set(rates)) == 1
+    assert sum(rate * 2_000_000 for rate in rates) * 2 <= 8_000_000
+
+
+def test_mount_cap_is_shared_by_the_device_slots(tmp_path):
+    mount = tmp_path / "nas"
+    mount.mkdir()
+    path = make_file(mount, "movie.mkv", 2_000_000)
+    bw = limiter(slots=4, device_slots=2, mount_limits=((str(mount), 4.0),))
+    with bw.session(path, 1.0) as args:
+        # Two jobs at most on the mount: 2 MB/s each, 1 MB/s per direction.
+        assert args == ["-readrate", "0.500"]
+
+
+def test_job_running_into_the_day_window_gets_the_day_cap(tmp_path):
+    # 2.4 GB over 1000 s = 2.4 MB/s native; at the 8 MB/s night cap it reads for 10 minutes.
+    path = str(tmp_path / "movie.mkv")
+    with open(path, "wb") as f:
+        f.truncate(2_400_000_000)
+    kwargs = dict(limit_mbps=8, day_limit_mbps=2, day_window="08:00-23:00")
+
+    with limiter(clock_hour=7, clock_minute=40, **kwargs).session(path, 1000.0) as before:
+        pass
+    with limiter(clock_hour=7, clock_minute=55, **kwargs).session(path, 1000.0) as overlapping:
+        pass
+    assert before == ["-readrate", "1.667"]
+    assert overlapping == ["-readrate", "0.417"]
+    assert limiter(clock_hour=22, clock_minute=55, **kwargs).global_cap_mbps(60 * 60) == 2
+    assert limiter(clock_hour=23, day_limit_mbps=2).global_cap_mbps(60) == 0
+
+
+def test_mount_cap_and_day_window(tmp_path):
+    mount = tmp_path / "nas"
+    mount.mkdir()
+    path = make_file(mount, "movie.mkv", 2_000_000)
+    kwargs = dict(limit_mbps=100, day_limit_mbps=2, day_window="08:00-23:00",
+                  mount_limits=((str(mount), 4.0),))
+
+    with limiter(clock_hour=3, **kwargs).session(path, 1.0) as night:
+        pass
+    with limiter(clock_hour=12, **kwargs).session(path, 1.0) as day:
+        pass
+    assert night == ["-readrate", "1.000"]  # mount cap 4 MB/s wins over 100 MB/s
+    assert day == ["-readrate", "0.500"]    # daytime cap 2 MB/s wins
+
+
+def test_unknown_duration_is_not_capped(tmp_path):
+    path = make_file(tmp_path, "movie.mkv", 1000)
+    with limiter(limit_mbps=8).session(path, 0.0) as args:
+        assert args == []
+
+
+def test_time_window_parsing():
+    assert parse_time_window("22:00-06:30") == (22 * 60, 6 * 60 + 30)
+    assert in_time_window((22 * 60, 6 * 60), 23 * 60)
+    assert in_time_window((22 * 60, 6 * 60), 60)
+    assert not in_time_window((22 * 60, 6 * 60), 12 * 60)
+    with pytest.raises(ConfigError):
+        parse_time_window("late")
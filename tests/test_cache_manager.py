@@ -1,3 +1,7 @@
+import time
+
+import pytest
+
 from src.cache_manager import CacheManager
 
 
@@ -62,6 +66,7 @@ def test_metadata_extras_stored_as_json(tmp_path):
         "conversion_time": 12.5,
         "ffmpeg_command": "ffmpeg -i ...",
     })
+    cm.flush()
     row = cm.conn.execute(
         "SELECT metadata_json FROM processed_files WHERE file_key=?", ("k",)
     ).fetchone()
@@ -69,3 +74,242 @@ def test_metadata_extras_stored_as_json(tmp_path):
     assert extras["conversion_time"] == 12.5
     assert "ffmpeg_command" in extras
     cm.close()
+
+
+def test_concurrent_writers_from_threads(tmp_path):
+    import threading
+    cm = make_cm(tmp_path)
+
+    def worker(n):
+        for i in range(50):
+            cm.mark_processed(f"t{n}-{i}", {"action": "skipped"})
+            assert cm.is_processed(f"t{n}-{i}") is True
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert cm.get_cache_size() == 400
+    cm.close()
+
+
+def test_close_drains_queued_writes(tmp_path):
+    cm1 = make_cm(tmp_path)
+    for i in range(100):
+        cm1.mark_processed(f"k{i}", {"action": "converted"})
+    cm1.close()
+
+    cm2 = make_cm(tmp_path)
+    assert cm2.get_cache_size() == 100
+    cm2.close()
+
+
+def test_close_is_idempotent_and_ignores_late_writes(tmp_path):
+    cm = make_cm(tmp_path)
+    cm.close()
+    cm.close()
+    cm.mark_processed("late", {"action": "failed"})
+    assert "late" not in cm._pending
+    # A write whose result is used (a row count) must not pretend to succeed.
+    entry = {"file_key": "k", "path": "/k.mkv", "size": 1, "mtime": 1.0, "action": "skipped", "timestamp": None}
+    with pytest.raises(RuntimeError, match="cache is closed"):
+        cm.import_entries([entry])
+
+
+def test_release_connection_closes_the_threads_reader(tmp_path):
+    import threading
+
+    cm = make_cm(tmp_path)
+    cm.mark_processed("k", {"action": "converted"})
+    opened = len(cm._readers)
+
+    def job():
+        assert cm.is_processed("k")
+        cm.release_connection()
+
+    for _ in range(20):
+        worker = threading.Thread(target=job)
+        worker.start()
+        worker.join()
+
+    assert len(cm._readers) == opened
+    # A thread that released its reader gets a fresh one on the next read.
+    cm.release_connection()
+    assert len(cm._readers) == opened - 1
+    assert cm.is_processed("k")
+    assert len(cm._readers) == opened
+    cm.close()
+
+
+def test_prune_missing_removes_vanished_paths(tmp_path):
+    kept = tmp_path / "kept.mkv"
+    kept.write_bytes(b"x")
+    cm = make_cm(tmp_path)
+    cm.mark_processed(f"{kept}_1_2.0", {"action": "skipped", "path": str(kept)})
+    # Legacy rows have an empty path column; the path is recovered from the key.
+    cm.mark_processed(f"{tmp_path / 'gone.mkv'}_1_2.0", {"action": "converted"})
+    cm.mark_processed(f"{kept}_9_9.0", {"action": "converted"})
+
+    assert cm.prune_missing() == 1
+    assert cm.get_cache_size() == 2
+    assert cm.is_processed(f"{kept}_9_9.0") is True
+    cm.close()
+
+
+def test_prune_missing_keeps_rows_under_an_absent_mount(tmp_path):
+    library = tmp_path / "input"
+    (library / "movies").mkdir(parents=True)
+    (library / "movies" / "kept.mkv").write_bytes(b"x")
+    (library / "tv").mkdir()  # empty: the share isn't mounted
+    cm = make_cm(tmp_path)
+    cm.mark_processed("gone", {"action": "converted", "path": str(library / "movies" / "gone.mkv")})
+    cm.mark_processed("kept", {"action": "converted", "path": str(library / "movies" / "kept.mkv")})
+    cm.mark_processed("tv", {"action": "converted", "path": str(library / "tv" / "S01" / "e01.mkv")})
+    cm.mark_processed("nas", {"action": "converted", "path": str(library / "nas" / "film.mkv")})
+
+    assert cm.prune_missing(input_dir=str(library)) == 1
+    assert not cm.is_processed("gone")
+    assert all(cm.is_processed(key) for key in ("kept", "tv", "nas"))
+    cm.close()
+
+
+def test_expire_transient_respects_ttls(tmp_path):
+    from datetime import datetime, timedelta
+    old = (datetime.now() - timedelta(hours=48)).isoformat()
+    recent = datetime.now().isoformat()
+    cm = make_cm(tmp_path)
+    cm.mark_processed("old-failed", {"action": "failed", "timestamp": old})
+    cm.mark_processed("new-failed", {"action": "failed", "timestamp": recent})
+    cm.mark_processed("old-disk", {
+        "action": "skipped", "timestamp": old, "reason": "insufficient_disk_space",
+    })
+    cm.mark_processed("old-skip", {
+        "action": "skipped", "timestamp": old, "reason": "no_dts_or_truehd",
+    })
+    cm.mark_processed("old-converted", {"action": "converted", "timestamp": old})
+
+    assert cm.expire_transient(failed_ttl_hours=24, disk_space_ttl_hours=0) == 1
+    assert cm.is_processed("old-failed") is False
+    assert cm.is_processed("old-disk") is True
+
+    assert cm.expire_transient(failed_ttl_hours=24, disk_space_ttl_hours=24) == 1
+    assert cm.is_processed("old-disk") is False
+    assert cm.is_processed("new-failed") is True
+    assert cm.is_processed("old-skip") is True
+    assert cm.is_processed("old-converted") is True
+    cm.close()
+
+
+def test_run_maintenance_reports_and_compacts(tmp_path):
+    cm = make_cm(tmp_path)
+    for i in range(2000):
+        cm.mark_processed(f"{tmp_path / str(i)}.mkv_1_1.0", {
+            "action": "skipped", "metadata": "x" * 200,
+        })
+    cm.flush()
+    report = cm.run_maintenance(failed_ttl_hours=0, disk_space_ttl_hours=0)
+    assert report["pruned"] == 2000
+    assert report["entries"] == 0
+    assert report["bytes_reclaimed"] > 0
+    assert cm.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    cm.close()
+
+
+def test_legacy_db_converted_to_incremental_vacuum(tmp_path):
+    import sqlite3
+    from src.cache_manager import SCHEMA
+    db = tmp_path / "cache.db"
+    legacy = sqlite3.connect(str(db))
+    legacy.execute("PRAGMA journal_mode=WAL;")
+    legacy.executescript(SCHEMA)
+    legacy.close()
+
+    legacy = sqlite3.connect(str(db))
+    legacy.execute(
+        "INSERT INTO processed_files (file_key, path, action) VALUES ('k', '', 'converted')"
+    )
+    legacy.commit()
+    assert legacy.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    legacy.close()
+
+    cm = make_cm(tmp_path)
+    assert cm.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert cm.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert cm.is_processed("k") is True
+    cm.close()
+
+
+def test_record_and_get_history(tmp_path):
+    cm = make_cm(tmp_path)
+    cm.record_history({"file_key": "a", "path": "/a.mkv", "input_bytes": 10, "encode_seconds": 1.0})
+    cm.record_history({"file_key": "b", "path": "/b.mkv", "input_bytes": 20, "ignored": "x"})
+    history = cm.get_history()
+    assert [row["file_key"] for row in history] == ["b", "a"]
+    assert history[0]["input_bytes"] == 20
+    assert history[0]["encode_seconds"] is None
+    cm.close()
+
+
+def test_failure_is_retried_once_retry_after_passes(tmp_path):
+    from datetime import datetime
+
+    cm = make_cm(tmp_path)
+    cm.mark_processed("k", {"action": "failed", "failure": "transient", "attempt": 1,
+                            "retry_after": "2026-05-20T04:30:00"})
+    before, after = datetime(2026, 5, 20, 4, 0), datetime(2026, 5, 20, 5, 0)
+    assert cm.is_processed("k", now=before) is True
+    assert cm.is_processed("k", now=after) is False
+    cm.flush()
+    assert cm.is_processed("k", now=before) is True
+    assert cm.is_processed("k", now=after) is False
+    assert cm.get_outcome("k")["attempt"] == 1
+    assert cm.get_outcome("missing") is None
+    cm.close()
+
+
+def test_busy_database_retries_the_batch_and_keeps_pending_until_commit(tmp_path, monkeypatch):
+    import sqlite3
+
+    from src import cache_manager
+
+    monkeypatch.setattr(cache_manager, "WRITE_RETRY_SECONDS", 0.01)
+    cm = CacheManager(str(tmp_path / "cache.db"), busy_timeout_ms=10)
+    # Another process (e.g. `cache import`) holds the write lock.
+    blocker = sqlite3.connect(str(tmp_path / "cache.db"), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    cm.mark_processed("k", {"action": "converted", "path": "/a.mkv"})
+
+    time.sleep(0.05)
+    assert cm.is_processed("k") is True  # still pending, not lost
+    blocker.execute("COMMIT")
+    cm.flush()
+    with cm._pending_lock:
+        assert "k" not in cm._pending
+    fresh = sqlite3.connect(str(tmp_path / "cache.db"))
+    assert fresh.execute("SELECT action FROM processed_files WHERE file_key = 'k'").fetchone() == ("converted",)
+    fresh.close()
+    blocker.close()
+    cm.close()
+
+
+def test_batch_dropped_after_retries_is_logged_and_not_pending(tmp_path, monkeypatch, caplog):
+    import sqlite3
+
+    from src import cache_manager
+
+    monkeypatch.setattr(cache_manager, "WRITE_RETRY_SECONDS", 0.001)
+    monkeypatch.setattr(cache_manager, "WRITE_ATTEMPTS", 2)
+    cm = CacheManager(str(tmp_path / "cache.db"), busy_timeout_ms=10)
+    blocker = sqlite3.connect(str(tmp_path / "cache.db"), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    cm.mark_processed("k", {"action": "converted", "path": "/a.mkv"})
+    cm.flush()
+    blocker.execute("ROLLBACK")
+    blocker.close()
+
+    assert "Cache write dropped: converted /a.mkv" in caplog.text
+    assert cm.is_processed("k") is False
+    cm.close()
@@ -0,0 +1,239 @@
+import gzip
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import cli
+from src import config as config_module
+from src.cache_manager import CacheManager
+from src.config import INPUT_DIR
+
+
+@pytest.fixture(autouse=True)
+def cli_defaults(monkeypatch):
+    sa = config_module.config.standalone_audio
+    monkeypatch.setattr(sa, "enabled", True)
+    monkeypatch.setattr(sa, "extensions", ("dts",))
+    monkeypatch.setattr(config_module.config, "excluded_dirs", ("download",))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cm = CacheManager(str(tmp_path / "cache.db"))
+    yield cm
+    cm.close()
+
+
+def test_no_command_means_run_and_cleans_whole_library():
+    args = cli.parse_args([])
+    assert args.command is None
+    assert cli.cleanup_roots(args) == [INPUT_DIR]
+
+
+def test_convert_cleans_only_targeted_paths(tmp_path):
+    movie_dir = tmp_path / "Movie"
+    movie_dir.mkdir()
+    movie = movie_dir / "movie.mkv"
+    movie.write_bytes(b"x")
+    show = tmp_path / "Show"
+    show.mkdir()
+    args = cli.parse_args(["convert", str(movie), str(show)])
+    assert cli.cleanup_roots(args, str(tmp_path)) == [str(movie_dir / ".temp_movie.mkv"), str(show)]
+
+
+def test_convert_file_removes_only_its_own_temp_file(tmp_path):
+    from src.main import cleanup_temp_files
+
+    folder = tmp_path / "folder1"
+    folder.mkdir()
+    (folder / "movie.mkv").write_bytes(b"x")
+    (folder / ".temp_movie.mkv").write_bytes(b"stale")
+    (folder / ".temp_other.mkv").write_bytes(b"in progress")
+    outside = tmp_path.parent / f"{tmp_path.name}-outside.mkv"
+    outside.write_bytes(b"x")
+    args = cli.parse_args(["convert", str(folder / "movie.mkv"), str(outside), str(folder / "gone.mkv")])
+
+    targets = cli.cleanup_roots(args, str(tmp_path))
+    for target in targets:
+        cleanup_temp_files(target)
+
+    assert targets == [str(folder / ".temp_movie.mkv")]
+    assert not (folder / ".temp_movie.mkv").exists()
+    assert (folder / ".temp_other.mkv").exists()
+
+
+@pytest.mark.parametrize("argv", [["scan"], ["plan"], ["stats"], ["bench"], ["cache", "prune"], ["cache", "export"]])
+def test_read_only_and_cache_commands_never_clean(argv):
+    assert cli.cleanup_roots(cli.parse_args(argv)) == []
+
+
+def test_convert_processes_only_given_paths(tmp_path, cache):
+    show = tmp_path / "show"
+    show.mkdir()
+    (show / "e01.mkv").write_bytes(b"x")
+    (show / "e01.dts").write_bytes(b"x")
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"x")
+    (tmp_path / "other.mkv").write_bytes(b"x")
+
+    audio = MagicMock()
+    audio.has_dts_or_truehd.return_value = False
+    audio.get_audio_streams_info.return_value = [{"codec_name": "eac3"}]
+    code = cli.dispatch(cli.parse_args(["convert", str(movie), str(show)]), cache, audio)
+
+    assert code == 0
+    probed = sorted(call.args[0] for call in audio.has_dts_or_truehd.call_args_list)
+    assert probed == sorted([str(movie), str(show / "e01.mkv")])
+    audio.get_audio_streams_info.assert_called_once_with(str(show / "e01.dts"))
+
+
+def test_convert_force_ignores_cache(tmp_path, cache):
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"x")
+    audio = MagicMock()
+    audio.has_dts_or_truehd.return_value = False
+
+    cli.dispatch(cli.parse_args(["convert", str(movie)]), cache, audio)
+    cli.dispatch(cli.parse_args(["convert", str(movie)]), cache, audio)
+    assert audio.has_dts_or_truehd.call_count == 1
+
+    cli.dispatch(cli.parse_args(["convert", "--force", str(movie)]), cache, audio)
+    assert audio.has_dts_or_truehd.call_count == 2
+
+
+def test_convert_ignores_a_paused_concurrency_window(tmp_path, cache, monkeypatch):
+    monkeypatch.setattr(config_module.config.concurrency, "profile", (("00:00-23:59", 0),))
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"x")
+    audio = MagicMock()
+    audio.has_dts_or_truehd.return_value = False
+
+    assert cli.dispatch(cli.parse_args(["convert", str(movie)]), cache, audio) == 0
+    audio.has_dts_or_truehd.assert_called_once_with(str(movie))
+
+
+def test_convert_missing_path_fails(tmp_path, cache):
+    args = cli.parse_args(["convert", str(tmp_path / "nope.mkv")])
+    assert cli.dispatch(args, cache, MagicMock()) == 2
+
+
+def test_scan_reports_cache_status(tmp_path, cache, capsys):
+    (tmp_path / "a.mkv").write_bytes(b"x")
+    (tmp_path / "b.mkv").write_bytes(b"x")
+    audio = MagicMock()
+    audio.has_dts_or_truehd.return_value = False
+    cli.dispatch(cli.parse_args(["convert", str(tmp_path / "a.mkv")]), cache, audio)
+
+    cli.dispatch(cli.parse_args(["scan", "--json", str(tmp_path)]), cache, audio)
+    entries = json.loads(capsys.readouterr().out)
+    status = {entry["path"]: entry["status"] for entry in entries}
+    assert status == {str(tmp_path / "a.mkv"): "cached", str(tmp_path / "b.mkv"): "pending"}
+
+
+def test_stats_summarises_cache_and_history(cache, capsys):
+    cache.mark_processed("a", {"action": "skipped", "reason": "no_dts_or_truehd"})
+    cache.mark_processed("b", {"action": "converted"})
+    cache.record_history({
+        "file_key": "b", "path": "/b.mkv", "input_bytes": 3_000_000_000,
+        "output_bytes": 2_000_000_000, "encode_seconds": 60.0,
+    })
+
+    cli.dispatch(cli.parse_args(["stats", "--json"]), cache, MagicMock())
+    data = json.loads(capsys.readouterr().out)
+    assert data["entries"] == 2
+    assert {"action": "skipped", "reason": "no_dts_or_truehd", "count": 1} in data["outcomes"]
+    assert data["history"]["conversions"] == 1
+
+    cli.dispatch(cli.parse_args(["stats"]), cache, MagicMock())
+    assert "1.0 GB saved" in capsys.readouterr().out
+
+
+def test_stats_shows_recent_runs_and_trend(cache, capsys):
+    for i, (wall, scanned) in enumerate([(100, 1000), (110, 1000), (200, 1100), (220, 1100)]):
+        cache.record_run({
+            "command": "run", "started_at": f"2026-10-0{i + 1}T04:00:00", "wall_seconds": wall,
+            "files_scanned": scanned, "conversions": 1, "failures": 0,
+            "bytes_before": 2_000_000_000, "bytes_after": 1_500_000_000,
+        })
+
+    cli.dispatch(cli.parse_args(["stats", "--json", "--runs", "4"]), cache, MagicMock())
+    data = json.loads(capsys.readouterr().out)
+    assert [run["started_at"][:10] for run in data["runs"]] == [
+        "2026-10-04", "2026-10-03", "2026-10-02", "2026-10-01",
+    ]
+    assert data["trend"]["wall_seconds_change"] == pytest.approx(1.0)
+    assert data["trend"]["files_scanned_change"] == pytest.approx(0.1)
+    assert data["trend"]["bytes_saved"] == 2_000_000_000
+
+    cli.dispatch(cli.parse_args(["stats"]), cache, MagicMock())
+    out = capsys.readouterr().out
+    assert "Last 4 run(s):" in out
+    assert "Trend: run time +100%, files scanned +10%" in out
+
+
+def test_cache_export_import_remaps_paths_and_keys(tmp_path, cache):
+    old_root, new_root = "/app/input/folder1", "/app/input/movies"
+    cache.mark_processed(f"{old_root}/A/A.mkv_100_1.5", {
+        "path": f"{old_root}/A/A.mkv", "size": 100, "mtime": 1.5,
+        "action": "converted", "timestamp": "2024-01-01T00:00:00", "conversion_time": 12.0,
+    })
+    cache.mark_processed("/app/input/folder10/B.mkv_200_2.0", {
+        "path": "/app/input/folder10/B.mkv", "size": 200, "mtime": 2.0, "action": "skipped",
+    })
+    # Legacy row: only the key carries path, size and mtime.
+    cache.mark_processed(f"{old_root}/C.mkv_300_3.25", {"action": "skipped"})
+    cache.mark_processed(f"{old_root}/A/link.mkv_100_1.5", {
+        "path": f"{old_root}/A/link.mkv", "size": 100, "mtime": 1.5,
+        "action": "converted", "hardlink_of": f"{old_root}/A/A.mkv",
+    })
+    cache.mark_processed(f"{old_root}/D.dts_400_4.0", {
+        "path": f"{old_root}/D.dts", "size": 400, "mtime": 4.0,
+        "action": "converted", "output_file": f"{old_root}/D.eac3",
+    })
+    export = tmp_path / "export.jsonl.gz"
+    assert cli.dispatch(cli.parse_args(["cache", "export", str(export)]), cache, MagicMock()) == 0
+
+    target = CacheManager(str(tmp_path / "new.db"))
+    try:
+        args = cli.parse_args(["cache", "import", str(export), "--remap", f"{old_root}={new_root}"])
+        assert cli.dispatch(args, target, MagicMock()) == 0
+        assert target.is_processed(f"{new_root}/A/A.mkv_100_1.5")
+        assert target.is_processed(f"{new_root}/C.mkv_300_3.25")
+        # folder10 is not under folder1.
+        assert target.is_processed("/app/input/folder10/B.mkv_200_2.0")
+        assert not target.is_processed(f"{old_root}/A/A.mkv_100_1.5")
+        [entry] = [e for e in target.iter_entries() if e["path"] == f"{new_root}/A/A.mkv"]
+        assert entry["metadata"] == {"conversion_time": 12.0}
+        assert entry["timestamp"] == "2024-01-01T00:00:00"
+        metadata = {e["path"]: e["metadata"] for e in target.iter_entries()}
+        assert metadata[f"{new_root}/A/link.mkv"] == {"hardlink_of": f"{new_root}/A/A.mkv"}
+        assert metadata[f"{new_root}/D.dts"] == {"output_file": f"{new_root}/D.eac3"}
+
+        # Re-importing keeps existing entries unless --overwrite.
+        assert target.import_entries([{**entry, "action": "failed"}]) == 0
+        assert target.import_entries([{**entry, "action": "failed"}], overwrite=True) == 1
+    finally:
+        target.close()
+
+
+def test_cache_import_rejects_bad_input(tmp_path, cache, capsys):
+    with pytest.raises(SystemExit):
+        cli.parse_args(["cache", "import", "x.gz", "--remap", "no-equals"])
+    assert "OLD_PREFIX=NEW_PREFIX" in capsys.readouterr().err
+
+    bogus = tmp_path / "bogus.jsonl.gz"
+    with gzip.open(bogus, "wt") as f:
+        f.write('{"format": "something-else"}\n')
+    assert cli.dispatch(cli.parse_args(["cache", "import", str(bogus)]), cache, MagicMock()) == 2
+
+
+@pytest.mark.parametrize("content", [
+    b"not gzip at all",
+    gzip.compress(b'{"format": "eac3-converter-cache", "version": 1}\n{"path": "/a.mkv"')[:-12],
+    gzip.compress(b'{"format": "eac3-converter-cache", "version": 1}\n{"path": "/a.mkv"}\n'),
+], ids=["not-gzip", "truncated", "missing-field"])
+def test_cache_import_reports_unreadable_exports(tmp_path, cache, content):
+    export = tmp_path / "export.jsonl.gz"
+    export.write_bytes(content)
+    assert cli.dispatch(cli.parse_args(["cache", "import", str(export)]), cache, MagicMock()) == 2
@@ -12,6 +12,15 @@ ENV_VARS = [
     "FFMPEG_MAX_MUXING_QUEUE_SIZE",
     "PROCESS_STANDALONE_AUDIO", "STANDALONE_AUDIO_EXTENSIONS",
     "STANDALONE_AUDIO_KEEP_ORIGINAL", "STANDALONE_AUDIO_OUTPUT_EXTENSION",
+    "CACHE_MAINTENANCE_ON_STARTUP", "CACHE_MAINTENANCE_AFTER_RUN",
+    "CACHE_FAILED_TTL_HOURS", "CACHE_DISK_SPACE_TTL_HOURS",
+    "BANDWIDTH_LIMIT_MBPS", "BANDWIDTH_DAY_LIMIT_MBPS", "BANDWIDTH_DAY_WINDOW",
+    "BANDWIDTH_MOUNT_LIMITS", "LOG_FORMAT", "LOG_FILE",
+    "PROFILE_MODE", "DRAIN_GRACE_SECONDS", "PAGE_CACHE_MODE", "PAGE_CACHE_INTERVAL_SECONDS",
+    "TARGET_CODEC", "TARGET_CODEC_PATHS", "REDUNDANT_TRACK_POLICY",
+    "SEGMENT_ENCODE", "SEGMENT_SECONDS", "SEGMENT_WORKERS",
+    "RETRY_MAX_ATTEMPTS", "RETRY_TIMEOUT_MULTIPLIER", "CONCURRENCY_PROFILE",
+    "RUN_CONTINUOUSLY", "RESCAN_INTERVAL_MINUTES",
 ]
 
 
@@ -26,6 +35,7 @@ def test_defaults_apply_when_no_env_set():
     assert cfg.app.debug_mode is False
     assert cfg.schedule.start_time == "04:00"
     assert cfg.schedule.run_immediately is False
+    assert cfg.schedule.drain_grace_seconds == 0
     assert cfg.tz == "Europe/Paris"
     assert cfg.excluded_dirs == ("download",)
     assert cfg.ffmpeg.kbps_per_channel == 256
@@ -144,3 +154,122 @@ def test_deprecated_kbps_per_channel_invalid(monkeypatch):
     monkeypatch.setenv("FFMPEG_KBPS_PER_CHANNEL", "high")
     with pytest.raises(ConfigError):
         load_config()
+
+
+def test_cache_maintenance_defaults():
+    cfg = load_config()
+    assert cfg.cache.maintenance_on_startup is True
+    assert cfg.cache.maintenance_after_run is False
+    assert cfg.cache.failed_ttl_hours == 168.0
+    assert cfg.cache.disk_space_ttl_hours == 24.0
+
+
+def test_cache_ttls_parsed(monkeypatch):
+    monkeypatch.setenv("CACHE_FAILED_TTL_HOURS", "12")
+    monkeypatch.setenv("CACHE_DISK_SPACE_TTL_HOURS", "0")
+    cfg = load_config()
+    assert cfg.cache.failed_ttl_hours == 12.0
+    assert cfg.cache.disk_space_ttl_hours == 0.0
+
+
+def test_bandwidth_mount_limits_parsed(monkeypatch):
+    monkeypatch.setenv("BANDWIDTH_MOUNT_LIMITS", "/app/input/nas=50, /app/input/usb/=20")
+    cfg = load_config()
+    assert cfg.bandwidth.mount_limits == (("/app/input/nas", 50.0), ("/app/input/usb", 20.0))
+
+
+def test_bandwidth_invalid_entries_raise(monkeypatch):
+    monkeypatch.setenv("BANDWIDTH_MOUNT_LIMITS", "/app/input/nas")
+    with pytest.raises(ConfigError):
+        load_config()
+    monkeypatch.setenv("BANDWIDTH_MOUNT_LIMITS", "")
+    monkeypatch.setenv("BANDWIDTH_DAY_WINDOW", "8-23")
+    with pytest.raises(ConfigError):
+        load_config()
+
+
+def test_log_format_validated(monkeypatch):
+    monkeypatch.setenv("LOG_FORMAT", "JSON")
+    assert load_config().app.log_format == "json"
+    monkeypatch.setenv("LOG_FORMAT", "xml")
+    with pytest.raises(ConfigError):
+        load_config()
+
+
+def test_profile_mode_validated(monkeypatch):
+    monkeypatch.setenv("PROFILE_MODE", "All")
+    assert load_config().profile.mode == "all"
+    monkeypatch.setenv("PROFILE_MODE", "perf")
+    with pytest.raises(ConfigError):
+        load_config()
+
+
+def test_page_cache_mode_validated(monkeypatch):
+    assert load_config().page_cache.mode == "normal"
+    monkeypatch.setenv("PAGE_CACHE_MODE", "Drop_Sync")
+    assert load_config().page_cache.mode == "drop_sync"
+    monkeypatch.setenv("PAGE_CACHE_MODE", "dontneed")
+    with pytest.raises(ConfigError):
+        load_config()
+
+
+@pytest.mark.parametrize("value", ["0", "-5"])
+def test_page_cache_interval_must_be_positive(monkeypatch, value):
+    monkeypatch.setenv("PAGE_CACHE_INTERVAL_SECONDS", value)
+    with pytest.raises(ConfigError):
+        load_config()
+
+
+def test_target_codec_per_library(monkeypatch):
+    monkeypatch.setenv("TARGET_CODEC", "AC3")
+    monkeypatch.setenv("TARGET_CODEC_PATHS", "/app/input/4k=eac3,/app/input/4k/kids=ac3_fixed")
+    target = load_config().target
+    assert target.codec_for("/app/input/movies/a.mkv") == "ac3"
+    assert target.codec_for("/app/input/4k/a.mkv") == "eac3"
+    assert target.codec_for("/app/input/4k/kids/a.mkv") == "ac3_fixed"
+    assert target.codec_for("/app/input/4k-old/a.mkv") == "ac3"
+    monkeypatch.setenv("TARGET_CODEC_PATHS", "/app/input/4k=dts")
+    with pytest.raises(ConfigError):
+        load_config()
+
+
+def test_redundant_track_policy(monkeypatch):
+    assert load_config().target.redundant_tracks == "encode"
+    monkeypatch.setenv("REDUNDANT_TRACK_POLICY", "Drop")
+    assert load_config().target.redundant_tracks == "drop"
+    monkeypatch.setenv("REDUNDANT_TRACK_POLICY", "delete")
+    with pytest.raises(ConfigError):
+        load_config()
+
+
+def test_segment_settings(monkeypatch):
+    assert load_config().segments.enabled is False
+    monkeypatch.setenv("SEGMENT_ENCODE", "true")
+    monkeypatch.setenv("SEGMENT_SECONDS", "1")
+    monkeypatch.setenv("SEGMENT_WORKERS", "-2")
+    segments = load_config().segments
+    assert segments.enabled is True
+    assert segments.segment_seconds == 10
+    assert segments.workers == 0
+
+
+def test_retry_settings_are_clamped(monkeypatch):
+    assert load_config().retry.max_attempts == 3
+    monkeypatch.setenv("RETRY_MAX_ATTEMPTS", "0")
+    monkeypatch.setenv("RETRY_TIMEOUT_MULTIPLIER", "0.5")
+    retry = load_config().retry
+    assert retry.max_attempts == 1
+    assert retry.timeout_multiplier == 1.0
+
+
+def test_concurrency_profile(monkeypatch):
+    monkeypatch.setenv("CONCURRENCY_PROFILE", "01:00-07:00=4, 07:00-19:00=1,19:00-23:00=0")
+    assert load_config().concurrency.profile == (
+        ("01:00-07:00", 4), ("07:00-19:00", 1), ("19:00-23:00", 0),
+    )
+    monkeypatch.setenv("CONCURRENCY_PROFILE", "01:00-25:00=4")
+    with pytest.raises(ConfigError):
+        load_config()
+    monkeypatch.setenv("CONCURRENCY_PROFILE", "01:00-07:00=-1")
+    with pytest.raises(ConfigError):
+        load_config()
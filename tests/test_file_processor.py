@@ -0,0 +1,213 @@
+import os
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import config as config_module
+from src.cache_manager import CacheManager, make_file_key
+from src.exceptions import OutputVerificationError
+from src.file_processor import FileProcessor
+
+
+@pytest.fixture(autouse=True)
+def mkv_defaults(monkeypatch):
+    monkeypatch.setattr(config_module.config.verify, "enabled", True)
+
+
+def make_processor(tmp_path):
+    cache = CacheManager(str(tmp_path / "cache.db"))
+    audio = MagicMock()
+    audio.has_dts_or_truehd.return_value = True
+    audio.check_disk_space.return_value = True
+
+    def fake_convert(input_file, temp_file, degraded=False):
+        Path(temp_file).write_bytes(b"converted")
+        return {"conversion_time": 1.0, "command": "ffmpeg ...", "audio_plan": []}
+
+    audio.convert_audio_tracks.side_effect = fake_convert
+    return FileProcessor(cache, audio), cache, audio
+
+
+def test_verified_output_replaces_source(tmp_path):
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"original")
+    fp, cache, _ = make_processor(tmp_path)
+    fp.verifier = MagicMock()
+
+    fp.process_file(str(movie))
+
+    fp.verifier.verify.assert_called_once_with(str(movie), str(tmp_path / ".temp_movie.mkv"), [])
+    assert movie.read_bytes() == b"converted"
+    cache.close()
+
+
+def test_rejected_output_keeps_source(tmp_path):
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"original")
+    fp, cache, _ = make_processor(tmp_path)
+    fp.verifier = MagicMock()
+    fp.verifier.verify.side_effect = OutputVerificationError("truncated")
+
+    fp.process_file(str(movie))
+
+    assert movie.read_bytes() == b"original"
+    assert not (tmp_path / ".temp_movie.mkv").exists()
+    cache.flush()
+    row = cache.conn.execute("SELECT action, metadata_json FROM processed_files").fetchone()
+    assert row[0] == "failed"
+    assert "OutputVerificationError" in row[1]
+    cache.close()
+
+
+def test_hardlinks_are_relinked_and_cached(tmp_path):
+    library, downloads = tmp_path / "library", tmp_path / "downloads"
+    library.mkdir()
+    downloads.mkdir()
+    movie, copy = library / "movie.mkv", downloads / "movie.mkv"
+    movie.write_bytes(b"original")
+    os.link(movie, copy)
+    original = os.stat(movie)
+    fp, cache, audio = make_processor(tmp_path)
+    fp.verifier = MagicMock()
+
+    fp.process_file(str(movie), hardlinks=[str(copy)])
+
+    audio.convert_audio_tracks.assert_called_once()
+    assert copy.read_bytes() == b"converted"
+    assert os.stat(copy).st_ino == os.stat(movie).st_ino
+    assert os.stat(movie).st_nlink == 2
+    assert not list(downloads.glob(".temp_*"))
+    alias_key = make_file_key(str(copy), original.st_size, original.st_mtime)
+    assert cache.is_processed(alias_key)
+    cache.flush()
+    metadata = cache.conn.execute(
+        "SELECT metadata_json FROM processed_files WHERE path = ?", (str(copy),)
+    ).fetchone()[0]
+    assert str(movie) in metadata
+    cache.close()
+
+
+def test_failed_relink_leaves_alias_uncached(tmp_path, monkeypatch):
+    movie, copy = tmp_path / "movie.mkv", tmp_path / "copy.mkv"
+    movie.write_bytes(b"original")
+    os.link(movie, copy)
+    original = os.stat(movie)
+    fp, cache, _ = make_processor(tmp_path)
+    fp.verifier = MagicMock()
+
+    def refuse(*args):
+        raise PermissionError("read-only")
+
+    monkeypatch.setattr("src.file_processor.os.link", refuse)
+    fp.process_file(str(movie), hardlinks=[str(copy)])
+
+    assert copy.read_bytes() == b"original"
+    assert not cache.is_processed(make_file_key(str(copy), original.st_size, original.st_mtime))
+    cache.close()
+
+
+def test_marked_file_is_skipped_without_probing(tmp_path, monkeypatch):
+    from src import marker
+
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"converted earlier")
+    fp, cache, audio = make_processor(tmp_path)
+    monkeypatch.setattr(marker, "read_marker", lambda path: {"version": "2.2.0", "policy": "1"})
+
+    fp.process_file(str(movie))
+
+    audio.has_dts_or_truehd.assert_not_called()
+    cache.flush()
+    row = cache.conn.execute("SELECT action, metadata_json FROM processed_files").fetchone()
+    assert row[0] == "skipped"
+    assert "converted_marker" in row[1]
+    cache.close()
+
+
+def test_skip_policy_leaves_files_with_compatible_tracks(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_module.config.target, "redundant_tracks", "skip")
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"original")
+    fp, cache, audio = make_processor(tmp_path)
+    audio.lossless_tracks_redundant.return_value = True
+
+    fp.process_file(str(movie))
+
+    audio.convert_audio_tracks.assert_not_called()
+    cache.flush()
+    row = cache.conn.execute("SELECT action, metadata_json FROM processed_files").fetchone()
+    assert row[0] == "skipped"
+    assert "compatible_track_present" in row[1]
+    cache.close()
+
+
+def test_permanent_failure_removes_segment_checkpoints(tmp_path):
+    from src import segments
+    from src.exceptions import ConversionError
+
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"original")
+    fp, cache, audio = make_processor(tmp_path)
+    checkpoints = Path(segments.checkpoint_dir(str(movie)))
+
+    def failing_convert(input_file, temp_file, degraded=False):
+        checkpoints.mkdir()
+        (checkpoints / "000.eac3").write_bytes(b"segment")
+        raise ConversionError("ffmpeg error (code 1): Invalid data found when processing input", 1)
+
+    audio.convert_audio_tracks.side_effect = failing_convert
+    fp.process_file(str(movie))
+
+    key = make_file_key(str(movie), movie.stat().st_size, movie.stat().st_mtime)
+    outcome = cache.get_outcome(key)
+    assert (outcome["action"], outcome["failure"]) == ("failed", "permanent")
+    assert "retry_after" not in outcome
+    assert not checkpoints.exists()
+    cache.close()
+
+
+def test_transient_failure_keeps_segment_checkpoints(tmp_path):
+    from src import segments
+    from src.exceptions import ConversionTimeoutError
+
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"original")
+    fp, cache, audio = make_processor(tmp_path)
+    checkpoints = Path(segments.checkpoint_dir(str(movie)))
+    checkpoints.mkdir()
+    audio.convert_audio_tracks.side_effect = ConversionTimeoutError("Timeout after 3600s")
+
+    fp.process_file(str(movie))
+
+    assert checkpoints.exists()
+    cache.close()
+
+
+def test_transient_failure_is_retried_with_conservative_settings(tmp_path):
+    from datetime import datetime, timedelta
+
+    from src.exceptions import ConversionTimeoutError
+
+    movie = tmp_path / "movie.mkv"
+    movie.write_bytes(b"original")
+    fp, cache, audio = make_processor(tmp_path)
+    fp.verifier = MagicMock()
+    convert = audio.convert_audio_tracks.side_effect
+    audio.convert_audio_tracks.side_effect = ConversionTimeoutError("Timeout after 3600s")
+
+    fp.process_file(str(movie))
+
+    key = make_file_key(str(movie), movie.stat().st_size, movie.stat().st_mtime)
+    outcome = cache.get_outcome(key)
+    assert (outcome["action"], outcome["failure"], outcome["attempt"]) == ("failed", "transient", 1)
+    assert cache.is_processed(key)
+    assert cache.is_processed(key, now=datetime.now() + timedelta(days=1)) is False
+
+    cache.mark_processed(key, {**outcome, "path": str(movie), "retry_after": "2000-01-01T00:00:00"})
+    audio.convert_audio_tracks.side_effect = convert
+    fp.process_file(str(movie))
+
+    assert audio.convert_audio_tracks.call_args.kwargs["degraded"] is True
+    assert cache.get_outcome(key)["action"] == "converted"
+    cache.close()
@@ -157,7 +157,7 @@ def test_process_standalone_converts_dts_and_removes_original(tmp_path):
     audio.get_audio_streams_info.return_value = [{"codec_name": "dts", "channels": 6}]
     audio.check_disk_space.return_value = True
 
-    def fake_convert(input_file, temp_file):
+    def fake_convert(input_file, temp_file, degraded=False):
         # Simulate ffmpeg producing the temp output.
         from pathlib import Path
         Path(temp_file).write_bytes(b"converted")
@@ -182,7 +182,7 @@ def test_process_standalone_keeps_original_when_configured(tmp_path, monkeypatch
     audio.get_audio_streams_info.return_value = [{"codec_name": "dts", "channels": 6}]
     audio.check_disk_space.return_value = True
 
-    def fake_convert(input_file, temp_file):
+    def fake_convert(input_file, temp_file, degraded=False):
         from pathlib import Path
         Path(temp_file).write_bytes(b"converted")
         return {"conversion_time": 1.23, "command": "ffmpeg ..."}
@@ -204,7 +204,7 @@ def test_process_standalone_cache_hit_short_circuits(tmp_path):
     audio.get_audio_streams_info.return_value = [{"codec_name": "dts", "channels": 6}]
     audio.check_disk_space.return_value = True
 
-    def fake_convert(input_file, temp_file):
+    def fake_convert(input_file, temp_file, degraded=False):
         from pathlib import Path
         Path(temp_file).write_bytes(b"converted")
         return {"conversion_time": 1.0, "command": "ffmpeg ..."}
@@ -229,3 +229,72 @@ def test_process_standalone_cache_hit_short_circuits(tmp_path):
     fp.process_standalone_audio_file(str(src))
     audio.convert_standalone_audio.assert_not_called()
     cache.close()
+
+
+def test_converted_standalone_records_columns_and_history(tmp_path):
+    src = tmp_path / "track.dts"
+    src.write_bytes(b"x" * 10)
+
+    fp, cache, audio = make_processor(tmp_path)
+    audio.get_audio_streams_info.return_value = [{"codec_name": "dts", "channels": 6}]
+    audio.check_disk_space.return_value = True
+
+    def fake_convert(input_file, temp_file, degraded=False):
+        from pathlib import Path
+        Path(temp_file).write_bytes(b"abc")
+        return {
+            "conversion_time": 2.0, "command": "ffmpeg ...", "codec": "eac3",
+            "streams_encoded": 1, "channels_encoded": 6, "duration_seconds": 60.0,
+        }
+
+    audio.convert_standalone_audio.side_effect = fake_convert
+    fp.process_standalone_audio_file(str(src))
+    cache.flush()
+
+    path, size = cache.conn.execute(
+        "SELECT path, size FROM processed_files WHERE action = 'converted'"
+    ).fetchone()
+    assert (path, size) == (str(src), 10)
+    [entry] = cache.get_history()
+    assert entry["kind"] == "standalone"
+    assert entry["input_bytes"] == 10
+    assert entry["output_bytes"] == 3
+    assert entry["encode_speed"] == 30.0
+    assert entry["wall_seconds"] is not None
+    cache.close()
+
+
+def test_find_media_files_splits_one_scan(tmp_path):
+    (tmp_path / "movie.mkv").write_bytes(b"x")
+    (tmp_path / "track.dts").write_bytes(b"x")
+    (tmp_path / "notes.txt").write_bytes(b"x")
+
+    fp, cache, _ = make_processor(tmp_path)
+    mkv_files, audio_files = fp.find_media_files(str(tmp_path))
+    cache.close()
+
+    assert mkv_files == [str(tmp_path / "movie.mkv")]
+    assert audio_files == [str(tmp_path / "track.dts")]
+
+
+def test_process_standalone_ac3_target_writes_ac3_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_module.config.target, "codec", "ac3_fixed")
+    src = tmp_path / "track.dts"
+    src.write_bytes(b"x")
+
+    fp, cache, audio = make_processor(tmp_path)
+    audio.get_audio_streams_info.return_value = [{"codec_name": "dts", "channels": 6}]
+    audio.check_disk_space.return_value = True
+
+    def fake_convert(input_file, temp_file, degraded=False):
+        from pathlib import Path
+        Path(temp_file).write_bytes(b"converted")
+        return {"conversion_time": 1.0, "command": "ffmpeg ..."}
+
+    audio.convert_standalone_audio.side_effect = fake_convert
+
+    fp.process_standalone_audio_file(str(src))
+
+    assert (tmp_path / "track.ac3").exists()
+    assert not (tmp_path / "track.ec3").exists()
+    cache.close()
@@ -0,0 +1,57 @@
+from src import marker
+from src.marker import (
+    CLUSTER, EBML, MARKER_TAG, SEEK, SEEK_HEAD, SEEK_ID, SEEK_POSITION, SEGMENT,
+    SIMPLE_TAG, TAG, TAG_NAME, TAG_STRING, TAGS, read_marker, read_tags,
+)
+
+ATTACHMENTS = 0x1941A469
+
+
+def element(element_id, payload):
+    size = len(payload)
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + (0x01 << 56 | size).to_bytes(8, "big") + payload
+
+
+def tags(**values):
+    return element(TAGS, element(TAG, b"".join(
+        element(SIMPLE_TAG, element(TAG_NAME, name.encode()) + element(TAG_STRING, value.encode()))
+        for name, value in values.items()
+    )))
+
+
+def mkv(path, *children):
+    path.write_bytes(element(EBML, b"\x42\x82\x88matroska") + element(SEGMENT, b"".join(children)))
+    return str(path)
+
+
+def test_marker_in_header_is_found_past_large_elements(tmp_path):
+    value = marker.marker_value()
+    path = mkv(
+        tmp_path / "a.mkv",
+        element(ATTACHMENTS, b"\0" * (2 * marker.MAX_ELEMENT_BYTES)),
+        tags(ENCODER="Lavf", **{MARKER_TAG: value}),
+        element(CLUSTER, b"\0" * 64),
+    )
+    found = read_marker(path)
+    assert found["policy"] == str(marker.POLICY_VERSION)
+    assert found["version"] == marker.__version__
+    assert read_tags(path)["ENCODER"] == "Lavf"
+
+
+def test_tags_after_clusters_are_found_through_the_seek_head(tmp_path):
+    cluster = element(CLUSTER, b"\0" * 64)
+    seek_head_size = len(element(SEEK_HEAD, element(SEEK, element(SEEK_ID, TAGS.to_bytes(4, "big"))
+                                                    + element(SEEK_POSITION, (0).to_bytes(4, "big")))))
+    position = (seek_head_size + len(cluster)).to_bytes(4, "big")
+    seek_head = element(SEEK_HEAD, element(SEEK, element(SEEK_ID, TAGS.to_bytes(4, "big"))
+                                          + element(SEEK_POSITION, position)))
+    path = mkv(tmp_path / "b.mkv", seek_head, cluster, tags(**{MARKER_TAG: "version=1.0;policy=1"}))
+    assert read_marker(path) == {"version": "1.0", "policy": "1"}
+
+
+def test_unmarked_and_non_matroska_files_have_no_marker(tmp_path):
+    assert read_marker(mkv(tmp_path / "c.mkv", tags(TITLE="x"), element(CLUSTER, b""))) is None
+    other = tmp_path / "d.mkv"
+    other.write_bytes(b"not a matroska file")
+    assert read_marker(str(other)) is None
+    assert read_marker(str(tmp_path / "missing.mkv")) is None
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src import pagecache
+from src.config import PageCacheConfig
+from src.pagecache import TRAILING_BYTES, PageCacheJanitor
+from src.processes import ProcessRegistry
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="needs posix_fadvise")
+
+
+@pytest.fixture
+def fadvise_calls(monkeypatch):
+    calls = []
+    real = os.posix_fadvise
+
+    def record(fd, offset, length, advice):
+        calls.append((os.readlink(f"/proc/self/fd/{fd}"), offset, length, advice))
+        return real(fd, offset, length, advice)
+
+    monkeypatch.setattr(os, "posix_fadvise", record)
+    return calls
+
+
+def test_normal_mode_leaves_the_page_cache_alone(tmp_path, fadvise_calls):
+    source = tmp_path / "movie.mkv"
+    source.write_bytes(b"x")
+    with PageCacheJanitor(PageCacheConfig(mode="normal")).limit(str(source), str(tmp_path / "out")):
+        pass
+    assert fadvise_calls == []
+
+
+def test_drop_skips_files_not_far_enough_behind(tmp_path, fadvise_calls):
+    path = tmp_path / "movie.mkv"
+    path.write_bytes(b"x")
+    janitor = PageCacheJanitor(PageCacheConfig(mode="drop"))
+    janitor.drop(str(path), end=0)
+    janitor.drop(str(path), end=4096)
+    janitor.drop(str(path))
+    assert fadvise_calls == [
+        (str(path), 0, 4096, os.POSIX_FADV_DONTNEED),
+        (str(path), 0, 0, os.POSIX_FADV_DONTNEED),
+    ]
+
+
+def test_reader_position_of_a_tracked_process(tmp_path, monkeypatch):
+    source = tmp_path / "movie.mkv"
+    source.write_bytes(b"\0" * 10000)
+    registry = ProcessRegistry()
+    monkeypatch.setattr(pagecache, "registry", registry)
+    code = f"f = open({str(source)!r}, 'rb'); f.seek(1234); print('ready', flush=True); import time; time.sleep(30)"
+    process = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+    try:
+        process.stdout.readline()
+        assert pagecache.reader_position(str(source)) is None
+        registry.add(process)
+        assert pagecache.reader_position(str(source)) == 1234
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_limit_drops_behind_ffmpeg_and_everything_at_the_end(tmp_path, monkeypatch, fadvise_calls):
+    source, output = tmp_path / "movie.mkv", tmp_path / ".temp_movie.mkv"
+    source.write_bytes(b"x")
+    monkeypatch.setattr(pagecache, "reader_position", lambda path: TRAILING_BYTES + 100)
+    janitor = PageCacheJanitor(PageCacheConfig(mode="drop", interval_seconds=0.01))
+    with janitor.limit(str(source), str(output)):
+        time.sleep(0.05)
+        output.write_bytes(b"y")
+    assert (str(source), 0, 100, os.POSIX_FADV_DONTNEED) in fadvise_calls
+    assert fadvise_calls[-2:] == [
+        (str(source), 0, 0, os.POSIX_FADV_DONTNEED),
+        (str(output), 0, 0, os.POSIX_FADV_DONTNEED),
+    ]
@@ -0,0 +1,117 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import config as config_module
+from src.audio_processor import AudioProcessor
+from src.cache_manager import CacheManager
+from src.file_processor import FileProcessor
+from src.planner import Planner, estimate_stream_bytes, parse_bitrate
+
+
+@pytest.fixture(autouse=True)
+def plan_defaults(monkeypatch):
+    monkeypatch.setattr(config_module.config, "excluded_dirs", ("download",))
+    monkeypatch.setattr(config_module.config.plan, "default_throughput_mbps", 1.0)
+    monkeypatch.setattr(config_module.config.ffmpeg, "min_disk_space_ratio", 1.5)
+
+
+def make_planner(tmp_path, probes):
+    cache = CacheManager(str(tmp_path / "cache.db"))
+    audio = MagicMock()
+    audio.build_audio_plan.side_effect = AudioProcessor.build_audio_plan
+    audio.probe_file.side_effect = lambda path: probes[path]
+    return Planner(FileProcessor(cache, audio)), cache, audio
+
+
+def test_parse_bitrate():
+    assert parse_bitrate("640k") == 640_000
+    assert parse_bitrate("1.5M") == 1_500_000
+    assert parse_bitrate("192000") == 192_000
+
+
+def test_estimate_stream_bytes_prefers_statistics_tags():
+    stream = {"tags": {"NUMBER_OF_BYTES-eng": "1000", "BPS-eng": "8"}, "bit_rate": "16"}
+    assert estimate_stream_bytes(stream, 10.0) == 1000
+    assert estimate_stream_bytes({"bit_rate": "16"}, 10.0) == 20
+    assert estimate_stream_bytes({"tags": {"BPS": "8"}}, 10.0) == 10
+    assert estimate_stream_bytes({}, 10.0) is None
+
+
+def test_build_plan_estimates_without_converting(tmp_path):
+    media = tmp_path / "media"
+    media.mkdir()
+    movie = media / "movie.mkv"
+    movie.write_bytes(b"x" * 4_000_000)
+    plain = media / "plain.mkv"
+    plain.write_bytes(b"x" * 1000)
+
+    probes = {
+        str(movie): {
+            "format": {"duration": "100.0"},
+            "streams": [
+                {"codec_type": "video", "codec_name": "hevc"},
+                {"codec_type": "audio", "codec_name": "truehd", "channels": 8,
+                 "tags": {"NUMBER_OF_BYTES": "3000000"}},
+                {"codec_type": "audio", "codec_name": "ac3", "channels": 6},
+            ],
+        },
+        str(plain): {
+            "format": {"duration": "10.0"},
+            "streams": [{"codec_type": "audio", "codec_name": "aac", "channels": 2}],
+        },
+    }
+    planner, cache, audio = make_planner(tmp_path, probes)
+    plan = planner.build_plan(str(media))
+    cache.close()
+
+    audio.convert_audio_tracks.assert_not_called()
+    by_path = {entry["path"]: entry for entry in plan["files"]}
+    converted = by_path[str(movie)]
+    assert converted["action"] == "convert"
+    # 4 MB source - 3 MB TrueHD + 640 kb/s * 100 s EAC3.
+    assert converted["estimated_output_bytes"] == 4_000_000 - 3_000_000 + 8_000_000
+    assert converted["estimated_encode_seconds"] == 4.0
+    assert converted["audio_plan"][0]["action"] == "encode"
+    assert converted["audio_plan"][1]["action"] == "copy"
+    assert by_path[str(plain)]["action"] == "skip"
+
+    assert plan["throughput_source"] == "default"
+    assert plan["summary"]["conversions"] == 1
+    [fs] = plan["filesystems"]
+    assert fs["peak_temp_bytes"] == 9_000_000
+    assert fs["required_free_bytes"] == 6_000_000
+
+
+def test_build_plan_uses_conversion_history_and_cache(tmp_path):
+    media = tmp_path / "media"
+    media.mkdir()
+    movie = media / "movie.mkv"
+    movie.write_bytes(b"x" * 1000)
+
+    planner, cache, audio = make_planner(tmp_path, {})
+    cache.record_history({
+        "file_key": "old", "path": "/old.mkv", "input_bytes": 2_000_000_000, "encode_seconds": 10.0,
+    })
+    key = planner.file_processor.generate_file_key(
+        str(movie), planner.file_processor.get_file_metadata(str(movie))
+    )
+    cache.mark_processed(key, {"action": "skipped"})
+
+    plan = planner.build_plan(str(media))
+    cache.close()
+
+    assert plan["throughput_source"] == "history"
+    assert plan["throughput_model"]["seconds_per_gb"] == 5.0
+    assert plan["files"] == [{"path": str(movie), "size": 1000, "action": "cached"}]
+    audio.probe_file.assert_not_called()
+
+
+def test_write_plan_is_valid_json(tmp_path):
+    out = tmp_path / "out" / "plan.json"
+    Planner.write_plan({
+        "summary": {"conversions": 0, "files_scanned": 0, "estimated_encode_seconds": 0},
+        "throughput_source": "default",
+    }, str(out))
+    assert json.loads(out.read_text())["throughput_source"] == "default"
@@ -0,0 +1,69 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src import processes
+from src.processes import ProcessRegistry, run_tracked
+
+
+def py(code):
+    return [sys.executable, "-c", code]
+
+
+def test_run_tracked_returns_output():
+    result = run_tracked(py("print('ok')"), timeout=10)
+    assert result.stdout.strip() == "ok"
+    assert processes.registry.snapshot() == []
+
+
+def test_run_tracked_raises_on_failure():
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        run_tracked(py("import sys; sys.stderr.write('boom'); sys.exit(3)"), timeout=10)
+    assert excinfo.value.returncode == 3
+    assert excinfo.value.stderr == "boom"
+
+
+def test_run_tracked_times_out(monkeypatch):
+    monkeypatch.setattr(processes, "POLL_SECONDS", 0.05)
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_tracked(py("import time; time.sleep(30)"), timeout=0.2)
+    assert processes.registry.snapshot() == []
+
+
+def test_paused_time_does_not_count_against_timeout(monkeypatch):
+    registry = ProcessRegistry()
+    monkeypatch.setattr(processes, "registry", registry)
+    monkeypatch.setattr(processes, "POLL_SECONDS", 0.05)
+
+    def pause_briefly():
+        while not registry.snapshot():
+            time.sleep(0.01)
+        registry.pause_all()
+        time.sleep(0.6)
+        registry.resume_all()
+
+    pauser = threading.Thread(target=pause_briefly)
+    pauser.start()
+    result = run_tracked(py("import time; time.sleep(0.3); print('done')"), timeout=0.5)
+    pauser.join()
+    assert result.stdout.strip() == "done"
+
+
+def test_kill_all_stops_running_children(monkeypatch):
+    registry = ProcessRegistry()
+    monkeypatch.setattr(processes, "registry", registry)
+
+    def kill_when_started():
+        while not registry.snapshot():
+            time.sleep(0.01)
+        assert registry.kill_all() == 1
+
+    killer = threading.Thread(target=kill_when_started)
+    killer.start()
+    with pytest.raises(subprocess.CalledProcessError):
+        run_tracked(py("import time; time.sleep(30)"), timeout=60)
+    killer.join()
+    assert registry.snapshot() == []
@@ -0,0 +1,57 @@
+import logging
+import os
+import pstats
+import sys
+import threading
+
+from src.config import ProfileConfig
+from src.processes import run_probe, wait_stats
+from src.profiling import RunProfiler
+
+
+def busy_function():
+    return sum(i * i for i in range(20000))
+
+
+def test_off_mode_writes_nothing(tmp_path):
+    profiler = RunProfiler(ProfileConfig(mode="off", output_dir=str(tmp_path / "profiles")))
+    with profiler.profile():
+        busy_function()
+    assert not (tmp_path / "profiles").exists()
+
+
+def test_cpu_profile_includes_worker_threads(tmp_path):
+    profiler = RunProfiler(ProfileConfig(mode="cpu", output_dir=str(tmp_path)))
+    with profiler.profile("run"):
+        worker = threading.Thread(target=busy_function)
+        worker.start()
+        worker.join()
+
+    [pstats_file] = tmp_path.glob("run-*.pstats")
+    functions = {name for _, _, name in pstats.Stats(str(pstats_file)).stats}
+    assert "busy_function" in functions
+    assert list(tmp_path.glob("run-*-cpu.txt"))
+
+
+def test_memory_profile_reports_allocations(tmp_path, caplog):
+    profiler = RunProfiler(ProfileConfig(mode="memory", output_dir=str(tmp_path)))
+    with caplog.at_level(logging.INFO, logger="eac3_converter"):
+        with profiler.profile("run"):
+            blob = [bytearray(1024) for _ in range(200)]
+    del blob
+    [report] = tmp_path.glob("run-*-alloc.txt")
+    assert "peak" in report.read_text()
+    assert any("Profile: run took" in r.getMessage() for r in caplog.records)
+
+
+def test_subprocess_waits_are_accounted(tmp_path, caplog):
+    profiler = RunProfiler(ProfileConfig(mode="memory", output_dir=str(tmp_path)))
+    program = os.path.basename(sys.executable)
+    calls_before = wait_stats.snapshot().get(program, (0, 0.0))[0]
+    with caplog.at_level(logging.INFO, logger="eac3_converter"):
+        with profiler.profile("run"):
+            run_probe([sys.executable, "-c", "pass"])
+
+    assert wait_stats.snapshot()[program][0] == calls_before + 1
+    summary = [r.getMessage() for r in caplog.records if "waiting on subprocesses" in r.getMessage()]
+    assert f"{program} " in summary[-1] and "over 1 call(s)" in summary[-1]
@@ -0,0 +1,92 @@
+from src import resources
+from src.config import Config
+from src.resources import autotune, cgroup_cpu_limit, cgroup_memory_limit, compute_tuning
+
+GiB = 1024 ** 3
+
+
+def write_cgroup(tmp_path, cpu_max=None, memory_max=None):
+    if cpu_max is not None:
+        (tmp_path / "cpu.max").write_text(cpu_max + "\n")
+    if memory_max is not None:
+        (tmp_path / "memory.max").write_text(memory_max + "\n")
+    return str(tmp_path)
+
+
+def test_cpu_max_quota(tmp_path):
+    assert cgroup_cpu_limit(write_cgroup(tmp_path, cpu_max="400000 100000")) == 4.0
+
+
+def test_cpu_max_unlimited(tmp_path):
+    assert cgroup_cpu_limit(write_cgroup(tmp_path, cpu_max="max 100000")) is None
+
+
+def test_cgroup_v1_fallback(tmp_path):
+    cpu = tmp_path / "cpu"
+    cpu.mkdir()
+    (cpu / "cpu.cfs_quota_us").write_text("150000")
+    (cpu / "cpu.cfs_period_us").write_text("100000")
+    assert cgroup_cpu_limit(str(tmp_path)) == 1.5
+
+
+def test_missing_cgroup_files(tmp_path):
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+    assert cgroup_memory_limit(str(tmp_path)) is None
+
+
+def test_memory_max(tmp_path):
+    assert cgroup_memory_limit(write_cgroup(tmp_path, memory_max=str(2 * GiB))) == 2 * GiB
+    assert cgroup_memory_limit(write_cgroup(tmp_path, memory_max="max")) is None
+
+
+def test_cpu_quota_caps_visible_host_cores():
+    tuning = compute_tuning(Config(), cpu_limit=4.0, memory_limit=None, visible_cpus=64)
+    assert (tuning.cpus, tuning.max_jobs, tuning.ffmpeg_threads) == (4, 2, 2)
+
+
+def test_fractional_quota_rounds_up():
+    tuning = compute_tuning(Config(), cpu_limit=1.5, memory_limit=None, visible_cpus=64)
+    assert (tuning.cpus, tuning.max_jobs, tuning.ffmpeg_threads) == (2, 1, 2)
+
+
+def test_memory_limit_bounds_jobs():
+    cfg = Config()
+    cfg.concurrency.memory_per_job_mb = 512
+    tuning = compute_tuning(cfg, cpu_limit=16.0, memory_limit=1 * GiB, visible_cpus=64)
+    assert (tuning.max_jobs, tuning.ffmpeg_threads) == (2, 8)
+
+
+def test_affinity_narrower_than_quota():
+    tuning = compute_tuning(Config(), cpu_limit=8.0, memory_limit=None, visible_cpus=2)
+    assert (tuning.cpus, tuning.max_jobs) == (2, 1)
+
+
+def test_explicit_settings_win():
+    cfg = Config()
+    cfg.concurrency.max_jobs = 3
+    cfg.ffmpeg.threads = 5
+    tuning = compute_tuning(cfg, cpu_limit=4.0, memory_limit=None, visible_cpus=64)
+    assert (tuning.max_jobs, tuning.ffmpeg_threads) == (3, 5)
+
+
+def test_autotune_writes_back_resolved_values(tmp_path, monkeypatch):
+    monkeypatch.setattr(resources, "affinity_cpus", lambda: 64)
+    cfg = Config()
+    autotune(cfg, root=write_cgroup(tmp_path, cpu_max="800000 100000", memory_max="max"))
+    assert cfg.concurrency.max_jobs == 4
+    assert cfg.ffmpeg.threads == 2
+
+
+def test_profile_windows_are_clamped_to_memory_and_size_threads():
+    cfg = Config()
+    cfg.concurrency.profile = (("01:00-07:00", 8), ("19:00-23:00", 0), ("23:00-01:00", 2))
+    tuning = compute_tuning(cfg, cpu_limit=16.0, memory_limit=2 * GiB, visible_cpus=64)
+    # 2 GiB / 512 MiB = 4 jobs at most, so the night window gets 4 and
+    # threads are budgeted for 4 concurrent jobs rather than max_jobs.
+    assert tuning.profile == (("01:00-07:00", 4), ("19:00-23:00", 0), ("23:00-01:00", 2))
+    assert (tuning.max_jobs, tuning.ffmpeg_threads) == (4, 4)
+
+    cfg.concurrency.max_jobs = 2
+    tuning = compute_tuning(cfg, cpu_limit=16.0, memory_limit=2 * GiB, visible_cpus=64)
+    assert tuning.profile[0] == ("01:00-07:00", 4)
+    assert (tuning.max_jobs, tuning.ffmpeg_threads) == (2, 4)
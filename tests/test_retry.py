@@ -0,0 +1,66 @@
+import errno
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import config as config_module
+from src import retry
+from src.exceptions import ConversionError, ConversionTimeoutError, OutputVerificationError
+
+NOW = datetime(2026, 5, 20, 4, 0)
+
+
+@pytest.fixture(autouse=True)
+def retry_defaults(monkeypatch):
+    cfg = config_module.config.retry
+    monkeypatch.setattr(cfg, "max_attempts", 3)
+    monkeypatch.setattr(cfg, "backoff_minutes", 30.0)
+    monkeypatch.setattr(cfg, "max_backoff_hours", 24.0)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (ConversionTimeoutError("Timeout after 3600s"), "transient"),
+    (ConversionError("ffmpeg error (code -9): ", -9, ""), "transient"),
+    (ConversionError("ffmpeg error (code 1)", 1, "movie.mkv: Input/output error\n"), "transient"),
+    (ConversionError("ffmpeg error (code 1)", 1, "Invalid data found when processing input\n"), "permanent"),
+    (OutputVerificationError("stream count 3 != source 4"), "permanent"),
+    (OSError(errno.ESTALE, "Stale file handle"), "transient"),
+    (OSError(errno.EACCES, "Permission denied"), "permanent"),
+    (ValueError("bug"), "permanent"),
+])
+def test_classify_failure(error, expected):
+    assert retry.classify_failure(error) == expected
+
+
+def test_only_the_stderr_tail_is_inspected():
+    stderr = "Input/output error while probing\n" + "x" * retry.STDERR_TAIL_CHARS + "\nUnsupported codec\n"
+    assert retry.classify_failure(ConversionError("ffmpeg error", 1, stderr)) == "permanent"
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    assert retry.backoff(1) == timedelta(minutes=30)
+    assert retry.backoff(3) == timedelta(hours=2)
+    monkeypatch.setattr(config_module.config.retry, "max_backoff_hours", 1.0)
+    assert retry.backoff(3) == timedelta(hours=1)
+
+
+def test_transient_failures_are_retried_until_attempts_run_out():
+    error = ConversionTimeoutError("Timeout")
+    first = retry.failure_outcome(error, "ConversionTimeoutError", None, now=NOW)
+    assert first["attempt"] == 1
+    assert first["retry_after"] == "2026-05-20T04:30:00"
+
+    second = retry.failure_outcome(error, "ConversionTimeoutError", first, now=NOW)
+    assert second["attempt"] == 2
+    assert second["retry_after"] == "2026-05-20T05:00:00"
+
+    third = retry.failure_outcome(error, "ConversionTimeoutError", second, now=NOW)
+    assert third["attempt"] == 3
+    assert "retry_after" not in third
+
+
+def test_permanent_failures_are_not_retried():
+    outcome = retry.failure_outcome(ConversionError("bad", 1, "Invalid data"), "ConversionError", None, now=NOW)
+    assert outcome["failure"] == "permanent"
+    assert "retry_after" not in outcome
+    assert retry.is_retry(outcome) is False
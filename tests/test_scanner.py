@@ -0,0 +1,36 @@
+import os
+import time
+
+from src import scanner
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x")
+
+
+def test_scan_is_sorted_and_prunes_like_os_walk(tmp_path):
+    for rel in ["b/2.mkv", "a/z/1.mkv", "a/1.mkv", "a/.temp_1.mkv", "a/Download/x.mkv", "a/notes.txt"]:
+        touch(tmp_path / rel)
+    os.symlink(tmp_path / "a", tmp_path / "link")
+
+    found = scanner.scan([str(tmp_path)], lambda name: name.endswith(".mkv"), ["download"], workers=4)
+
+    assert found == [str(tmp_path / rel) for rel in ["a/1.mkv", "a/z/1.mkv", "b/2.mkv"]]
+
+
+def test_slow_directories_are_listed_in_parallel(tmp_path, monkeypatch):
+    for i in range(4):
+        touch(tmp_path / f"mount{i}" / "movie.mkv")
+    list_dir = scanner._list_dir
+
+    def slow_list_dir(path, excluded):
+        time.sleep(0.2)
+        return list_dir(path, excluded)
+
+    monkeypatch.setattr(scanner, "_list_dir", slow_list_dir)
+    started = time.monotonic()
+    found = scanner.scan([str(tmp_path)], lambda name: name.endswith(".mkv"), workers=4)
+    # The root, then the four mounts side by side.
+    assert time.monotonic() - started < 0.7
+    assert len(found) == 4
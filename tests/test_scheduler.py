@@ -0,0 +1,330 @@
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import config as config_module
+from src.scheduler import Scheduler
+
+
+@pytest.fixture(autouse=True)
+def scheduler_defaults(monkeypatch):
+    monkeypatch.setattr(config_module.config.schedule, "start_time", "04:00")
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 1)
+
+
+class RecordingProcessor:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = 0
+        self.peak = 0
+        self.calls = []
+        self.hardlinks = {}
+        self.cache_manager = MagicMock()
+
+    def _work(self, kind, path, force):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            self.calls.append((kind, path, force))
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+
+    def process_file(self, path, force=False, hardlinks=(), stats=None):
+        self._work("mkv", path, force)
+        self.hardlinks[path] = list(hardlinks)
+
+    def process_standalone_audio_file(self, path, force=False, stats=None):
+        self._work("audio", path, force)
+
+
+def test_process_paths_sequential_by_default():
+    processor = RecordingProcessor()
+    count = Scheduler(processor).process_paths(["a.mkv", "b.mkv"], ["c.dts"])
+    assert count == 3
+    assert processor.calls == [("mkv", "a.mkv", False), ("mkv", "b.mkv", False), ("audio", "c.dts", False)]
+    assert processor.peak == 1
+
+
+def test_process_paths_runs_up_to_max_jobs(monkeypatch):
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 3)
+    monkeypatch.setattr(config_module.config.concurrency, "per_device_jobs", 0)
+    processor = RecordingProcessor(delay=0.05)
+    paths = [f"{i}.mkv" for i in range(9)]
+    Scheduler(processor).process_paths(paths, [], force=True)
+    assert sorted(path for _, path, _ in processor.calls) == sorted(paths)
+    assert all(force for _, _, force in processor.calls)
+    assert processor.peak == 3
+
+
+def test_per_device_limit_serializes_jobs_on_one_device(monkeypatch, tmp_path):
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 4)
+    monkeypatch.setattr(config_module.config.concurrency, "per_device_jobs", 1)
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"{i}.mkv"
+        path.write_bytes(b"")
+        paths.append(str(path))
+    processor = RecordingProcessor(delay=0.02)
+    Scheduler(processor).process_paths(paths, [])
+    assert len(processor.calls) == 4
+    assert processor.peak == 1
+
+
+def test_dispatcher_runs_devices_in_parallel_and_skips_busy_ones():
+    from src.dispatcher import Job, JobDispatcher
+
+    lock = threading.Lock()
+    load = {}
+    peak = {}
+    order = []
+
+    def work(name, device):
+        def run():
+            with lock:
+                order.append(name)
+                load[device] = load.get(device, 0) + 1
+                peak[device] = max(peak.get(device, 0), load[device])
+            time.sleep(0.05)
+            with lock:
+                load[device] -= 1
+        return Job(path=name, run=run, devices=frozenset({device}))
+
+    jobs = [work("a1", "a"), work("a2", "a"), work("a3", "a"), work("b1", "b")]
+    dispatcher = JobDispatcher(max_jobs=lambda: 4, per_device_limit=1, poll_seconds=0.01)
+    peak_running = dispatcher.run(jobs)
+
+    assert peak == {"a": 1, "b": 1}
+    # b1 doesn't wait behind the queued jobs for device a.
+    assert order.index("b1") < order.index("a2")
+    assert peak_running == 2
+
+
+def test_dispatcher_reraises_unexpected_errors_after_running_jobs_finish():
+    from src.dispatcher import Job, JobDispatcher
+
+    finished = []
+
+    def boom():
+        raise RuntimeError("boom")
+
+    def slow():
+        time.sleep(0.05)
+        finished.append("slow")
+
+    jobs = [Job("slow", slow), Job("boom", boom), Job("never", lambda: finished.append("never"))]
+    with pytest.raises(RuntimeError):
+        JobDispatcher(max_jobs=lambda: 2, poll_seconds=0.01).run(jobs)
+    assert finished == ["slow"]
+
+
+def test_process_files_records_a_run(monkeypatch, tmp_path):
+    from src.cache_manager import CacheManager
+
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 2)
+    monkeypatch.setattr(config_module.config.concurrency, "per_device_jobs", 0)
+    monkeypatch.setattr(config_module.config.standalone_audio, "enabled", False)
+    monkeypatch.setattr(config_module.config.cache, "maintenance_after_run", False)
+    processor = RecordingProcessor(delay=0.05)
+    processor.cache_manager = CacheManager(str(tmp_path / "cache.db"))
+    processor.find_media_files = lambda _: (["a.mkv", "b.mkv"], [])
+
+    def convert(path, force=False, hardlinks=(), stats=None):
+        processor._work("mkv", path, force)
+        stats.incr("conversions")
+        stats.add_conversion(1000, 600, 2.5)
+
+    processor.process_file = convert
+    Scheduler(processor).process_files()
+
+    [run] = processor.cache_manager.get_runs()
+    processor.cache_manager.close()
+    assert run["command"] == "run"
+    assert run["files_scanned"] == 2
+    assert run["conversions"] == 2
+    assert run["bytes_before"] - run["bytes_after"] == 800
+    assert run["encode_seconds"] == 5.0
+    assert run["peak_concurrency"] == 2
+    assert run["wall_seconds"] > 0
+
+
+def test_concurrent_webhook_batch_does_not_leak_into_the_run(monkeypatch, tmp_path):
+    from src.cache_manager import CacheManager
+
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 3)
+    monkeypatch.setattr(config_module.config.concurrency, "per_device_jobs", 0)
+    monkeypatch.setattr(config_module.config.standalone_audio, "enabled", False)
+    monkeypatch.setattr(config_module.config.cache, "maintenance_after_run", False)
+    processor = RecordingProcessor(delay=0.1)
+    processor.cache_manager = CacheManager(str(tmp_path / "cache.db"))
+    processor.find_media_files = lambda _: (["a.mkv"], [])
+    counted = []
+
+    def convert(path, force=False, hardlinks=(), stats=None):
+        processor._work("mkv", path, force)
+        counted.append((path, stats))
+
+    processor.process_file = convert
+    scheduler = Scheduler(processor)
+    webhook = threading.Timer(0.03, scheduler.process_paths, args=(["w1.mkv", "w2.mkv"], []))
+    webhook.start()
+    scheduler.process_files()
+    webhook.join()
+    time.sleep(0.15)
+
+    [run] = processor.cache_manager.get_runs()
+    processor.cache_manager.close()
+    assert run["files_scanned"] == 1
+    # The webhook batch's files are not counted in the run's RunStats.
+    assert [stats is None for path, stats in sorted(counted)] == [False, True, True]
+    assert run["peak_concurrency"] >= 1
+
+
+def test_hardlinked_mkvs_are_processed_once(tmp_path):
+    library, downloads = tmp_path / "library", tmp_path / "downloads"
+    library.mkdir()
+    downloads.mkdir()
+    (library / "movie.mkv").write_bytes(b"x")
+    os.link(library / "movie.mkv", downloads / "movie.mkv")
+    (library / "other.mkv").write_bytes(b"y")
+    paths = [str(library / "movie.mkv"), str(library / "other.mkv"), str(downloads / "movie.mkv")]
+
+    processor = RecordingProcessor()
+    Scheduler(processor).process_paths(paths, [])
+    assert [path for _, path, _ in processor.calls] == paths[:2]
+    assert processor.hardlinks == {paths[0]: [paths[2]], paths[1]: []}
+
+
+def test_paths_in_flight_are_not_processed_twice(monkeypatch):
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 2)
+    processor = RecordingProcessor(delay=0.1)
+    scheduler = Scheduler(processor)
+    first = threading.Thread(target=scheduler.process_paths, args=(["a.mkv"], []))
+    first.start()
+    time.sleep(0.03)
+    assert scheduler.process_paths(["a.mkv", "b.mkv"], []) == 1
+    first.join()
+    assert sorted(path for _, path, _ in processor.calls) == ["a.mkv", "b.mkv"]
+    # Released afterwards.
+    assert scheduler.process_paths(["a.mkv"], []) == 1
+
+
+def test_draining_lets_running_jobs_finish_and_drops_the_rest(monkeypatch):
+    from src import shutdown
+
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 2)
+    monkeypatch.setattr(config_module.config.concurrency, "per_device_jobs", 0)
+    processor = RecordingProcessor(delay=0.1)
+    scheduler = Scheduler(processor)
+    threading.Timer(0.03, shutdown.draining.set).start()
+    try:
+        scheduler.process_paths(["a.mkv", "b.mkv", "c.mkv", "d.mkv"], [])
+        # The service loop exits instead of waiting for the next start time.
+        scheduler.run()
+    finally:
+        shutdown.draining.clear()
+    assert sorted(path for _, path, _ in processor.calls) == ["a.mkv", "b.mkv"]
+    assert processor.running == 0
+
+
+def test_concurrency_profile_follows_the_clock(monkeypatch):
+    from datetime import datetime
+
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 2)
+    monkeypatch.setattr(config_module.config.concurrency, "profile", (
+        ("01:00-07:00", 4), ("19:00-23:00", 0), ("23:30-00:30", 3),
+    ))
+    now = [datetime(2026, 5, 20, 3, 0)]
+    scheduler = Scheduler(RecordingProcessor(), clock=lambda: now[0])
+
+    assert scheduler.max_jobs() == 4
+    now[0] = now[0].replace(hour=12)
+    assert scheduler.max_jobs() == 2
+    now[0] = now[0].replace(hour=20)
+    assert scheduler.max_jobs() == 0
+    now[0] = now[0].replace(hour=0, minute=15)
+    assert scheduler.max_jobs() == 3
+
+
+def test_dispatcher_runs_worker_cleanup_on_each_worker_thread():
+    from src.dispatcher import Job, JobDispatcher
+
+    ran_on, cleaned_on = [], []
+
+    def fail():
+        ran_on.append(threading.get_ident())
+        raise RuntimeError("boom")
+
+    jobs = [Job(str(i), lambda: ran_on.append(threading.get_ident())) for i in range(3)] + [Job("x", fail)]
+    dispatcher = JobDispatcher(
+        max_jobs=lambda: 1, on_worker_exit=lambda: cleaned_on.append(threading.get_ident()), poll_seconds=0.01,
+    )
+    with pytest.raises(RuntimeError):
+        dispatcher.run(jobs)
+
+    assert cleaned_on == ran_on
+
+
+def test_scheduler_without_profile_ignores_windows(monkeypatch):
+    from datetime import datetime
+
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 0)
+    monkeypatch.setattr(config_module.config.concurrency, "profile", (("00:00-23:59", 0),))
+    scheduler = Scheduler(RecordingProcessor(), clock=lambda: datetime(2026, 5, 20, 12, 0), use_profile=False)
+
+    assert scheduler.max_jobs() == 1
+
+
+def test_dispatcher_follows_a_changing_limit():
+    from src.dispatcher import Job, JobDispatcher
+
+    limit = [0]
+    started = []
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def work():
+        with lock:
+            started.append(time.monotonic())
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.03)
+        with lock:
+            running[0] -= 1
+
+    opened = time.monotonic() + 0.05
+    threading.Timer(0.05, lambda: limit.__setitem__(0, 2)).start()
+    JobDispatcher(max_jobs=lambda: limit[0], poll_seconds=0.01).run([Job(str(i), work) for i in range(4)])
+
+    assert len(started) == 4
+    assert min(started) >= opened - 0.01
+    assert peak[0] == 2
+
+
+def test_continuous_mode_rescans_until_drained(monkeypatch):
+    from src import shutdown
+
+    monkeypatch.setattr(config_module.config.schedule, "continuous", True)
+    monkeypatch.setattr(config_module.config.schedule, "rescan_minutes", 15)
+    waits = []
+    monkeypatch.setattr(shutdown.draining, "wait", lambda seconds: waits.append(seconds) or False)
+    scheduler = Scheduler(RecordingProcessor())
+    runs = []
+
+    def process_files():
+        runs.append(1)
+        if len(runs) == 2:
+            shutdown.draining.set()
+
+    monkeypatch.setattr(scheduler, "process_files", process_files)
+    try:
+        scheduler.run()
+    finally:
+        shutdown.draining.clear()
+    assert len(runs) == 2
+    assert waits == [15 * 60]
@@ -0,0 +1,185 @@
+import io
+import math
+import os
+
+import pytest
+
+from src import config as config_module
+from src import segments
+from src.audio_processor import AudioProcessor
+from src.segments import FRAME_SAMPLES, SegmentedEncode, copy_frames, frame_size, plan_segments
+
+RATE = 48000
+
+
+def eac3_frame(label: int) -> bytes:
+    """A 20-byte EAC3 sync frame whose payload carries ``label``."""
+    frmsiz = 9
+    header = bytes([0x0B, 0x77, frmsiz >> 8, frmsiz & 0xFF, 0x3F, 16 << 3])
+    return header + label.to_bytes(14, "big")
+
+
+def labels(data: bytes):
+    return [int.from_bytes(data[i + 6:i + 20], "big") for i in range(0, len(data), 20)]
+
+
+@pytest.fixture
+def segment_config(monkeypatch):
+    monkeypatch.setattr(config_module.config.segments, "segment_seconds", 60)
+
+
+@pytest.fixture
+def fake_ffmpeg(monkeypatch):
+    """Encodes by emitting one labelled frame per 1536 input samples.
+
+    A frame's label is its index in a single-pass encode, so a seamless
+    concatenation reads 0, 1, 2, ...
+    """
+    calls = []
+
+    def run(command, timeout):
+        calls.append(command)
+        start = float(command[command.index("-ss") + 1])
+        first = round(start * RATE / FRAME_SAMPLES)
+        if "-t" in command:
+            count = round(float(command[command.index("-t") + 1]) * RATE / FRAME_SAMPLES)
+        else:
+            count = math.ceil(200 * RATE / FRAME_SAMPLES) - first
+        with open(command[-2], "wb") as f:
+            for label in range(first, first + count):
+                f.write(eac3_frame(label))
+
+    monkeypatch.setattr(segments, "run_tracked", run)
+    return calls
+
+
+def make_encode(tmp_path, duration=200.0):
+    source = tmp_path / "movie.mkv"
+    if not source.exists():
+        source.write_bytes(b"source")
+    streams = [{"codec_name": "truehd", "channels": 8, "sample_rate": "48000"}]
+    plan = AudioProcessor.build_audio_plan(streams)
+    return SegmentedEncode(str(source), streams, plan, duration, workers=4)
+
+
+def test_frame_sizes():
+    assert frame_size(eac3_frame(0)) == 20
+    # AC3 640 kbps at 48 kHz, and 32 kbps at 44.1 kHz with the padding word.
+    assert frame_size(bytes([0x0B, 0x77, 0, 0, 36, 8 << 3])) == 2560
+    assert frame_size(bytes([0x0B, 0x77, 0, 0, 0x40 | 1, 8 << 3])) == 140
+    with pytest.raises(ValueError):
+        frame_size(b"\x00" * 6)
+
+
+def test_copy_frames_skips_and_keeps():
+    src = io.BytesIO(b"".join(eac3_frame(i) for i in range(5)))
+    dst = io.BytesIO()
+    assert copy_frames(src, dst, skip=1, keep=3) == 3
+    assert labels(dst.getvalue()) == [1, 2, 3]
+
+
+def test_segments_are_frame_aligned_with_one_frame_preroll():
+    plan = plan_segments(200.0, RATE, 60)
+    frames = round(60 * RATE / FRAME_SAMPLES)
+    assert len(plan) == 4
+    assert plan[0].start == 0 and plan[0].skip == 0 and plan[0].keep == frames
+    assert plan[1].start * RATE == frames * FRAME_SAMPLES - FRAME_SAMPLES
+    assert plan[1].skip == 1
+    assert plan[-1].length is None and plan[-1].keep is None
+
+
+def test_concatenated_segments_match_a_single_pass(tmp_path, segment_config, fake_ffmpeg):
+    encode = make_encode(tmp_path)
+
+    tracks = encode.run()
+
+    assert len(fake_ffmpeg) == 4
+    data = open(tracks[0], "rb").read()
+    assert labels(data) == list(range(math.ceil(200 * RATE / FRAME_SAMPLES)))
+    encode.cleanup()
+    assert not os.path.exists(encode.work_dir)
+
+
+def test_interrupted_encode_resumes_from_checkpoints(tmp_path, segment_config, fake_ffmpeg):
+    encode = make_encode(tmp_path)
+    encode.run()
+    os.remove(os.path.join(encode.work_dir, "a0.0002.eac3"))
+    fake_ffmpeg.clear()
+
+    make_encode(tmp_path).run()
+
+    assert len(fake_ffmpeg) == 1
+    assert fake_ffmpeg[0][-2].endswith("a0.0002.eac3.part")
+
+
+def test_changed_source_discards_checkpoints(tmp_path, segment_config, fake_ffmpeg):
+    encode = make_encode(tmp_path)
+    encode.run()
+    (tmp_path / "movie.mkv").write_bytes(b"replaced source")
+    fake_ffmpeg.clear()
+
+    make_encode(tmp_path).run()
+
+    assert len(fake_ffmpeg) == 4
+
+
+def test_remux_swaps_encoded_tracks_in_place(tmp_path):
+    ap = AudioProcessor()
+    audio = [
+        {"codec_type": "audio", "codec_name": "truehd", "channels": 8,
+         "disposition": {"default": 1, "forced": 0}, "start_time": "0.000000"},
+        {"codec_type": "audio", "codec_name": "ac3", "channels": 6},
+    ]
+    ap.probe_file = lambda path: {
+        "streams": [{"codec_type": "video"}, *audio, {"codec_type": "subtitle"}],
+        "format": {},
+    }
+    plan = AudioProcessor.build_audio_plan(audio)
+
+    command = ap._remux_command("movie.mkv", ".temp_movie.mkv", plan, {0: "a0.eac3"}, "error")
+
+    assert command[command.index("-f") + 1:command.index("-f") + 4] == ["eac3", "-i", "a0.eac3"]
+    maps = [command[i + 1] for i, arg in enumerate(command) if arg == "-map"]
+    assert maps == ["0:0", "1:a:0", "0:2", "0:3"]
+    assert command[command.index("-disposition:a:0") + 1] == "default"
+    assert command[command.index("-metadata:s:a:0") + 1] == "title=EAC3 5.1"
+
+
+def test_degraded_retry_resumes_checkpoints_with_the_longer_timeout(tmp_path, segment_config, fake_ffmpeg, monkeypatch):
+    cfg = config_module.config.segments
+    monkeypatch.setattr(cfg, "enabled", True)
+    monkeypatch.setattr(cfg, "min_duration_seconds", 60)
+    monkeypatch.setattr(cfg, "workers", 4)
+    encode = make_encode(tmp_path)
+    encode.run()
+    os.remove(os.path.join(encode.work_dir, "a0.0001.eac3"))
+    fake_ffmpeg.clear()
+    streams = [{"codec_name": "truehd", "channels": 8, "sample_rate": "48000"}]
+    plan = AudioProcessor.build_audio_plan(streams)
+
+    retry = segments.segmented_encode(
+        str(tmp_path / "movie.mkv"), streams, plan, 200.0, degraded=True, timeout=7200
+    )
+    retry.run()
+
+    assert (retry.workers, retry.timeout) == (2, 7200)
+    assert [command[-2] for command in fake_ffmpeg] == [os.path.join(encode.work_dir, "a0.0001.eac3.part")]
+    # Without checkpoints a retry encodes in one pass.
+    (tmp_path / "other.mkv").write_bytes(b"source")
+    assert segments.segmented_encode(str(tmp_path / "other.mkv"), streams, plan, 200.0, degraded=True) is None
+
+
+def test_successful_conversion_removes_checkpoints_it_did_not_use(tmp_path, monkeypatch):
+    source = tmp_path / "movie.mkv"
+    source.write_bytes(b"source")
+    stale = tmp_path / ".segments_movie.mkv"
+    stale.mkdir()
+    (stale / "a0.0000.eac3").write_bytes(b"left by the failed attempt")
+    monkeypatch.setattr(config_module.config.segments, "enabled", False)
+    monkeypatch.setattr("src.audio_processor.run_tracked", lambda command, **kwargs: None)
+    ap = AudioProcessor()
+    ap.get_audio_streams_info = lambda _: [{"codec_name": "truehd", "channels": 8}]
+
+    ap.convert_audio_tracks(str(source), str(tmp_path / ".temp_movie.mkv"), degraded=True)
+
+    assert not stale.exists()
@@ -0,0 +1,64 @@
+from unittest.mock import MagicMock
+
+from src.throttle import PSI_CPU, PSI_IO, PressureThrottle, read_psi_avg10
+
+
+def test_read_psi_avg10(tmp_path):
+    psi = tmp_path / "cpu"
+    psi.write_text(
+        "some avg10=12.50 avg60=3.00 avg300=1.00 total=123\n"
+        "full avg10=1.00 avg60=0.00 avg300=0.00 total=4\n"
+    )
+    assert read_psi_avg10(str(psi)) == 12.5
+    assert read_psi_avg10(str(tmp_path / "missing")) is None
+
+
+def make_throttle(readings, pause_running=True, load=None):
+    registry = MagicMock()
+    throttle = PressureThrottle(
+        cpu_threshold=20.0, io_threshold=30.0, load_threshold=0.0,
+        resume_ratio=0.5, poll_seconds=0.01, pause_running=pause_running,
+        registry=registry,
+        read_psi=lambda path: readings[path],
+        read_load=lambda: load,
+    )
+    return throttle, registry
+
+
+def test_pressure_pauses_and_resumes_with_hysteresis():
+    readings = {PSI_CPU: 5.0, PSI_IO: 0.0}
+    throttle, registry = make_throttle(readings)
+    assert throttle.check() is False
+
+    readings[PSI_CPU] = 25.0
+    assert throttle.check() is True
+    registry.pause_all.assert_called_once()
+
+    # Below the threshold but above threshold * resume_ratio: stay paused.
+    readings[PSI_CPU] = 15.0
+    assert throttle.check() is True
+    registry.resume_all.assert_not_called()
+
+    readings[PSI_CPU] = 5.0
+    assert throttle.check() is False
+    registry.resume_all.assert_called_once()
+
+
+def test_io_pressure_without_pausing_children():
+    throttle, registry = make_throttle({PSI_CPU: 0.0, PSI_IO: 50.0}, pause_running=False)
+    assert throttle.check() is True
+    registry.pause_all.assert_not_called()
+
+
+def test_unavailable_psi_and_disabled_load_never_throttle():
+    throttle, _ = make_throttle({PSI_CPU: None, PSI_IO: None}, load=99.0)
+    assert throttle.check() is False
+
+
+def test_stop_resumes_paused_children():
+    throttle, registry = make_throttle({PSI_CPU: 50.0, PSI_IO: 0.0})
+    throttle.start()
+    assert throttle.pressured
+    throttle.stop()
+    registry.resume_all.assert_called_once()
+    assert not throttle.pressured
@@ -0,0 +1,43 @@
+import pytest
+
+from src.throughput import GB, ThroughputModel
+
+
+def test_empty_history_predicts_nothing():
+    model = ThroughputModel.fit([])
+    assert model.samples == 0
+    assert model.predict(10 * GB, 3600, 6) is None
+
+
+def test_rows_without_timing_are_ignored():
+    model = ThroughputModel.fit([{"input_bytes": GB, "encode_seconds": None}])
+    assert model.samples == 0
+
+
+def test_fit_recovers_size_and_encode_costs():
+    # 20 s per GB of container plus 30 s per channel-hour of audio encoded.
+    history = []
+    for gb, hours, channels in [(10, 2, 6), (40, 2, 6), (5, 3, 2), (60, 1, 6), (8, 2.5, 8)]:
+        history.append({
+            "input_bytes": gb * GB,
+            "duration_seconds": hours * 3600,
+            "channels_encoded": channels,
+            "encode_seconds": 20 * gb + 30 * hours * channels,
+        })
+    model = ThroughputModel.fit(history)
+    assert model.samples == 5
+    assert model.seconds_per_gb == pytest.approx(20)
+    assert model.seconds_per_channel_hour == pytest.approx(30)
+    assert model.predict(30 * GB, 7200, 6) == pytest.approx(20 * 30 + 30 * 12)
+
+
+def test_degenerate_history_falls_back_to_size_ratio():
+    # Every sample has the same shape, so the two costs can't be separated.
+    history = [
+        {"input_bytes": 2 * GB, "duration_seconds": 3600, "channels_encoded": 6, "encode_seconds": 100},
+        {"input_bytes": 4 * GB, "duration_seconds": 7200, "channels_encoded": 6, "encode_seconds": 200},
+    ]
+    model = ThroughputModel.fit(history)
+    assert model.seconds_per_gb == pytest.approx(50)
+    assert model.seconds_per_channel_hour == 0
+    assert "2 samples" in model.describe()
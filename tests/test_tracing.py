@@ -0,0 +1,80 @@
+import json
+import logging
+import threading
+
+import pytest
+
+from src import config as config_module
+from src import tracing
+from src.logging_config import JsonFormatter
+
+
+@pytest.fixture
+def json_records(monkeypatch):
+    monkeypatch.setattr(config_module.config.app, "log_format", "json")
+    lines = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            lines.append(json.loads(self.format(record)))
+
+    handler = Collect()
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(tracing.TraceContextFilter())
+    logger = logging.getLogger("eac3_converter")
+    logger.addHandler(handler)
+    old_level = logger.level
+    logger.setLevel(logging.INFO)
+    yield lines
+    logger.removeHandler(handler)
+    logger.setLevel(old_level)
+
+
+def test_spans_share_the_file_trace_id(json_records):
+    with tracing.trace("/media/movie.mkv", kind="mkv"):
+        with tracing.span("encode", input_bytes=100) as encode:
+            encode.fields["output_bytes"] = 80
+        logging.getLogger("eac3_converter").info("hello")
+        tracing.annotate(action="converted")
+
+    span, message, done = json_records
+    assert span["event"] == "span"
+    assert span["stage"] == "encode"
+    assert span["input_bytes"] == 100 and span["output_bytes"] == 80
+    assert span["seconds"] >= 0
+    assert message["msg"] == "hello"
+    assert done["event"] == "file"
+    assert done["kind"] == "mkv" and done["action"] == "converted"
+    assert span["trace_id"] == message["trace_id"] == done["trace_id"]
+    assert tracing.current_trace_id() is None
+
+
+def test_span_records_errors(json_records):
+    with pytest.raises(ValueError):
+        with tracing.span("probe"):
+            raise ValueError("bad")
+    assert json_records[0]["error"] == "ValueError"
+    assert "trace_id" not in json_records[0]
+
+
+def test_traces_are_isolated_per_thread():
+    seen = {}
+
+    def work(name):
+        with tracing.trace(name):
+            seen[name] = tracing.current_trace_id()
+
+    threads = [threading.Thread(target=work, args=(name,)) for name in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert seen["a"] != seen["b"]
+
+
+def test_spans_are_debug_only_in_text_mode(monkeypatch, caplog):
+    monkeypatch.setattr(config_module.config.app, "log_format", "text")
+    with caplog.at_level(logging.DEBUG, logger="eac3_converter"):
+        with tracing.span("stat"):
+            pass
+    assert caplog.records[-1].levelno == logging.DEBUG
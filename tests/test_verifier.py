@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import config as config_module
+from src.audio_processor import AudioProcessor
+from src.exceptions import OutputVerificationError
+from src.verifier import OutputVerifier
+
+
+@pytest.fixture(autouse=True)
+def verify_defaults(monkeypatch):
+    monkeypatch.setattr(config_module.config.verify, "duration_tolerance_seconds", 2.0)
+    monkeypatch.setattr(config_module.config.verify, "sample_frames", 5)
+
+
+SOURCE_STREAMS = [
+    {"codec_type": "video", "codec_name": "hevc"},
+    {"codec_type": "audio", "codec_name": "truehd", "channels": 8},
+    {"codec_type": "audio", "codec_name": "ac3", "channels": 6},
+    {"codec_type": "subtitle", "codec_name": "subrip"},
+]
+
+PLAN = AudioProcessor.build_audio_plan([s for s in SOURCE_STREAMS if s["codec_type"] == "audio"])
+
+
+def output_streams(**overrides):
+    streams = [
+        {"codec_type": "video", "codec_name": "hevc"},
+        {"codec_type": "audio", "codec_name": "eac3", "channels": 6},
+        {"codec_type": "audio", "codec_name": "ac3", "channels": 6},
+        {"codec_type": "subtitle", "codec_name": "subrip"},
+    ]
+    streams[1].update(overrides)
+    return streams
+
+
+def make_verifier(output, output_duration="7200.0", frames=None):
+    audio = MagicMock()
+    probes = {
+        "src.mkv": {"streams": SOURCE_STREAMS, "format": {"duration": "7200.0"}},
+        "out.mkv": {"streams": output, "format": {"duration": output_duration}},
+    }
+    audio.probe_file.side_effect = lambda path: probes[path]
+    if frames is None:
+        frames = [
+            {"pts_time": str(t), "channels": 6}
+            for t in (0.0, 0.032, 3600.0, 3600.032, 7170.0)
+        ]
+    audio.probe_frames.return_value = frames
+    return OutputVerifier(audio), audio
+
+
+def test_matching_output_passes_and_samples_three_points():
+    verifier, audio = make_verifier(output_streams())
+    verifier.verify("src.mkv", "out.mkv", PLAN)
+    path, index, intervals = audio.probe_frames.call_args.args
+    assert (path, index) == ("out.mkv", 0)
+    assert intervals == "0.000%+#5,3600.000%+#5,7170.000%+#5"
+
+
+def test_missing_stream_is_rejected():
+    verifier, _ = make_verifier(output_streams()[:3])
+    with pytest.raises(OutputVerificationError, match="stream count 3 != source 4"):
+        verifier.verify("src.mkv", "out.mkv", PLAN)
+
+
+def test_wrong_codec_or_channels_is_rejected():
+    verifier, _ = make_verifier(output_streams(channels=2))
+    with pytest.raises(OutputVerificationError, match="eac3 2ch != expected eac3 6ch"):
+        verifier.verify("src.mkv", "out.mkv", PLAN)
+
+
+def test_truncated_output_is_rejected():
+    verifier, audio = make_verifier(output_streams(), output_duration="3000.0")
+    with pytest.raises(OutputVerificationError, match="duration"):
+        verifier.verify("src.mkv", "out.mkv", PLAN)
+    audio.probe_frames.assert_not_called()
+
+
+def test_undecodable_tail_is_rejected():
+    frames = [{"pts_time": "0.0", "channels": 6}, {"pts_time": "3600.0", "channels": 6}]
+    verifier, _ = make_verifier(output_streams(), frames=frames)
+    with pytest.raises(OutputVerificationError, match="no decodable frame near 7170s"):
+        verifier.verify("src.mkv", "out.mkv", PLAN)
+
+
+def test_unprobeable_output_is_rejected():
+    verifier, _ = make_verifier([])
+    with pytest.raises(OutputVerificationError, match="could not be probed"):
+        verifier.verify("src.mkv", "out.mkv", PLAN)
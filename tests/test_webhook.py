@@ -0,0 +1,164 @@
+import base64
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock
+
+import pytest
+
+from src import config as config_module
+from src.config import WebhookConfig
+from src.file_processor import FileProcessor
+from src.webhook import WebhookServer, extract_paths
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.calls = []
+        self.done = threading.Event()
+
+    def process_paths(self, mkv_files, audio_files, force=False):
+        self.calls.append((mkv_files, audio_files))
+        self.done.set()
+        return len(mkv_files) + len(audio_files)
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(config_module.config.standalone_audio, "extensions", ("dts",))
+    root = tmp_path / "input"
+    (root / "movies" / "Film").mkdir(parents=True)
+    (root / "movies" / "Film" / "Film.mkv").write_bytes(b"")
+    (root / "movies" / "Film" / "Film.dts").write_bytes(b"")
+    (root / "movies" / "Film" / "notes.txt").write_bytes(b"")
+    (tmp_path / "elsewhere.mkv").write_bytes(b"")
+    return root
+
+
+@pytest.fixture
+def server(library):
+    scheduler = RecordingScheduler()
+    cfg = WebhookConfig(enabled=True, host="127.0.0.1", port=0, token="s3cret",
+                        path_map=(("/movies", str(library / "movies")),))
+    file_processor = MagicMock()
+    file_processor.is_standalone_audio.side_effect = FileProcessor.is_standalone_audio
+    webhook = WebhookServer(cfg, file_processor, scheduler, input_dir=str(library))
+    webhook.start()
+    yield webhook, scheduler
+    webhook.stop()
+
+
+def post(webhook, payload, headers=None):
+    host, port = webhook.address
+    request = urllib.request.Request(
+        f"http://{host}:{port}/", data=json.dumps(payload).encode(), method="POST",
+        headers={"Content-Type": "application/json", **(headers or {})},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_extract_paths_from_arr_and_generic_payloads():
+    radarr = {"eventType": "Download", "movie": {"folderPath": "/movies/Film"},
+              "movieFile": {"relativePath": "Film.mkv"}}
+    sonarr = {"eventType": "Download", "series": {"path": "/tv/Show"},
+              "episodeFiles": [{"path": "/tv/Show/S01E01.mkv"}, {"relativePath": "S01E02.mkv"}]}
+    assert extract_paths(radarr) == ["/movies/Film/Film.mkv"]
+    assert extract_paths(sonarr) == ["/tv/Show/S01E01.mkv", "/tv/Show/S01E02.mkv"]
+    assert extract_paths({"eventType": "Test", "movie": {}}) == []
+    assert extract_paths({"path": "/a.mkv"}) == ["/a.mkv"]
+    assert extract_paths({"paths": ["/a.mkv", 3]}) == ["/a.mkv"]
+
+
+def test_radarr_import_is_queued_and_converted(server, library):
+    webhook, scheduler = server
+    payload = {"eventType": "Download", "movie": {"folderPath": "/movies/Film"},
+               "movieFile": {"path": "/movies/Film/Film.mkv"}}
+    status, body = post(webhook, payload, {"X-Webhook-Token": "s3cret"})
+
+    film = str((library / "movies" / "Film" / "Film.mkv").resolve())
+    assert status == 202
+    assert body == {"queued": [film], "rejected": []}
+    assert scheduler.done.wait(5)
+    assert scheduler.calls == [([film], [])]
+
+
+def test_generic_payload_with_basic_auth_routes_standalone_audio(server, library):
+    webhook, scheduler = server
+    auth = base64.b64encode(b"radarr:s3cret").decode()
+    path = str(library / "movies" / "Film" / "Film.dts")
+    status, _ = post(webhook, {"path": path}, {"Authorization": f"Basic {auth}"})
+    assert status == 202
+    assert scheduler.done.wait(5)
+    assert scheduler.calls == [([], [str((library / "movies" / "Film" / "Film.dts").resolve())])]
+
+
+def test_rejects_bad_token_and_paths_outside_input(server, library, tmp_path):
+    webhook, scheduler = server
+    assert post(webhook, {"path": "/movies/Film/Film.mkv"}, {"X-Webhook-Token": "nope"})[0] == 401
+
+    headers = {"Authorization": "Bearer s3cret"}
+    status, body = post(webhook, {"paths": [
+        str(tmp_path / "elsewhere.mkv"),
+        str(library / "movies" / ".." / ".." / "elsewhere.mkv"),
+        str(library / "movies" / "Film" / "notes.txt"),
+        str(library / "movies" / "Film" / "missing.mkv"),
+    ]}, headers)
+    assert status == 422
+    reasons = [entry["reason"] for entry in body["rejected"]]
+    assert reasons[0].startswith("not under") and reasons[1].startswith("not under")
+    assert reasons[2] == "not an MKV or standalone audio file"
+    assert reasons[3] == "no such file"
+    assert scheduler.calls == []
+
+
+def test_health_endpoint(server):
+    webhook, _ = server
+    host, port = webhook.address
+    with urllib.request.urlopen(f"http://{host}:{port}/health", timeout=5) as response:
+        assert json.loads(response.read())["status"] == "ok"
+
+
+def test_webhook_jobs_share_the_scheduled_runs_limits(library, monkeypatch):
+    import time
+
+    from src.scheduler import Scheduler
+
+    monkeypatch.setattr(config_module.config.concurrency, "max_jobs", 2)
+    monkeypatch.setattr(config_module.config.concurrency, "per_device_jobs", 0)
+    lock = threading.Lock()
+    running, peak, done = [0], [0], []
+
+    def work(path, force=False, hardlinks=(), stats=None):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+            done.append(path)
+
+    file_processor = MagicMock()
+    file_processor.process_file.side_effect = work
+    scheduler = Scheduler(file_processor)
+    webhook = WebhookServer(WebhookConfig(enabled=True, host="127.0.0.1", port=0),
+                            file_processor, scheduler, input_dir=str(library))
+    webhook.start()
+    try:
+        run = threading.Thread(target=scheduler.process_paths, args=([f"{i}.mkv" for i in range(6)], []))
+        run.start()
+        time.sleep(0.02)
+        webhook.enqueue(str(library / "movies" / "Film" / "Film.mkv"))
+        run.join()
+        deadline = time.monotonic() + 5
+        while len(done) < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        webhook.stop()
+
+    assert len(done) == 7
+    assert peak[0] == 2